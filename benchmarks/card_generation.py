@@ -0,0 +1,111 @@
+"""Скорость генерации тестовых карт: пакетная генерация NumPy против поштучной.
+
+Для пакетного режима меряется полный путь до байтов CSV (номер, срок, CVV),
+для поштучного — прежняя реализация бота (generate_card_number ниже) со
+сроком и CVV через random.
+Отдельно — время доступа к произвольной записи воспроизводимого потока.
+Перед замерами проверяется, что все сгенерированные карты проходят
+проверку номеров (check_lines), и разбор номеров в типичных строках.
+
+Запуск из корня проекта:
+    python -m benchmarks.card_generation
+"""
+import random
+import time
+
+from plugins.card_batch import CARD_PREFIXES, card_at, csv_chunks
+from plugins.card_validator import check_lines, status
+from plugins.payment_generator import PAYMENT_SYSTEMS
+
+BATCH_COUNT = 2_000_000
+SINGLE_COUNT = 50_000
+RANDOM_ACCESS_COUNT = 10_000
+SEED = "benchmark"
+VERIFY_COUNT = 100_000
+
+# Строка текста и ожидаемые (номер, статус) найденных в ней карт
+PARSE_CASES = [
+    ("4111111111111111", [("4111111111111111", 'valid')]),
+    ("4111 1111 1111 1111", [("4111111111111111", 'valid')]),
+    ("4111-1111-1111-1111", [("4111111111111111", 'valid')]),
+    ("4111111111111111 12/30 123", [("4111111111111111", 'valid')]),
+    ("4111111111111111 123", [("4111111111111111", 'valid')]),
+    ("4111 1111 1111 1111 12/30 123", [("4111111111111111", 'valid')]),
+    ("4111111111111111,12/30,123", [("4111111111111111", 'valid')]),
+    ("3782 822463 10005", [("378282246310005", 'valid')]),
+    ("4111 1111-1111 1111", []),
+    ("5555555555554444 и 4111111111111112", [("5555555555554444", 'valid'), ("4111111111111112", 'bad_luhn')]),
+]
+
+
+def generate_card_number(system: str) -> str:
+    """Поштучная генерация номера, которой бот пользовался до пакетной: базовая линия замеров"""
+    prefix = random.choice(CARD_PREFIXES.get(system, ['4']))
+    number = prefix
+    while len(number) < 15:
+        number += str(random.randint(0, 9))
+    total = 0
+    for i, digit in enumerate(number):
+        digit = int(digit)
+        if i % 2 == 0:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    check_digit = (10 - (total % 10)) % 10
+    return number + str(check_digit)
+
+
+def run_batch(system: str) -> float:
+    started = time.perf_counter()
+    size = sum(len(chunk) for chunk in csv_chunks(SEED, system, BATCH_COUNT))
+    assert size > BATCH_COUNT * 16
+    return BATCH_COUNT / (time.perf_counter() - started)
+
+
+def run_single(system: str) -> float:
+    started = time.perf_counter()
+    for _ in range(SINGLE_COUNT):
+        f"{generate_card_number(system)},{random.randint(1, 12):02d}/{random.randint(23, 30)},{random.randint(0, 999):03d}\n"
+    return SINGLE_COUNT / (time.perf_counter() - started)
+
+
+def run_random_access(system: str) -> float:
+    """Среднее время получения записи по номеру в произвольном месте потока, мкс"""
+    rng = random.Random(0)
+    indexes = [rng.randrange(10 ** 12) for _ in range(RANDOM_ACCESS_COUNT)]
+    started = time.perf_counter()
+    for index in indexes:
+        card_at(SEED, system, index)
+    return (time.perf_counter() - started) / RANDOM_ACCESS_COUNT * 1e6
+
+
+def verify():
+    """Сгенерированные карты всех систем проходят проверку, строки разбираются правильно"""
+    for system in PAYMENT_SYSTEMS:
+        text = b''.join(csv_chunks(SEED, system, VERIFY_COUNT)).decode()
+        lines = text.splitlines()[1:] + [generate_card_number(system) for _ in range(VERIFY_COUNT // 10)]
+        checks = list(check_lines(lines))
+        assert len(checks) == len(lines), f"{system}: найдены не все номера"
+        invalid = [(check.number, status(check)) for check in checks if status(check) != 'valid']
+        assert not invalid, f"{system}: невалидные карты {invalid[:5]}"
+        assert {check.scheme for check in checks} == {system}, f"{system}: неверная платежная система"
+
+    for line, expected in PARSE_CASES:
+        found = [(check.number, status(check)) for check in check_lines([line])]
+        assert found == expected, f"{line!r}: {found} вместо {expected}"
+
+
+def main():
+    verify()
+    print(f"проверка: {VERIFY_COUNT:,} карт каждой системы и {len(PARSE_CASES)} строк разобраны верно")
+    print(f"{'система':<12} | {'пакетно, карт/с':>16} | {'поштучно, карт/с':>16} | {'ускорение':>9} | {'запись #i, мкс':>14}")
+    for system in PAYMENT_SYSTEMS:
+        batch = run_batch(system)
+        single = run_single(system)
+        access = run_random_access(system)
+        print(f"{system:<12} | {batch:>16,.0f} | {single:>16,.0f} | {batch / single:>8.0f}x | {access:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
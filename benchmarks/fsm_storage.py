@@ -0,0 +1,157 @@
+"""Задержка get/set состояний FSM: MemoryStorage против SQLite и Redis.
+
+Каждое хранилище получает одинаковую нагрузку, как от обработчиков бота:
+set_state + update_data на шаге диалога и get_state + get_data на входящем
+сообщении, для множества пользователей. Для SQLite отдельно замеряется
+финальная запись накопленных изменений (close) и чтение после перезапуска.
+
+Redis берется из FSM_REDIS_URL, если он задан, иначе поднимается локальный
+сервер с протоколом Redis (GET/GETEX/SET/DEL), достаточный для проверки.
+
+Запуск из корня проекта:
+    python -m benchmarks.fsm_storage
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from storage import RedisStorage, SQLiteStorage
+
+USERS = 2000
+ROUNDS = 5
+TTL = 3600
+
+
+class FakeRedis:
+    """Сервер с протоколом Redis в том же процессе: только нужные хранилищу команды"""
+
+    def __init__(self):
+        self.values = {}
+        self.connections = set()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections.add(asyncio.current_task())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                args = []
+                for _ in range(int(line[1:])):
+                    size = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(size + 2))[:-2])
+                writer.write(self.execute(args))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def _get(self, key: bytes):
+        value, expires = self.values.get(key, (None, None))
+        if expires is not None and expires < time.monotonic():
+            del self.values[key]
+            return None
+        return value
+
+    def execute(self, args: list) -> bytes:
+        command = args[0].upper()
+        if command in (b'PING', b'AUTH', b'SELECT'):
+            return b'+OK\r\n'
+        if command in (b'GET', b'GETEX'):
+            value = self._get(args[1])
+            if value is None:
+                return b'$-1\r\n'
+            if command == b'GETEX' and len(args) == 4:
+                self.values[args[1]] = (value, time.monotonic() + int(args[3]))
+            return b'$%d\r\n%s\r\n' % (len(value), value)
+        if command == b'SET':
+            expires = time.monotonic() + int(args[4]) if len(args) == 5 else None
+            self.values[args[1]] = (args[2], expires)
+            return b'+OK\r\n'
+        if command == b'DEL':
+            return b':%d\r\n' % sum(self.values.pop(key, None) is not None for key in args[1:])
+        return b'-ERR unknown command\r\n'
+
+
+def keys() -> list:
+    return [StorageKey(bot_id=42, chat_id=user_id, user_id=user_id) for user_id in range(1, USERS + 1)]
+
+
+async def measure(storage) -> tuple:
+    """Средняя задержка одного шага записи и одного шага чтения, мкс"""
+    write_time = read_time = 0.0
+    for round_number in range(ROUNDS):
+        started = time.perf_counter()
+        for key in keys():
+            await storage.set_state(key, "JsonValidator:waiting_for_payload")
+            await storage.update_data(key, {'schema': '{"type": "object"}', 'round': round_number})
+        write_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        for key in keys():
+            await storage.get_state(key)
+            await storage.get_data(key)
+        read_time += time.perf_counter() - started
+    steps = USERS * ROUNDS
+    return write_time / steps * 1e6, read_time / steps * 1e6
+
+
+def report(name: str, results: tuple):
+    write_us, read_us = results
+    print(f"{name:>8}: запись {write_us:8.1f} мкс/шаг, чтение {read_us:8.1f} мкс/шаг")
+
+
+async def run_sqlite(path: str):
+    storage = SQLiteStorage(path, ttl=TTL)
+    report("sqlite", await measure(storage))
+    started = time.perf_counter()
+    await storage.close()
+    print(f"{'':>8}  финальная запись в базу: {(time.perf_counter() - started) * 1000:.1f} мс")
+
+    # Перезапуск: записи подгружаются из базы при первом обращении
+    storage = SQLiteStorage(path, ttl=TTL)
+    started = time.perf_counter()
+    for key in keys():
+        assert await storage.get_state(key) == "JsonValidator:waiting_for_payload"
+        assert (await storage.get_data(key))['round'] == ROUNDS - 1
+    print(f"{'':>8}  чтение после перезапуска: {(time.perf_counter() - started) / USERS * 1e6:.1f} мкс/шаг")
+    await storage.close()
+
+
+async def run_redis():
+    url = os.getenv('FSM_REDIS_URL')
+    fake = server = None
+    if not url:
+        fake = FakeRedis()
+        server = await asyncio.start_server(fake.handle, '127.0.0.1', 0)
+        url = f"redis://127.0.0.1:{server.sockets[0].getsockname()[1]}/0"
+    storage = RedisStorage(url, ttl=TTL)
+    try:
+        name = "redis" if server is None else "fake-redis"
+        report(name, await measure(storage))
+        # Очистка состояний, чтобы не оставлять мусор на настоящем сервере
+        for key in keys():
+            await storage.set_state(key, None)
+            await storage.set_data(key, {})
+    finally:
+        await storage.close()
+        if server is not None:
+            # Соединение закрыто клиентом — обработчик сервера завершится сам
+            await asyncio.gather(*fake.connections)
+            server.close()
+            await server.wait_closed()
+
+
+async def main():
+    print(f"{USERS} пользователей x {ROUNDS} шагов: set_state + update_data, затем get_state + get_data")
+    report("memory", await measure(MemoryStorage()))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        await run_sqlite(os.path.join(tmp_dir, "fsm.sqlite3"))
+    await run_redis()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+"""Сравнение быстрого и универсального кодирования изображений.
+
+Каждый замер выполняется в отдельном процессе, чтобы пиковая память
+(ru_maxrss) относилась только к одному рендерингу.
+
+Запуск из корня проекта:
+    python -m benchmarks.image_encoding
+"""
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from plugins.image_fonts import preload_fonts
+from plugins.image_renderer import render_image
+
+FORMATS = ['png', 'gif', 'bmp']
+SIZES = [100, 1000, 3000, 5000]
+COLOR = (0, 128, 255)
+REPEATS = 3
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # В Linux ru_maxrss в килобайтах, в macOS — в байтах
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _measure(size: int, ext: str, fast: bool):
+    preload_fonts()
+    baseline = _peak_rss_mb()
+    best = float('inf')
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        data = render_image(size, size, COLOR, ext, fast=fast)
+        best = min(best, time.perf_counter() - started)
+    return best, len(data), _peak_rss_mb() - baseline
+
+
+def run_case(size: int, ext: str, fast: bool):
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(_measure, size, ext, fast).result()
+
+
+def main():
+    print(f"{'формат':<6} {'размер':>6} | {'обычный, мс':>11} {'МБ':>6} | {'быстрый, мс':>11} {'МБ':>6} | {'ускорение':>9} | {'файл, КБ':>14}")
+    for ext in FORMATS:
+        for size in SIZES:
+            slow_time, slow_len, slow_mem = run_case(size, ext, False)
+            fast_time, fast_len, fast_mem = run_case(size, ext, True)
+            print(
+                f"{ext:<6} {size:>6} | {slow_time * 1000:>11.1f} {slow_mem:>6.1f} | "
+                f"{fast_time * 1000:>11.1f} {fast_mem:>6.1f} | {slow_time / fast_time:>8.1f}x | "
+                f"{slow_len // 1024:>6}/{fast_len // 1024:<7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
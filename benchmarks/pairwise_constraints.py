@@ -0,0 +1,77 @@
+"""Генерация с ограничениями: учет правил при построении против фильтрации готового набора.
+
+Правила — случайные запреты пар значений с фиксированным seed. При фильтрации
+из обычного набора удаляются строки, нарушающие правила, и вместе с ними
+теряются комбинации, которые больше нигде не покрыты. Для каждой модели
+выводится время, размер набора и сколько допустимых t-комбинаций, покрытых
+набором с ограничениями, потеряно при фильтрации.
+
+Запуск из корня проекта:
+    python -m benchmarks.pairwise_constraints
+"""
+import random
+import time
+from itertools import combinations
+
+from benchmarks.pairwise_engine import parse_model
+from plugins.covering_array import covering_array
+
+SEED = 2024
+# Модель, сила покрытия, количество правил
+MODELS = [
+    ("3^4", 2, 3),
+    ("3^13", 2, 20),
+    ("4^15 3^17 2^29", 2, 50),
+    ("4^15 3^17 2^29", 2, 150),
+    ("10^20", 2, 200),
+    ("10^20", 2, 1000),
+    ("5^10", 3, 30),
+]
+
+
+def random_rules(sizes: list, count: int, rng: random.Random) -> list:
+    rules = []
+    for _ in range(count):
+        params = rng.sample(range(len(sizes)), 2)
+        rules.append([(p, rng.randrange(sizes[p])) for p in params])
+    return rules
+
+
+def violates(row, rules: list) -> bool:
+    return any(all(row[p] == value for p, value in rule) for rule in rules)
+
+
+def covered(rows: list, strength: int, columns: int) -> set:
+    return {
+        (cols, tuple(row[c] for c in cols))
+        for cols in combinations(range(columns), strength)
+        for row in rows
+    }
+
+
+def main():
+    rng = random.Random(SEED)
+    print(f"{'модель':<16} {'t':>2} {'правил':>6} | {'при построении, с':>17} {'тестов':>6} | "
+          f"{'фильтрация, с':>13} {'тестов':>6} {'потеряно':>8}")
+    for model, strength, rule_count in MODELS:
+        sizes = parse_model(model)
+        rules = random_rules(sizes, rule_count, rng)
+
+        started = time.perf_counter()
+        constrained = covering_array(sizes, strength, rules)
+        constrained_time = time.perf_counter() - started
+        assert not any(violates(row, rules) for row in constrained), model
+
+        started = time.perf_counter()
+        filtered = [row for row in covering_array(sizes, strength) if not violates(row, rules)]
+        filtered_time = time.perf_counter() - started
+
+        lost = len(covered(constrained, strength, len(sizes)) - covered(filtered, strength, len(sizes)))
+        print(
+            f"{model:<16} {strength:>2} {rule_count:>6} | {constrained_time:>17.2f} {len(constrained):>6} | "
+            f"{filtered_time:>13.2f} {len(filtered):>6} {lost:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Сравнение встроенного IPOG-движка с allpairspy: время, пиковая память и размер набора.
+
+Модели записываются в принятой нотации: "4^15 3^17 2^29" — 15 параметров
+по 4 значения, 17 по 3 и 29 по 2. Для каждого набора проверяется, что
+покрыты все t-комбинации.
+
+allpairspy нужен только этому замеру, бот от него не зависит, поэтому его
+нет в requirements.txt. Перед запуском:
+    pip install "allpairspy>=2.5.0"
+
+Запуск из корня проекта:
+    python -m benchmarks.pairwise_engine
+"""
+import time
+import tracemalloc
+from itertools import combinations
+
+from allpairspy import AllPairs
+
+from plugins.covering_array import covering_array
+
+MODELS = [
+    ("3^4", 2),
+    ("3^13", 2),
+    ("4^15 3^17 2^29", 2),
+    ("4^1 3^39 2^35", 2),
+    ("10^20", 2),
+    ("15^20", 2),
+    ("3^6", 3),
+    ("4^10", 3),
+    ("5^10", 3),
+    ("3^10", 4),
+]
+
+
+def parse_model(model: str) -> list:
+    sizes = []
+    for part in model.split():
+        values, count = part.split('^')
+        sizes += [int(values)] * int(count)
+    return sizes
+
+
+def is_covering(sizes: list, rows: list, strength: int) -> bool:
+    for cols in combinations(range(len(sizes)), strength):
+        covered = {tuple(row[c] for c in cols) for row in rows}
+        expected = 1
+        for c in cols:
+            expected *= sizes[c]
+        if len(covered) < expected:
+            return False
+    return True
+
+
+def run_ipog(sizes: list, strength: int) -> list:
+    return covering_array(sizes, strength)
+
+
+def run_allpairspy(sizes: list, strength: int) -> list:
+    return [list(row) for row in AllPairs([list(range(size)) for size in sizes], n=strength)]
+
+
+def measure(func, sizes: list, strength: int):
+    # Время и память меряются отдельными прогонами: tracemalloc заметно замедляет код
+    started = time.perf_counter()
+    rows = func(sizes, strength)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    func(sizes, strength)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, rows
+
+
+def main():
+    print(f"{'модель':<16} {'t':>2} | {'IPOG, с':>8} {'КБ':>7} {'тестов':>6} | {'allpairspy, с':>13} {'КБ':>7} {'тестов':>6} {'покрытие':>9}")
+    for model, strength in MODELS:
+        sizes = parse_model(model)
+        ipog_time, ipog_peak, ipog_rows = measure(run_ipog, sizes, strength)
+        assert is_covering(sizes, ipog_rows, strength), model
+        ap_time, ap_peak, ap_rows = measure(run_allpairspy, sizes, strength)
+        ap_covered = "да" if is_covering(sizes, ap_rows, strength) else "НЕПОЛНОЕ"
+        print(
+            f"{model:<16} {strength:>2} | {ipog_time:>8.2f} {ipog_peak // 1024:>7} {len(ipog_rows):>6} | "
+            f"{ap_time:>13.2f} {ap_peak // 1024:>7} {len(ap_rows):>6} {ap_covered:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
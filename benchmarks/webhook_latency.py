@@ -0,0 +1,188 @@
+"""Задержка обработки обновлений: webhook против long polling.
+
+Вместо Telegram — локальный фальшивый Bot API на aiohttp: он отдает
+обновления через getUpdates (polling) или присылает их POST-запросом на
+webhook бота и засекает, когда бот ответил на каждое из них (sendMessage).
+Отдельно проверяется, что запрос без секретного токена отклоняется.
+
+Запуск из корня проекта:
+    python -m benchmarks.webhook_latency
+"""
+import asyncio
+import socket
+import statistics
+import time
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiohttp import ClientSession, web
+
+from config import Config
+from server import create_app, create_dispatcher, start_http_server
+
+TOKEN = "42:BENCHMARK"
+SECRET = "benchmark-secret"
+SEQUENTIAL_UPDATES = 50
+BURST_UPDATES = 500
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class FakeTelegram:
+    """Минимальный Bot API: getUpdates, sendMessage и служебные методы"""
+
+    def __init__(self):
+        self.updates = asyncio.Queue()
+        self.answered = {}  # chat_id -> время ответа
+        self.get_updates_calls = 0
+        self.next_update_id = 1
+
+    def update(self, chat_id: int) -> dict:
+        update_id = self.next_update_id
+        self.next_update_id += 1
+        return {
+            'update_id': update_id,
+            'message': {
+                'message_id': update_id,
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'from': {'id': chat_id, 'is_bot': False, 'first_name': 'QA'},
+                'text': '/start',
+                'entities': [{'type': 'bot_command', 'offset': 0, 'length': 6}],
+            },
+        }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method'].lower()
+        data = await request.post()
+        if method == 'getupdates':
+            self.get_updates_calls += 1
+            timeout = int(data.get('timeout', 0))
+            batch = []
+            try:
+                batch.append(await asyncio.wait_for(self.updates.get(), timeout))
+            except asyncio.TimeoutError:
+                pass
+            while not self.updates.empty():
+                batch.append(self.updates.get_nowait())
+            return web.json_response({'ok': True, 'result': batch})
+        if method == 'sendmessage':
+            chat_id = int(data['chat_id'])
+            self.answered.setdefault(chat_id, time.perf_counter())
+            return web.json_response({'ok': True, 'result': {
+                'message_id': 1, 'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'}, 'text': data.get('text', ''),
+            }})
+        if method == 'getme':
+            return web.json_response({'ok': True, 'result': {
+                'id': 42, 'is_bot': True, 'first_name': 'QA_Rob_Bot', 'username': 'qa_rob_bot',
+            }})
+        return web.json_response({'ok': True, 'result': True})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        return app
+
+
+async def wait_answers(telegram: FakeTelegram, chat_ids: list, sent: dict) -> list:
+    while any(chat_id not in telegram.answered for chat_id in chat_ids):
+        await asyncio.sleep(0.001)
+    return [telegram.answered[chat_id] - sent[chat_id] for chat_id in chat_ids]
+
+
+async def measure(telegram: FakeTelegram, deliver, first_chat_id: int) -> tuple:
+    """Задержки по одному обновлению за раз и для пачки одновременных обновлений"""
+    sequential = []
+    for chat_id in range(first_chat_id, first_chat_id + SEQUENTIAL_UPDATES):
+        sent = {chat_id: time.perf_counter()}
+        await deliver([chat_id])
+        sequential += await wait_answers(telegram, [chat_id], sent)
+
+    chat_ids = list(range(first_chat_id + SEQUENTIAL_UPDATES, first_chat_id + SEQUENTIAL_UPDATES + BURST_UPDATES))
+    sent = dict.fromkeys(chat_ids, time.perf_counter())
+    await deliver(chat_ids)
+    return sequential, await wait_answers(telegram, chat_ids, sent)
+
+
+async def run_polling(telegram: FakeTelegram, bot: Bot) -> tuple:
+    dp = create_dispatcher(MemoryStorage())
+    polling = asyncio.create_task(dp.start_polling(
+        bot, handle_signals=False, close_bot_session=False, timeout=30, relax=0.1
+    ))
+    await asyncio.sleep(0.5)
+
+    async def deliver(chat_ids: list):
+        for chat_id in chat_ids:
+            telegram.updates.put_nowait(telegram.update(chat_id))
+
+    try:
+        return await measure(telegram, deliver, 1)
+    finally:
+        await dp.stop_polling()
+        await polling
+
+
+async def run_webhook(telegram: FakeTelegram, bot: Bot) -> tuple:
+    dp = create_dispatcher(MemoryStorage())
+    port = free_port()
+    runner = await start_http_server(create_app(dp, bot, SECRET), port=port)
+    url = f"http://127.0.0.1:{port}{Config.WEBHOOK_PATH}"
+    try:
+        async with ClientSession() as session:
+            async with session.post(url, json=telegram.update(0)) as response:
+                assert response.status == 401, "запрос без секрета должен отклоняться"
+            async with session.post(url, json=telegram.update(0),
+                                    headers={'X-Telegram-Bot-Api-Secret-Token': 'wrong'}) as response:
+                assert response.status == 401, "запрос с чужим секретом должен отклоняться"
+
+            async def post(chat_id: int):
+                async with session.post(url, json=telegram.update(chat_id),
+                                        headers={'X-Telegram-Bot-Api-Secret-Token': SECRET}) as response:
+                    assert response.status == 200
+
+            async def deliver(chat_ids: list):
+                await asyncio.gather(*(post(chat_id) for chat_id in chat_ids))
+
+            return await measure(telegram, deliver, 100_000)
+    finally:
+        await runner.cleanup()
+
+
+def report(name: str, results: tuple):
+    for kind, latencies in zip(("по одному", "пачкой"), results):
+        latencies = sorted(latencies)
+        p50 = statistics.median(latencies) * 1000
+        p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+        print(f"{name:>8} {kind:>10}: p50 {p50:7.1f} мс, p95 {p95:7.1f} мс, max {latencies[-1] * 1000:7.1f} мс")
+
+
+async def main():
+    telegram = FakeTelegram()
+    port = free_port()
+    runner = web.AppRunner(telegram.app())
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+
+    session = AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{port}"))
+    bot = Bot(token=TOKEN, session=session, default=DefaultBotProperties(parse_mode="HTML"))
+    try:
+        print(f"/start от разных пользователей: {SEQUENTIAL_UPDATES} по одному, затем {BURST_UPDATES} пачкой")
+        report("polling", await run_polling(telegram, bot))
+        print(f"запросов getUpdates: {telegram.get_updates_calls}")
+        report("webhook", await run_webhook(telegram, bot))
+        print("запросы к webhook без секрета отклонены (401)")
+    finally:
+        await session.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
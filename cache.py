@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Все созданные кэши, чтобы выводить их статистику при остановке бота
+_caches = []
+
+
+class BytesCache:
+    """LRU-кэш байтовых значений с ограничением по суммарному размеру.
+
+    При указании disk_dir значения дополнительно сохраняются на диск и
+    переживают перезапуск бота. Потокобезопасен: методы можно вызывать
+    через asyncio.to_thread, чтобы дисковые операции не блокировали loop.
+    """
+
+    def __init__(self, name: str, max_bytes: int, disk_dir: str = None):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self.size = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        _caches.append(self)
+
+    def _path(self, key) -> Path:
+        return self.disk_dir / hashlib.sha1(repr(key).encode()).hexdigest()
+
+    def _remember(self, key, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self._items[key] = value
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self.size -= len(evicted)
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return value
+
+        if self.disk_dir:
+            try:
+                value = self._path(key).read_bytes()
+            except FileNotFoundError:
+                value = None
+            if value is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, value)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value: bytes):
+        with self._lock:
+            self._remember(key, value)
+
+        if self.disk_dir:
+            path = self._path(key)
+            tmp_path = path.with_suffix('.tmp')
+            try:
+                tmp_path.write_bytes(value)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Не удалось сохранить {self.name} на диск: {e}")
+
+    def discard(self, key):
+        with self._lock:
+            value = self._items.pop(key, None)
+            if value is not None:
+                self.size -= len(value)
+
+        if self.disk_dir:
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'items': len(self._items),
+                'bytes': self.size,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+            }
+
+
+class FileIdStore:
+    """Постоянное соответствие ключа и file_id уже загруженного в Telegram файла.
+
+    Повторная отправка по file_id не требует загрузки файла. Хранится в
+    JSON-файле, который перезаписывается атомарно при каждом изменении.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._ids = {}
+        try:
+            self._ids = json.loads(self.path.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать {self.path}: {e}")
+
+    @staticmethod
+    def _key(key) -> str:
+        return repr(key)
+
+    def get(self, key):
+        return self._ids.get(self._key(key))
+
+    def put(self, key, file_id: str):
+        if self._ids.get(self._key(key)) != file_id:
+            self._ids[self._key(key)] = file_id
+            self._save()
+
+    def discard(self, key):
+        if self._ids.pop(self._key(key), None) is not None:
+            self._save()
+
+    def _save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps(self._ids, ensure_ascii=False), encoding='utf-8')
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить {self.path}: {e}")
+
+
+def cache_stats() -> list:
+    return [f"{cache.name}: {cache.stats()}" for cache in _caches]
+
+
+def log_cache_stats():
+    """Вывод статистики всех кэшей в лог"""
+    for line in cache_stats():
+        logger.info(f"Кэш {line}")
@@ -5,4 +5,81 @@ load_dotenv()
 
 class Config:
     BOT_TOKEN = os.getenv('BOT_TOKEN')
-    ADMIN_ID = os.getenv('ADMIN_ID')
\ No newline at end of file
+    ADMIN_ID = os.getenv('ADMIN_ID')
+
+    # Порт HTTP-сервера (/health и webhook)
+    HTTP_PORT = int(os.getenv('HTTP_PORT', 8000))
+    # Режим webhook: публичный адрес сервера, например https://bot.example.com. Без него — long polling
+    WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+    WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+    # Секрет для заголовка X-Telegram-Bot-Api-Secret-Token (по умолчанию новый при каждом запуске)
+    WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+    # Сколько соединений с webhook Telegram может держать одновременно
+    WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', 40))
+
+    # Хранилище состояний FSM: sqlite (переживает перезапуск), redis (общее для нескольких процессов) или memory
+    FSM_STORAGE = os.getenv('FSM_STORAGE', 'sqlite')
+    FSM_SQLITE_PATH = os.getenv('FSM_SQLITE_PATH', 'cache/fsm.sqlite3')
+    FSM_REDIS_URL = os.getenv('FSM_REDIS_URL', 'redis://localhost:6379/0')
+    # Через сколько секунд без активности сессия считается брошенной и удаляется (0 — никогда)
+    FSM_TTL = int(os.getenv('FSM_TTL', 24 * 60 * 60))
+    # Отложенная запись SQLite: раз в сколько секунд и после скольких изменений сохранять в базу
+    FSM_FLUSH_INTERVAL = float(os.getenv('FSM_FLUSH_INTERVAL', 1))
+    FSM_FLUSH_BATCH = int(os.getenv('FSM_FLUSH_BATCH', 500))
+
+    # Пул процессов для рендеринга изображений
+    RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', os.cpu_count() or 1))
+    RENDER_TIMEOUT = float(os.getenv('RENDER_TIMEOUT', 30))
+    # Сколько пикселей могут одновременно рендериться во всех воркерах
+    RENDER_PIXEL_BUDGET = int(os.getenv('RENDER_PIXEL_BUDGET', 2 * 5000 * 5000))
+    # Каталог для временных файлов больших изображений (по умолчанию системный)
+    RENDER_SPILL_DIR = os.getenv('RENDER_SPILL_DIR')
+
+    # Кэш готовых изображений: лимит в памяти и необязательный каталог на диске
+    IMAGE_CACHE_BYTES = int(os.getenv('IMAGE_CACHE_BYTES', 64 * 1024 * 1024))
+    IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR')
+    # file_id уже загруженных в Telegram изображений
+    IMAGE_FILE_IDS_PATH = os.getenv('IMAGE_FILE_IDS_PATH', 'cache/image_file_ids.json')
+    # TTF-шрифт для подписи на изображениях (по умолчанию встроенный шрифт Pillow)
+    LABEL_FONT_PATH = os.getenv('LABEL_FONT_PATH')
+    # Максимум изображений в одном пакетном запросе
+    BATCH_MAX_IMAGES = int(os.getenv('BATCH_MAX_IMAGES', 40))
+    # Сколько байт временного файла держать в памяти, прежде чем сбросить на диск
+    SPOOL_MAX_MEMORY = int(os.getenv('SPOOL_MAX_MEMORY', 1024 * 1024))
+
+    # Кэш наборов pairwise-тестов: лимит в памяти и необязательный каталог на диске
+    PAIRWISE_CACHE_BYTES = int(os.getenv('PAIRWISE_CACHE_BYTES', 16 * 1024 * 1024))
+    PAIRWISE_CACHE_DIR = os.getenv('PAIRWISE_CACHE_DIR')
+    # Пул процессов для генерации pairwise-тестов
+    PAIRWISE_WORKERS = int(os.getenv('PAIRWISE_WORKERS', 2))
+    PAIRWISE_TIMEOUT = float(os.getenv('PAIRWISE_TIMEOUT', 60))
+    # Ограничения размера модели: параметров, значений у параметра и покрываемых комбинаций
+    PAIRWISE_MAX_PARAMETERS = int(os.getenv('PAIRWISE_MAX_PARAMETERS', 50))
+    PAIRWISE_MAX_VALUES = int(os.getenv('PAIRWISE_MAX_VALUES', 50))
+    PAIRWISE_MAX_INTERACTIONS = int(os.getenv('PAIRWISE_MAX_INTERACTIONS', 2_000_000))
+    # Максимум ограничений (запрещенных сочетаний) в одной модели
+    PAIRWISE_MAX_RULES = int(os.getenv('PAIRWISE_MAX_RULES', 500))
+
+    # Максимум карт в одном пакетном CSV генератора платежных данных
+    CARD_BULK_MAX = int(os.getenv('CARD_BULK_MAX', 1_000_000))
+    # Максимальный размер файла с номерами для проверки (лимит скачивания Bot API — 20 МБ)
+    CARD_CHECK_MAX_BYTES = int(os.getenv('CARD_CHECK_MAX_BYTES', 20 * 1024 * 1024))
+
+    # Пул процессов для разбора и форматирования JSON
+    JSON_WORKERS = int(os.getenv('JSON_WORKERS', 2))
+    JSON_TIMEOUT = float(os.getenv('JSON_TIMEOUT', 20))
+    # Максимальный размер JSON-документа
+    JSON_MAX_BYTES = int(os.getenv('JSON_MAX_BYTES', 10 * 1024 * 1024))
+    # Максимальный размер JSON Schema и сколько скомпилированных схем держать в кэше каждого воркера
+    JSON_SCHEMA_MAX_BYTES = int(os.getenv('JSON_SCHEMA_MAX_BYTES', 1024 * 1024))
+    JSON_SCHEMA_CACHE_SIZE = int(os.getenv('JSON_SCHEMA_CACHE_SIZE', 64))
+    # Тексты принятых схем и ожидаемых документов сравнения между сообщениями (в состоянии FSM
+    # хранится только ключ): лимит в памяти
+    # и каталог на диске, чтобы схемы переживали перезапуск вместе с состояниями SQLite или Redis
+    JSON_DOCUMENT_STORE_BYTES = int(os.getenv('JSON_DOCUMENT_STORE_BYTES', 64 * 1024 * 1024))
+    JSON_DOCUMENT_STORE_DIR = os.getenv('JSON_DOCUMENT_STORE_DIR')
+    # Максимальный размер каждого из сравниваемых JSON-документов
+    JSON_DIFF_MAX_BYTES = int(os.getenv('JSON_DIFF_MAX_BYTES', 5 * 1024 * 1024))
+    # Максимальный размер JSONL-файла (лимит скачивания Bot API — 20 МБ) и строк в одной части для воркера
+    JSONL_MAX_BYTES = int(os.getenv('JSONL_MAX_BYTES', 20 * 1024 * 1024))
+    JSONL_CHUNK_LINES = int(os.getenv('JSONL_CHUNK_LINES', 5000))
@@ -1,9 +1,15 @@
 from aiogram import Dispatcher
 from aiogram.filters import Command, StateFilter
-from aiogram.types import Message
+from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
+import html
 import logging
+from cache import cache_stats
+from config import Config
 from messages import WELCOME_MSG, MENU_MSG, HELP_MSG, get_main_menu, get_back_menu
+from metrics import latency_stats
+from plugins.json_tools import BACKEND as JSON_BACKEND
+from workers import cancel_jobs
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +19,12 @@ from plugins.json_validator import (
     json_validator_command,
     process_json_validation,
     process_repeat_choice,
+    process_schema,
+    process_payload,
+    json_diff_command,
+    process_diff_expected,
+    process_diff_actual,
+    forget_diff,
     JsonValidatorStates
 )
 
@@ -20,6 +32,7 @@ from plugins.image_generator import (
     generate_image_command,
     process_format_choice,
     process_image_params,
+    process_batch_params,
     handle_choice,
     ImageGeneratorStates
 )
@@ -28,12 +41,17 @@ from plugins.payment_generator import (
     generate_payment_command as payment_gen_command,
     process_payment_system,
     process_regenerate_choice,
+    process_card_check,
     PaymentGeneratorStates
 )
 
 from plugins.pairwise_tester import (
     pairwise_command as pairwise_test_command,
     process_pairwise_parameters,
+    process_full_list_page,
+    process_export,
+    FullListPage,
+    ExportSuite,
     PairwiseStates
 )
 
@@ -84,6 +102,10 @@ class CommandRouter:
             # Универсальный обработчик /cancel
             @self.dp.message(Command("cancel"))
             async def cmd_cancel(message: Message, state: FSMContext):
+                # Прерываем тяжелые задачи пользователя, которые еще выполняются в пулах
+                cancel_jobs(message.from_user.id)
+                # Ожидаемый документ сравнения хранится вне состояния — удаляем вместе с ним
+                await forget_diff(message.from_user.id)
                 await state.clear()
                 await message.answer("✅ Операция отменена", reply_markup=get_main_menu())
 
@@ -97,6 +119,15 @@ class CommandRouter:
             async def cmd_help(message: Message, state: FSMContext):
                 await self.handle_help_command(message, state)
 
+            # Статистика задержек и кэшей — только для администратора
+            @self.dp.message(Command("stats"))
+            async def cmd_stats(message: Message, state: FSMContext):
+                if str(message.from_user.id) != str(Config.ADMIN_ID):
+                    return
+                lines = [f"JSON: {JSON_BACKEND}", "", "Задержки:"] + (latency_stats() or ["нет данных"])
+                lines += ["", "Кэши:"] + cache_stats()
+                await message.answer(html.escape("\n".join(lines)))
+
             # Обработчики специализированных команд
             @self.dp.message(Command("genimage"))
             async def cmd_genimage(message: Message, state: FSMContext):
@@ -114,6 +145,11 @@ class CommandRouter:
             async def cmd_validatejson(message: Message, state: FSMContext):
                 await self.handle_json_validator_command(message, state)
 
+            @self.dp.message(Command("jsondiff"))
+            async def cmd_jsondiff(message: Message, state: FSMContext):
+                await state.clear()
+                await json_diff_command(message, state)
+
             # Обработчики состояний
             @self.dp.message(StateFilter(ImageGeneratorStates.waiting_for_params))
             async def handle_image_state(message: Message, state: FSMContext):
@@ -123,6 +159,14 @@ class CommandRouter:
                     return
                 await process_image_params(message, state)
 
+            @self.dp.message(StateFilter(ImageGeneratorStates.waiting_for_batch))
+            async def handle_image_batch_state(message: Message, state: FSMContext):
+                if message.text == "Назад в меню" or message.text == "/help":
+                    handler = self.handle_help_command if message.text == "/help" else self.handle_back_to_menu
+                    await handler(message, state)
+                    return
+                await process_batch_params(message, state)
+
             @self.dp.message(StateFilter(ImageGeneratorStates.waiting_for_format))
             async def handle_format_choice(message: Message, state: FSMContext):
                     await process_format_choice(message, state)
@@ -145,6 +189,13 @@ class CommandRouter:
                     return
                 await process_regenerate_choice(message, state)
 
+            @self.dp.message(StateFilter(PaymentGeneratorStates.waiting_for_cards))
+            async def handle_card_check(message: Message, state: FSMContext):
+                if message.text == "Назад в меню":
+                    await self.handle_back_to_menu(message, state)
+                    return
+                await process_card_check(message, state)
+
             @self.dp.message(StateFilter(PairwiseStates.waiting_for_parameters))
             async def handle_pairwise_state(message: Message, state: FSMContext):
                 if message.text == "Назад в меню" or message.text == "/help":
@@ -158,6 +209,14 @@ class CommandRouter:
                 from plugins.pairwise_tester import process_pairwise_action
                 await process_pairwise_action(message, state)
 
+            @self.dp.callback_query(FullListPage.filter())
+            async def handle_pairwise_full_list_page(callback: CallbackQuery, callback_data: FullListPage, state: FSMContext):
+                await process_full_list_page(callback, callback_data, state)
+
+            @self.dp.callback_query(ExportSuite.filter())
+            async def handle_pairwise_export(callback: CallbackQuery, callback_data: ExportSuite, state: FSMContext):
+                await process_export(callback, callback_data, state)
+
             @self.dp.message(StateFilter(JsonValidatorStates.waiting_for_json))
             async def handle_json_validation(message: Message, state: FSMContext):
                 if message.text == "Назад в меню":
@@ -172,6 +231,34 @@ class CommandRouter:
                     return
                 await process_repeat_choice(message, state)
 
+            @self.dp.message(StateFilter(JsonValidatorStates.waiting_for_schema))
+            async def handle_json_schema(message: Message, state: FSMContext):
+                if message.text == "Назад в меню":
+                    await self.handle_back_to_menu(message, state)
+                    return
+                await process_schema(message, state)
+
+            @self.dp.message(StateFilter(JsonValidatorStates.waiting_for_payload))
+            async def handle_json_payload(message: Message, state: FSMContext):
+                if message.text == "Назад в меню":
+                    await self.handle_back_to_menu(message, state)
+                    return
+                await process_payload(message, state)
+
+            @self.dp.message(StateFilter(JsonValidatorStates.waiting_for_diff_expected))
+            async def handle_json_diff_expected(message: Message, state: FSMContext):
+                if message.text == "Назад в меню":
+                    await self.handle_back_to_menu(message, state)
+                    return
+                await process_diff_expected(message, state)
+
+            @self.dp.message(StateFilter(JsonValidatorStates.waiting_for_diff_actual))
+            async def handle_json_diff_actual(message: Message, state: FSMContext):
+                if message.text == "Назад в меню":
+                    await self.handle_back_to_menu(message, state)
+                    return
+                await process_diff_actual(message, state)
+
 
             # Главный обработчик текстовых сообщений
             @self.dp.message()
@@ -0,0 +1,41 @@
+from aiogram.types import InputFile
+
+
+class SpooledInputFile(InputFile):
+    """Загрузка в Telegram из открытого файлового объекта (например, SpooledTemporaryFile).
+
+    Файл читается частями, поэтому большие документы не копируются в память целиком.
+    Закрывать файл должен вызывающий код после отправки.
+    """
+
+    def __init__(self, file, filename: str, chunk_size: int = 64 * 1024):
+        super().__init__(filename=filename, chunk_size=chunk_size)
+        self.file = file
+
+    async def read(self, bot):
+        self.file.seek(0)
+        while chunk := self.file.read(self.chunk_size):
+            yield chunk
+
+
+class GeneratorInputFile(InputFile):
+    """Загрузка в Telegram из генератора частей файла.
+
+    factory вызывается при каждом чтении и должен возвращать новый генератор
+    байтовых частей, поэтому файл можно отправить повторно. Части собираются
+    в блоки по chunk_size, весь файл в памяти не хранится.
+    """
+
+    def __init__(self, factory, filename: str, chunk_size: int = 64 * 1024):
+        super().__init__(filename=filename, chunk_size=chunk_size)
+        self.factory = factory
+
+    async def read(self, bot):
+        buffer = bytearray()
+        for part in self.factory():
+            buffer += part
+            while len(buffer) >= self.chunk_size:
+                yield bytes(buffer[:self.chunk_size])
+                del buffer[:self.chunk_size]
+        if buffer:
+            yield bytes(buffer)
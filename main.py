@@ -2,14 +2,16 @@ import logging
 import asyncio
 import sys
 import os
+import secrets
 from pathlib import Path
-from aiogram import Bot, Dispatcher
+from aiogram import Bot
 from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import Message
 from config import Config
-from handlers import CommandRouter
-from aiohttp import web
+from server import create_app, create_dispatcher, start_http_server
+from workers import shutdown_pools
+from cache import log_cache_stats
+from metrics import log_latency_stats
 
 # Создаем папку для логов, если её нет
 LOG_DIR = Path("logs")
@@ -44,49 +46,53 @@ async def close_bot_session(bot: Bot):
     except Exception as e:
         logger.warning(f"Ошибка при закрытии сессии: {e}")
 
-async def health_check(request: web.Request):
-    """Эндпоинт для проверки работоспособности (UptimeRobot)"""
-    return web.Response(text="OK")
-
-async def start_http_server(app: web.Application):
-    """Запуск HTTP-сервера"""
-    runner = web.AppRunner(app)
-    await runner.setup()
-    site = web.TCPSite(runner, '0.0.0.0', 8000)
-    await site.start()
-    logger.info("HTTP-сервер запущен на порту 8000")
-
 async def main():
     bot = None
+    dp = None
+    runner = None
     try:
         # Инициализация бота
         bot = Bot(token=Config.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
-        dp = Dispatcher(storage=MemoryStorage())
         
         # Регистрация обработчиков
         logger.info("=== Инициализация бота ===")
-        router = CommandRouter(dp)
-        router.register_handlers()
-
-        # Пропуск накопившихся сообщений
-        await bot.delete_webhook(drop_pending_updates=True)
-
-        # Уведомление о запуске
-        await notify_admin(bot, "🟢 Бот успешно запущен!")
-
-        # Создание и запуск HTTP-сервера
-        app = web.Application()
-        app.router.add_get('/health', health_check)
-        asyncio.create_task(start_http_server(app))
-
-        logger.info("=== Запуск бота ===")
-        await dp.start_polling(
-            bot,
-            allowed_updates=dp.resolve_used_update_types(),
-            close_bot_session=True,
-            timeout=30,
-            relax=0.1
-        )
+        dp = create_dispatcher()
+
+        if Config.WEBHOOK_URL:
+            # Секрет из настроек или новый при каждом запуске: webhook все равно переустанавливается
+            webhook_secret = Config.WEBHOOK_SECRET or secrets.token_urlsafe(32)
+            runner = await start_http_server(create_app(dp, bot, webhook_secret))
+
+            # Пропуск накопившихся сообщений
+            await bot.set_webhook(
+                url=Config.WEBHOOK_URL.rstrip('/') + Config.WEBHOOK_PATH,
+                secret_token=webhook_secret,
+                allowed_updates=dp.resolve_used_update_types(),
+                max_connections=Config.WEBHOOK_MAX_CONNECTIONS,
+                drop_pending_updates=True
+            )
+            await notify_admin(bot, "🟢 Бот успешно запущен!")
+
+            logger.info(f"=== Запуск бота (webhook {Config.WEBHOOK_PATH}) ===")
+            await asyncio.Event().wait()
+        else:
+            # Пропуск накопившихся сообщений
+            await bot.delete_webhook(drop_pending_updates=True)
+
+            # Уведомление о запуске
+            await notify_admin(bot, "🟢 Бот успешно запущен!")
+
+            # Создание и запуск HTTP-сервера
+            runner = await start_http_server(create_app(dp, bot))
+
+            logger.info("=== Запуск бота ===")
+            await dp.start_polling(
+                bot,
+                allowed_updates=dp.resolve_used_update_types(),
+                close_bot_session=True,
+                timeout=30,
+                relax=0.1
+            )
         
     except asyncio.CancelledError:
         logger.info("Получен сигнал завершения работы")
@@ -99,7 +105,19 @@ async def main():
         logger.info("Завершение работы бота...")
         if bot:
             await notify_admin(bot, "🔴 Бот остановлен")
+        if runner:
+            await runner.cleanup()
+        if bot:
             await close_bot_session(bot)
+        if dp:
+            # Диспетчер не закрывает хранилище сам, а SQLite нужно дописать накопленные изменения
+            try:
+                await dp.storage.close()
+            except Exception as e:
+                logger.error(f"Ошибка при закрытии хранилища FSM: {e}")
+        shutdown_pools()
+        log_cache_stats()
+        log_latency_stats()
         logger.info("Бот остановлен")
 
 def run_bot():
@@ -37,6 +37,7 @@ HELP_MSG = (
     "/genpayment - генератор платежных данных\n"
     "/pairwise - генератор pairwise тестов\n"
     "/validatejson - валидатор JSON\n"
+    "/jsondiff - сравнение двух JSON\n"
     "/cancel - отмена текущей операции\n"
     "/help - вызов справки\n\n"
     "Или используйте кнопки меню ниже"
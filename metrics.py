@@ -0,0 +1,70 @@
+import bisect
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Все гистограммы, чтобы выводить их в /stats и в лог при остановке бота
+_histograms = {}
+
+# Верхние границы корзин, мс (логарифмическая шкала)
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000]
+
+
+class LatencyHistogram:
+    """Гистограмма задержек с фиксированными корзинами.
+
+    Хранит только счетчики, поэтому не растет с количеством запросов;
+    перцентили оцениваются по верхней границе корзины.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.total += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction: float) -> float:
+        """Оценка перцентиля сверху: граница корзины, в которую он попал"""
+        if not self.total:
+            return 0.0
+        rank = fraction * self.total
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> str:
+        if not self.total:
+            return f"{self.name}: нет данных"
+        return (
+            f"{self.name}: n={self.total}, среднее {self.sum_ms / self.total:.1f} мс, "
+            f"p50≤{self.percentile(0.5):.0f} мс, p95≤{self.percentile(0.95):.0f} мс, "
+            f"макс {self.max_ms:.0f} мс"
+        )
+
+
+def histogram(name: str) -> LatencyHistogram:
+    """Гистограмма с данным именем (создается при первом обращении)"""
+    if name not in _histograms:
+        _histograms[name] = LatencyHistogram(name)
+    return _histograms[name]
+
+
+def latency_stats() -> list:
+    return [h.summary() for h in sorted(_histograms.values(), key=lambda h: h.name)]
+
+
+def log_latency_stats():
+    """Вывод всех гистограмм в лог"""
+    for line in latency_stats():
+        logger.info(f"Задержки {line}")
@@ -0,0 +1,122 @@
+from typing import NamedTuple
+import hashlib
+import secrets
+import numpy as np
+
+# Пакетная генерация тестовых карт. Номера, сроки и CVV создаются сразу для
+# тысяч карт массивами NumPy, контрольная цифра Луна считается по таблице,
+# а строки CSV собираются фиксированной ширины прямо из массива байтов.
+#
+# Генерация детерминированная и счетная: запись номер i получается из блока
+# Philox со счетчиком i и ключом из (seed, система), поэтому любой набор
+# воспроизводится по seed, а любую запись можно получить без предыдущих
+
+CARD_PREFIXES = {
+    'Visa': ['4'],
+    'Mastercard': ['51', '52', '53', '54', '55'],
+    'UnionPay': ['62'],
+    'JCB': [str(prefix) for prefix in range(3528, 3590)],
+    'Mir': ['2200', '2201', '2202', '2203', '2204']
+}
+CARD_LENGTH = 16
+EXPIRY_YEARS = (23, 30)  # Диапазон годов срока действия, включительно
+BATCH_ROWS = 65536  # Сколько карт генерировать за один шаг
+WORDS_PER_RECORD = 4  # Один блок Philox4x64 (4 слова по 64 бита) на запись
+
+# Алгоритм Луна: удвоенная цифра с вычитанием 9, если результат больше 9
+LUHN_DOUBLE = np.array([0, 2, 4, 6, 8, 1, 3, 5, 7, 9], dtype=np.uint8)
+
+CSV_HEADER = b'card_number,expiry,cvv\n'
+# Строка CSV: 16 цифр номера, ",MM/YY,CVV\n"
+_ROW_WIDTH = CARD_LENGTH + 11
+_ASCII_ZERO = ord('0')
+
+
+class CardRecord(NamedTuple):
+    number: str
+    expiry: str
+    cvv: str
+
+
+class CardBatch(NamedTuple):
+    digits: np.ndarray  # (count, 16), цифры номера
+    month: np.ndarray
+    year: np.ndarray
+    cvv: np.ndarray
+
+
+def new_seed() -> str:
+    """Случайный seed для набора, который потом можно воспроизвести"""
+    return secrets.token_hex(4)
+
+
+def stream_key(seed: str, system: str) -> int:
+    """128-битный ключ Philox: у каждой системы с одним seed — свой поток"""
+    return int.from_bytes(hashlib.blake2b(f"{system}:{seed}".encode(), digest_size=16).digest(), 'little')
+
+
+def card_batch(seed: str, system: str, start: int, count: int) -> CardBatch:
+    """Записи с номерами start..start+count-1 потока (seed, system)"""
+    words = np.random.Philox(key=stream_key(seed, system), counter=start).random_raw(count * WORDS_PER_RECORD)
+    words = words.reshape(count, WORDS_PER_RECORD)
+
+    # Первое слово — 15 цифр тела номера (10^15 < 2^64, смещение распределения пренебрежимо)
+    body = words[:, 0] % np.uint64(10 ** (CARD_LENGTH - 1))
+    digits = np.empty((count, CARD_LENGTH), dtype=np.uint8)
+    for position in range(CARD_LENGTH - 2, -1, -1):
+        digits[:, position] = body % np.uint64(10)
+        body //= np.uint64(10)
+
+    prefixes = CARD_PREFIXES.get(system, ['4'])
+    choice = words[:, 1] % np.uint64(len(prefixes))
+    for index, prefix in enumerate(prefixes):
+        digits[choice == index, :len(prefix)] = np.frombuffer(prefix.encode(), dtype=np.uint8) - _ASCII_ZERO
+
+    # Удваиваются цифры на четных позициях тела номера (считая слева, с нуля)
+    total = LUHN_DOUBLE[digits[:, 0:CARD_LENGTH - 1:2]].sum(axis=1, dtype=np.uint32)
+    total += digits[:, 1:CARD_LENGTH - 1:2].sum(axis=1, dtype=np.uint32)
+    digits[:, -1] = (10 - total % 10) % 10
+
+    month = (words[:, 2] % np.uint64(12) + np.uint64(1)).astype(np.uint8)
+    years = EXPIRY_YEARS[1] - EXPIRY_YEARS[0] + 1
+    year = ((words[:, 2] >> np.uint64(32)) % np.uint64(years) + np.uint64(EXPIRY_YEARS[0])).astype(np.uint8)
+    cvv = (words[:, 3] % np.uint64(1000)).astype(np.uint16)
+    return CardBatch(digits, month, year, cvv)
+
+
+def card_at(seed: str, system: str, index: int) -> CardRecord:
+    """Одна запись потока по номеру — за O(1), без генерации предыдущих"""
+    batch = card_batch(seed, system, index, 1)
+    return CardRecord(
+        ''.join(map(str, batch.digits[0])),
+        f"{batch.month[0]:02d}/{batch.year[0]:02d}",
+        f"{batch.cvv[0]:03d}"
+    )
+
+
+def csv_rows(batch: CardBatch) -> bytes:
+    """Строки CSV для пакета: номер, срок действия MM/YY и CVV"""
+    count = len(batch.digits)
+    rows = np.empty((count, _ROW_WIDTH), dtype=np.uint8)
+    rows[:, :CARD_LENGTH] = batch.digits + _ASCII_ZERO
+
+    column = CARD_LENGTH
+    rows[:, column] = ord(',')
+    rows[:, column + 1] = batch.month // 10 + _ASCII_ZERO
+    rows[:, column + 2] = batch.month % 10 + _ASCII_ZERO
+    rows[:, column + 3] = ord('/')
+    rows[:, column + 4] = batch.year // 10 + _ASCII_ZERO
+    rows[:, column + 5] = batch.year % 10 + _ASCII_ZERO
+    rows[:, column + 6] = ord(',')
+    rows[:, column + 7] = batch.cvv // 100 + _ASCII_ZERO
+    rows[:, column + 8] = batch.cvv // 10 % 10 + _ASCII_ZERO
+    rows[:, column + 9] = batch.cvv % 10 + _ASCII_ZERO
+    rows[:, column + 10] = ord('\n')
+    return rows.tobytes()
+
+
+def csv_chunks(seed: str, system: str, count: int, start: int = 0):
+    """Части CSV-файла с записями start..start+count-1, по BATCH_ROWS строк"""
+    yield CSV_HEADER
+    for offset in range(start, start + count, BATCH_ROWS):
+        yield csv_rows(card_batch(seed, system, offset, min(BATCH_ROWS, start + count - offset)))
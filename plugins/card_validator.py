@@ -0,0 +1,149 @@
+from bisect import bisect_right
+from collections import Counter
+from typing import NamedTuple, Optional
+import re
+
+# Проверка номеров карт: алгоритм Луна, платежная система по диапазону BIN
+# и допустимая для системы длина. Диапазоны один раз приводятся к 6-значным
+# BIN и раскладываются в непересекающиеся отрезки для бинарного поиска
+
+# Система, начало и конец диапазона префиксов (одинаковой длины), допустимые длины номера
+BIN_RANGES = [
+    ('Visa', '4', '4', (13, 16, 19)),
+    ('Mastercard', '51', '55', (16,)),
+    ('Mastercard', '2221', '2720', (16,)),
+    ('Mir', '2200', '2204', (16, 17, 18, 19)),
+    ('JCB', '3528', '3589', (16, 17, 18, 19)),
+    ('UnionPay', '62', '62', (16, 17, 18, 19)),
+    ('UnionPay', '81', '81', (16, 17, 18, 19)),
+    ('American Express', '34', '34', (15,)),
+    ('American Express', '37', '37', (15,)),
+    ('Diners Club', '300', '305', (14, 15, 16, 17, 18, 19)),
+    ('Diners Club', '36', '36', (14, 15, 16, 17, 18, 19)),
+    ('Diners Club', '38', '39', (16, 17, 18, 19)),
+    ('Discover', '6011', '6011', (16, 17, 18, 19)),
+    ('Discover', '644', '649', (16, 17, 18, 19)),
+    ('Discover', '65', '65', (16, 17, 18, 19)),
+    ('Maestro', '5018', '5018', tuple(range(12, 20))),
+    ('Maestro', '5020', '5020', tuple(range(12, 20))),
+    ('Maestro', '5038', '5038', tuple(range(12, 20))),
+    ('Maestro', '5893', '5893', tuple(range(12, 20))),
+    ('Maestro', '6304', '6304', tuple(range(12, 20))),
+    ('Maestro', '6759', '6759', tuple(range(12, 20))),
+    ('Maestro', '6761', '6763', tuple(range(12, 20))),
+]
+BIN_LENGTH = 6
+MIN_LENGTH = 12
+MAX_LENGTH = 19
+
+# Номер в тексте: от 12 до 19 цифр подряд или группы с одним видом разделителя
+# (пробел или дефис): 4-4-4(-4) и 4-6-4/4-6-5 (American Express, Diners Club).
+# Группа короче 4 цифр в конце не допускается, чтобы в строках вида
+# "номер срок CVV" CVV или месяц не приклеивались к номеру
+CARD_PATTERN = re.compile(
+    r'(?<!\d)(?:\d{4}([ -])\d{4}\1\d{4}(?:\1\d{4})?|\d{4}([ -])\d{6}\2\d{4,5}|\d{%d,%d})(?!\d)'
+    % (MIN_LENGTH, MAX_LENGTH)
+)
+_SEPARATORS = str.maketrans('', '', ' -')
+# Удвоение цифры по алгоритму Луна (с вычитанием 9) для байтов b'0'..b'9'
+_LUHN_DOUBLE = bytes.maketrans(b'0123456789', b'0246813579')
+
+REPORT_HEADER = 'card_number,scheme,luhn,length,status\n'
+
+
+class CardCheck(NamedTuple):
+    number: str
+    scheme: Optional[str]
+    luhn_valid: bool
+    length_valid: bool
+
+    @property
+    def valid(self) -> bool:
+        return self.luhn_valid and self.length_valid
+
+
+def _build_index(ranges: list):
+    """Непересекающиеся отрезки 6-значных BIN: (начала, концы, записи).
+
+    При пересечении диапазонов побеждает более узкий (более точный) диапазон.
+    """
+    spans = []
+    for scheme, low, high, lengths in ranges:
+        scale = 10 ** (BIN_LENGTH - len(low))
+        spans.append((int(low) * scale, (int(high) + 1) * scale - 1, (scheme, frozenset(lengths))))
+
+    bounds = sorted({start for start, _, _ in spans} | {end + 1 for _, end, _ in spans})
+    starts, ends, entries = [], [], []
+    for start, next_start in zip(bounds, bounds[1:]):
+        covering = [span for span in spans if span[0] <= start and next_start - 1 <= span[1]]
+        if not covering:
+            continue
+        entry = min(covering, key=lambda span: span[1] - span[0])[2]
+        if entries and entries[-1] is entry and ends[-1] == start - 1:
+            ends[-1] = next_start - 1
+        else:
+            starts.append(start)
+            ends.append(next_start - 1)
+            entries.append(entry)
+    return starts, ends, entries
+
+
+_BIN_STARTS, _BIN_ENDS, _BIN_ENTRIES = _build_index(BIN_RANGES)
+
+
+def lookup_bin(number: str):
+    """Платежная система и допустимые длины по первым цифрам номера или None"""
+    prefix = int(number[:BIN_LENGTH].ljust(BIN_LENGTH, '0'))
+    i = bisect_right(_BIN_STARTS, prefix) - 1
+    if i >= 0 and prefix <= _BIN_ENDS[i]:
+        return _BIN_ENTRIES[i]
+    return None
+
+
+def luhn_valid(number: str) -> bool:
+    """Проверка контрольной цифры: сумма цифр считается по байтам, удвоение — по таблице"""
+    digits = number.encode('ascii')
+    total = sum(digits[-1::-2]) + sum(digits[-2::-2].translate(_LUHN_DOUBLE)) - ord('0') * len(digits)
+    return total % 10 == 0
+
+
+def check_card(text: str) -> CardCheck:
+    number = text.translate(_SEPARATORS)
+    entry = lookup_bin(number)
+    scheme, lengths = entry if entry else (None, ())
+    return CardCheck(number, scheme, luhn_valid(number), len(number) in lengths)
+
+
+def check_lines(lines):
+    """Результаты проверки всех номеров, найденных в строках, за один проход"""
+    for line in lines:
+        for match in CARD_PATTERN.finditer(line):
+            yield check_card(match.group())
+
+
+def status(check: CardCheck) -> str:
+    if check.scheme is None:
+        return 'unknown_scheme'
+    if not check.luhn_valid:
+        return 'bad_luhn'
+    if not check.length_valid:
+        return 'bad_length'
+    return 'valid'
+
+
+def write_report(lines, out, batch_rows: int = 1000) -> Counter:
+    """Построчный CSV-отчет в бинарный файл out; возвращает количество номеров по статусам"""
+    summary = Counter()
+    out.write(REPORT_HEADER.encode('utf-8'))
+    batch = []
+    for check in check_lines(lines):
+        result = status(check)
+        summary[result] += 1
+        batch.append(
+            f"{check.number},{check.scheme or ''},{int(check.luhn_valid)},{int(check.length_valid)},{result}\n"
+        )
+        if len(batch) == batch_rows:
+            out.write(''.join(batch).encode('utf-8'))
+            batch.clear()
+    out.write(''.join(batch).encode('utf-8'))
+    return summary
@@ -0,0 +1,403 @@
+from itertools import combinations, product
+import math
+import operator
+
+# Построение покрывающих массивов силы t алгоритмом IPOG
+# (Lei, Kacker, Kuhn и др., "IPOG: A General Strategy for T-Way Software Testing").
+# Значения параметров кодируются целыми числами 0..n-1, поэтому модуль не зависит
+# от aiogram и может выполняться в пуле процессов.
+
+MIN_STRENGTH = 2
+MAX_STRENGTH = 4
+MAX_FREE_CANDIDATES = 64  # Сколько вариантов заполнения свободных позиций перебирать
+COMPLETION_LIMIT = 10_000  # Сколько тупиков допускается при поиске допустимого заполнения строки
+
+
+class _SearchLimit(Exception):
+    pass
+
+
+class _Rules:
+    """Запрещенные сочетания значений, разложенные для быстрых проверок.
+
+    by_term[column][value] — остальные пары каждого правила, в которое входит
+    это значение: проверка назначения смотрит только на правила с ним.
+    """
+
+    def __init__(self, rules: list, domains: list):
+        self.domains = domains
+        self.rules = []
+        self.by_term = [[[] for _ in range(size)] for size in domains]
+        for rule in rules:
+            terms = {}
+            for column, value in rule:
+                terms.setdefault(column, set()).add(value)
+            # Правило с двумя значениями одного параметра никогда не выполняется
+            if any(len(values) > 1 for values in terms.values()):
+                continue
+            terms = tuple(sorted((column, values.pop()) for column, values in terms.items()))
+            self.rules.append(terms)
+            for column, value in terms:
+                self.by_term[column][value].append(tuple(term for term in terms if term[0] != column))
+
+    def allows(self, row: list, column: int, value: int) -> bool:
+        """Не нарушает ли value в позиции column правил с уже заполненными позициями row"""
+        for others in self.by_term[column][value]:
+            for c, v in others:
+                if c >= len(row) or row[c] != v:
+                    break
+            else:
+                return False
+        return True
+
+    def complete(self, row: list, prefer: int = 0, optimistic: bool = False):
+        """Допустимое заполнение свободных позиций и еще не построенных столбцов.
+
+        Перебор с возвратом и проверкой вперед: после каждого назначения из
+        соседних по правилам позиций убираются ставшие недопустимыми значения,
+        первой заполняется позиция с наименьшим выбором. Значения пробуются
+        начиная с prefer. Возвращает полную строку или None, если заполнения нет.
+        Если перебор исчерпал COMPLETION_LIMIT тупиков, результат None, а при
+        optimistic=True — исходная строка.
+        """
+        full = list(row) + [None] * (len(self.domains) - len(row))
+        free = [column for column, value in enumerate(full) if value is None]
+        for column, value in enumerate(full):
+            if value is not None and not self.allows(full, column, value):
+                return None
+
+        # Обычно правил немного, и жадное заполнение по порядку находит строку сразу
+        for column in free:
+            size = self.domains[column]
+            for k in range(size):
+                value = (prefer + k) % size
+                if self.allows(full, column, value):
+                    full[column] = value
+                    break
+            else:
+                break
+        else:
+            return full
+        for column in free:
+            full[column] = None
+
+        options = {}
+        for column in free:
+            options[column] = [v for v in range(self.domains[column]) if self.allows(full, column, v)]
+            if not options[column]:
+                return None
+
+        dead_ends = 0
+
+        def search(options):
+            nonlocal dead_ends
+            if not options:
+                return True
+            column = min(options, key=lambda c: len(options[c]))
+            size = self.domains[column]
+            rest = {c: values for c, values in options.items() if c != column}
+            for value in sorted(options[column], key=lambda v: (v - prefer) % size):
+                full[column] = value
+                narrowed = dict(rest)
+                for others in self.by_term[column][value]:
+                    for c, _ in others:
+                        if c in narrowed:
+                            narrowed[c] = [v for v in narrowed[c] if self.allows(full, c, v)]
+                if all(narrowed.values()) and search(narrowed):
+                    return True
+                dead_ends += 1
+                if dead_ends > COMPLETION_LIMIT:
+                    raise _SearchLimit()
+            full[column] = None
+            return False
+
+        try:
+            return full if search(options) else None
+        except _SearchLimit:
+            return row if optimistic else None
+
+    def completable(self, row: list) -> bool:
+        return self.complete(row, optimistic=True) is not None
+
+
+def _assigned(row: list, assignments) -> list:
+    row = list(row)
+    for column, value in assignments:
+        row[column] = value
+    return row
+
+
+def covering_array(sizes: list, strength: int = 2, constraints=()) -> list:
+    """Набор тестов, покрывающий все комбинации значений любых strength параметров.
+
+    sizes — количество значений каждого параметра. constraints — запрещенные
+    сочетания: правило — последовательность пар (параметр, индекс значения),
+    строка недопустима, если в ней выполнены все пары правила. Правила
+    учитываются при построении, и запрещенные комбинации не покрываются.
+    Возвращает список строк, где строка — индексы значений в исходном порядке параметров.
+    """
+    n = len(sizes)
+    if n == 0:
+        return []
+    t = max(1, min(strength, n))
+
+    # Параметры с большим числом значений обрабатываются первыми — так набор получается меньше
+    order = sorted(range(n), key=lambda p: -sizes[p])
+    domains = [sizes[p] for p in order]
+    rules = None
+    if constraints:
+        column_of = {param: column for column, param in enumerate(order)}
+        rules = _Rules([[(column_of[p], value) for p, value in rule] for rule in constraints], domains)
+
+    rows = [list(row) for row in product(*(range(d) for d in domains[:t]))]
+    if rules is not None:
+        rows = [row for row in rows if rules.completable(row)]
+    for column in range(t, n):
+        _extend(rows, domains, column, t, rules)
+
+    result = []
+    for row_index, row in enumerate(rows):
+        if rules is not None:
+            row = rules.complete(row, prefer=row_index)
+            if row is None:
+                continue
+        out = [0] * n
+        for column, param in enumerate(order):
+            value = row[column]
+            # Свободные позиции заполняем по кругу, чтобы значения чаще встречались в наборе
+            out[param] = value if value is not None else row_index % domains[column]
+        result.append(out)
+    return result
+
+
+def _extend(rows: list, domains: list, column: int, t: int, rules: _Rules = None):
+    """Добавление параметра column: горизонтальный и вертикальный рост"""
+    size = domains[column]
+    col_sets = list(combinations(range(column), t - 1))
+
+    # Для каждого набора из t-1 предыдущих столбцов — битовая карта непокрытых
+    # комбинаций; индекс вычисляется в смешанной системе счисления
+    weights = []
+    uncovered = []
+    for cols in col_sets:
+        col_weights = []
+        radix = size
+        for c in reversed(cols):
+            col_weights.append(radix)
+            radix *= domains[c]
+        col_weights.reverse()
+        weights.append(col_weights)
+        uncovered.append(bytearray(b'\x01') * radix)
+
+    if rules is not None:
+        # Запрещенные правилами комбинации сразу считаем покрытыми — их не нужно искать
+        for k, cols in enumerate(col_sets):
+            positions = dict(zip(cols + (column,), weights[k] + [1]))
+            for rule in rules.rules:
+                if all(c in positions for c, _ in rule):
+                    fixed = sum(value * positions[c] for c, value in rule)
+                    free = [c for c in positions if all(c != rc for rc, _ in rule)]
+                    for values in product(*(range(domains[c]) for c in free)):
+                        uncovered[k][fixed + sum(v * positions[c] for v, c in zip(values, free))] = 0
+    remaining = sum(u.count(1) for u in uncovered)
+
+    def pick(row, gains):
+        """Значение column с наибольшим выигрышем, при котором строку еще можно дополнить"""
+        if rules is None:
+            return max(range(size), key=gains.__getitem__)
+        for value in sorted(range(size), key=lambda v: -gains[v]):
+            if rules.allows(row, column, value) and rules.completable(row + [value]):
+                return value
+        return None
+
+    def candidates(row, k):
+        """Комбинации набора k, которые строка может покрыть: (индекс без column, назначения).
+
+        Свободные позиции строки (из вертикального роста) перебираются, если
+        вариантов не слишком много.
+        """
+        base = 0
+        free = []
+        for c, w in zip(col_sets[k], weights[k]):
+            value = row[c]
+            if value is None:
+                free.append((c, w))
+            else:
+                base += value * w
+        if not free:
+            return [(base, ())]
+        if math.prod(domains[c] for c, _ in free) > MAX_FREE_CANDIDATES:
+            return []
+        result = []
+        for values in product(*(range(domains[c]) for c, _ in free)):
+            index = base + sum(value * w for value, (_, w) in zip(values, free))
+            result.append((index, tuple((c, value) for value, (c, _) in zip(values, free))))
+        return result
+
+    def bases(row):
+        """Индексы (без значения column) для строки без свободных позиций"""
+        if t == 2:
+            return [row[c] * w for (c,), (w,) in zip(col_sets, weights)]
+        return [sum(row[c] * w for c, w in zip(cols, ws)) for cols, ws in zip(col_sets, weights)]
+
+    # Горизонтальный рост: каждой строке — значение, покрывающее больше всего новых комбинаций
+    for row in rows:
+        if not remaining:
+            row.append(None)
+            continue
+
+        if None not in row:
+            row_bases = bases(row)
+            gains = [0] * size
+            for u, base in zip(uncovered, row_bases):
+                gains = list(map(operator.add, gains, u[base:base + size]))
+            best = pick(row, gains)
+            row.append(best)
+            if best is None:
+                continue
+            for u, base in zip(uncovered, row_bases):
+                if u[base + best]:
+                    u[base + best] = 0
+                    remaining -= 1
+            continue
+
+        # Строка со свободными позициями: их тоже можно использовать для покрытия
+        gains = [0] * size
+        for k, u in enumerate(uncovered):
+            flags = [0] * size
+            for index, _ in candidates(row, k):
+                flags = list(map(operator.or_, flags, u[index:index + size]))
+            gains = list(map(operator.add, gains, flags))
+        best = pick(row, gains)
+        row.append(best)
+        if best is None:
+            continue
+        for k, u in enumerate(uncovered):
+            for index, assignments in candidates(row, k):
+                if u[index + best] and (
+                        rules is None or not assignments or rules.completable(_assigned(row, assignments))):
+                    u[index + best] = 0
+                    remaining -= 1
+                    for c, value in assignments:
+                        row[c] = value
+                    break
+
+    if not remaining:
+        return
+
+    # Вертикальный рост: оставшиеся комбинации — в свободные позиции строк или в новые строки
+    sets_by_column = [[] for _ in range(column)]
+    for k, cols in enumerate(col_sets):
+        for c in cols:
+            sets_by_column[c].append(k)
+    all_sets = range(len(col_sets))
+
+    open_rows = [row for row in rows if None in row]
+    for k, cols in enumerate(col_sets):
+        u = uncovered[k]
+        position = u.find(1)
+        while position != -1:
+            required = [(c, (position // w) % domains[c]) for c, w in zip(cols, weights[k])]
+            required.append((column, position % size))
+            if rules is not None and not rules.completable(_assigned([None] * (column + 1), required)):
+                # Комбинация запрещена правилами косвенно: ни одна строка не может ее содержать
+                u[position] = 0
+                position = u.find(1, position + 1)
+                continue
+            for row in open_rows:
+                if all(row[c] is None or row[c] == value for c, value in required) and (
+                        rules is None or rules.completable(_assigned(row, required))):
+                    break
+            else:
+                row = [None] * (column + 1)
+                rows.append(row)
+                open_rows.append(row)
+            changed = [c for c, _ in required if row[c] is None]
+            for c, value in required:
+                row[c] = value
+
+            # Заполненные позиции могли покрыть и другие комбинации — проверяем
+            # только наборы столбцов, которые затронуло изменение
+            if column in changed:
+                affected = all_sets
+            else:
+                affected = {k2 for c in changed for k2 in sets_by_column[c]}
+            value = row[column]
+            for k2 in affected:
+                base = 0
+                for c, w in zip(col_sets[k2], weights[k2]):
+                    if row[c] is None:
+                        break
+                    base += row[c] * w
+                else:
+                    uncovered[k2][base + value] = 0
+            position = u.find(1, position + 1)
+
+
+def covering_suite(parameters: dict, strength: int = 2) -> list:
+    """Набор тестов для параметров {имя: [значения]} в виде списков значений"""
+    values = list(parameters.values())
+    rows = covering_array([len(v) for v in values], strength)
+    return [[values[p][index] for p, index in enumerate(row)] for row in rows]
+
+
+def interaction_count(sizes: list, strength: int = 2) -> int:
+    """Количество комбинаций значений, которые должен покрыть набор силы strength.
+
+    Оценка трудоемкости модели: сумма произведений размеров по всем сочетаниям
+    из strength параметров, считается без перебора сочетаний.
+    """
+    t = max(1, min(strength, len(sizes)))
+    counts = [1] + [0] * t
+    for size in sizes:
+        for k in range(t, 0, -1):
+            counts[k] += counts[k - 1] * size
+    return counts[t]
+
+
+def normalize(text: str) -> str:
+    """Имя или значение без различий в регистре и пробелах"""
+    return ' '.join(text.split()).casefold()
+
+
+def canonical_model(parameters: dict, strength: int = 2, constraints=()):
+    """Каноническая форма модели для кэширования.
+
+    Имена и значения нормализуются, значения и параметры сортируются, поэтому
+    переставленные или по-другому записанные модели дают один ключ. Возвращает
+    (ключ, порядок параметров, порядок значений каждого параметра, правила
+    в индексах канонической формы).
+    """
+    values = list(parameters.values())
+    value_orders = [sorted(range(len(v)), key=lambda i, v=v: normalize(v[i])) for v in values]
+    canonical = [
+        (normalize(name), tuple(normalize(values[p][i]) for i in value_orders[p]))
+        for p, name in enumerate(parameters)
+    ]
+    param_order = sorted(range(len(canonical)), key=canonical.__getitem__)
+
+    column_of = {p: j for j, p in enumerate(param_order)}
+    position_of = [{i: j for j, i in enumerate(order)} for order in value_orders]
+    rules = tuple(sorted({
+        tuple(sorted((column_of[p], position_of[p][i]) for p, i in rule))
+        for rule in constraints
+    }))
+    key = (strength, tuple(canonical[p] for p in param_order), rules)
+    return key, param_order, value_orders, rules
+
+
+def canonical_array(parameters: dict, strength: int, param_order: list, constraints=()) -> list:
+    """Покрывающий массив в индексах канонической формы модели"""
+    values = list(parameters.values())
+    return covering_array([len(values[p]) for p in param_order], strength, constraints)
+
+
+def from_canonical(rows: list, param_order: list, value_orders: list) -> list:
+    """Перевод строк канонической формы в индексы значений в исходном порядке параметров"""
+    result = []
+    for row in rows:
+        combo = [0] * len(param_order)
+        for j, p in enumerate(param_order):
+            combo[p] = value_orders[p][row[j]]
+        result.append(combo)
+    return result
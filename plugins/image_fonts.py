@@ -0,0 +1,56 @@
+from functools import lru_cache
+from pathlib import Path
+from PIL import Image, ImageDraw, ImageFont
+import io
+import logging
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Размеры, для которых подписи считаются заранее при запуске воркера
+COMMON_SIZES = [
+    (100, 100), (200, 200), (300, 300), (400, 400), (500, 500), (600, 400),
+    (800, 600), (1000, 1000), (1024, 768), (1280, 720), (1920, 1080), (5000, 5000)
+]
+LABEL_FORMATS = ['jpg', 'png', 'gif', 'bmp']
+
+_font_data = None
+_measure = ImageDraw.Draw(Image.new('L', (1, 1)))
+
+def _load_font_data() -> bytes:
+    """Однократное чтение файла шрифта в память"""
+    global _font_data
+    if _font_data is None:
+        _font_data = b''
+        if Config.LABEL_FONT_PATH:
+            try:
+                _font_data = Path(Config.LABEL_FONT_PATH).read_bytes()
+            except OSError as e:
+                logger.warning(f"Не удалось загрузить шрифт {Config.LABEL_FONT_PATH}: {e}")
+    return _font_data
+
+def font_size_bucket(width: int, height: int) -> int:
+    """Размер шрифта подписи, округленный, чтобы кэш шрифтов оставался небольшим"""
+    size = max(1, min(width, height) // 10)
+    return size if size <= 32 else size - size % 4
+
+@lru_cache(maxsize=128)
+def get_font(size: int) -> ImageFont.FreeTypeFont:
+    data = _load_font_data()
+    if data:
+        return ImageFont.truetype(io.BytesIO(data), size=size)
+    # Встроенный в Pillow масштабируемый шрифт — не зависит от шрифтов системы
+    return ImageFont.load_default(size=size)
+
+def label_text(width: int, height: int, ext: str) -> str:
+    return f"{width}x{height}\n.{ext}"
+
+@lru_cache(maxsize=1024)
+def label_bbox(text: str, size: int) -> tuple:
+    return _measure.textbbox((0, 0), text, font=get_font(size))
+
+def preload_fonts():
+    """Загрузка шрифта и расчет подписей для популярных размеров (инициализатор воркера)"""
+    for width, height in COMMON_SIZES:
+        for ext in LABEL_FORMATS:
+            label_bbox(label_text(width, height, ext), font_size_bucket(width, height))
@@ -1,11 +1,25 @@
-from aiogram.types import Message, BufferedInputFile, ReplyKeyboardMarkup, KeyboardButton
+from aiogram.types import (
+    Message, BufferedInputFile, FSInputFile, InputMediaDocument, ReplyKeyboardMarkup, KeyboardButton
+)
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from PIL import Image, ImageDraw, ImageFont
-import io
+import asyncio
 import logging
+import mmap
+import os
 import re
-from messages import get_back_menu, get_main_menu, WELCOME_MSG
+import tempfile
+import uuid
+import zipfile
+from cache import BytesCache, FileIdStore
+from config import Config
+from input_files import SpooledInputFile
+from messages import get_back_menu, get_main_menu, WELCOME_MSG, MENU_MSG
+from plugins.image_fonts import preload_fonts
+from plugins.image_padding import write_padded
+from plugins.image_renderer import RenderedImage, render_spilled
+from workers import AdmissionController, WorkerPool, WorkerTimeoutError, JobCancelledError
 
 logger = logging.getLogger(__name__)
 
@@ -13,12 +27,48 @@ logger = logging.getLogger(__name__)
 MAX_SIZE = 5000
 SUPPORTED_FORMATS = ['jpg', 'jpeg', 'png', 'gif', 'bmp']
 DEFAULT_COLOR = (255, 255, 255)  # Белый
-TEXT_COLOR = (0, 0, 0)  # Черный
+BATCH_FORMATS = ['jpg', 'png', 'gif', 'bmp']
+TARGET_SIZE_UNITS = {'b': 1, 'б': 1, 'kb': 1024, 'кб': 1024, 'mb': 1024 * 1024, 'мб': 1024 * 1024}
+MAX_TARGET_SIZE = 50 * 1024 * 1024  # Лимит Bot API на отправку файлов
+TARGET_DEFAULT_SIZE = 100  # Размер изображения, если указан только размер файла
+BATCH_BUTTON = "Пакет изображений"
+MEDIA_GROUP_LIMIT = 10  # Максимум файлов в одной медиагруппе Telegram
+MEDIA_GROUP_MAX_BYTES = 20 * 1024 * 1024  # Больший объем отправляем одним ZIP-архивом
+
+render_pool = WorkerPool("render", Config.RENDER_WORKERS, Config.RENDER_TIMEOUT, initializer=preload_fonts)
+pixel_budget = AdmissionController("pixels", Config.RENDER_PIXEL_BUDGET)
+image_cache = BytesCache("images", Config.IMAGE_CACHE_BYTES, Config.IMAGE_CACHE_DIR)
+file_ids = FileIdStore(Config.IMAGE_FILE_IDS_PATH)
 
 class ImageGeneratorStates(StatesGroup):
     waiting_for_format = State()
     waiting_for_params = State()
     waiting_for_choice = State()  # Новое состояние для выбора действия
+    waiting_for_batch = State()  # Параметры пакетной генерации
+
+def parse_hex_color(hex_color: str) -> tuple:
+    if not re.match(r'^#(?:[0-9a-fA-F]{3}){1,2}$', hex_color):
+        raise ValueError("Неверный формат цвета. Используйте HEX (например: #FF5733)")
+    hex_color = hex_color.lstrip('#')
+    if len(hex_color) == 3:
+        hex_color = ''.join(c * 2 for c in hex_color)
+    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+
+def parse_target_size(token: str):
+    """Размер файла в байтах из '500KB', '2MB', '1.5мб', '1000B' или None"""
+    match = re.fullmatch(r'(\d+(?:[.,]\d+)?)(b|б|kb|кб|mb|мб)', token.lower())
+    if not match:
+        return None
+    size = int(float(match.group(1).replace(',', '.')) * TARGET_SIZE_UNITS[match.group(2)])
+    if size <= 0 or size > MAX_TARGET_SIZE:
+        raise ValueError(f"Размер файла должен быть от 1 байта до {MAX_TARGET_SIZE // 1024 // 1024} МБ")
+    return size
+
+def check_size(width: int, height: int):
+    if width <= 0 or height <= 0:
+        raise ValueError("Размеры должны быть положительными числами")
+    if width > MAX_SIZE or height > MAX_SIZE:
+        raise ValueError(f"Максимальный размер: {MAX_SIZE}px")
 
 async def generate_image_command(message: Message, state: FSMContext):
     await state.set_state(ImageGeneratorStates.waiting_for_format)
@@ -27,6 +77,7 @@ async def generate_image_command(message: Message, state: FSMContext):
         keyboard=[
             [KeyboardButton(text="JPG"), KeyboardButton(text="PNG")],
             [KeyboardButton(text="GIF"), KeyboardButton(text="BMP")],
+            [KeyboardButton(text=BATCH_BUTTON)],
             [KeyboardButton(text="Назад в меню")]
         ],
         resize_keyboard=True
@@ -51,6 +102,10 @@ async def process_format_choice(message: Message, state: FSMContext):
         "BMP": "bmp"
     }
     
+    if message.text == BATCH_BUTTON:
+        await send_batch_prompt(message, state)
+        return
+    
     if message.text not in format_map:
         await message.answer("Пожалуйста, выберите формат из предложенных вариантов")
         return
@@ -74,12 +129,14 @@ async def send_size_prompt(message: Message, state: FSMContext):
         "📏 Теперь введите параметры изображения:\n"
         "• <code>размер</code> - для квадратного изображения\n"
         "• <code>ширина высота</code> - для прямоугольного\n"
-        "• Можно добавить цвет в формате #RRGGBB\n\n"
+        "• Можно добавить цвет в формате #RRGGBB\n"
+        "• Можно указать точный размер файла: <code>500KB</code>, <code>2MB</code>\n\n"
         "📋 Примеры:\n"
         f"<code>{examples}</code>\n\n"
         "Например:\n"
         f"<code>500</code> - квадрат 500x500\n"
-        f"<code>800 600 #FF0000</code> - красный прямоугольник\n\n"
+        f"<code>800 600 #FF0000</code> - красный прямоугольник\n"
+        f"<code>300 5MB</code> - квадрат 300x300, файл ровно 5 МБ\n\n"
         "❓ Просто введите нужные параметры в чат",
         parse_mode="HTML",
         reply_markup=ReplyKeyboardMarkup(
@@ -106,6 +163,14 @@ async def process_image_params(message: Message, state: FSMContext):
         ext = data['format']
         parts = message.text.split()
         
+        # Точный размер файла (например, 2MB) можно указать в любом месте
+        target_sizes = [size for size in map(parse_target_size, parts) if size is not None]
+        if len(target_sizes) > 1:
+            raise ValueError("Укажите только один размер файла")
+        target_size = target_sizes[0] if target_sizes else None
+        if target_size is not None:
+            parts = [part for part in parts if parse_target_size(part) is None] or [str(TARGET_DEFAULT_SIZE)]
+        
         # Определяем параметры
         if len(parts) == 1:
             if parts[0].startswith('#'):
@@ -130,40 +195,14 @@ async def process_image_params(message: Message, state: FSMContext):
             raise ValueError("Неверное количество параметров")
 
         if 'hex_color' in locals():
-            if not re.match(r'^#(?:[0-9a-fA-F]{3}){1,2}$', hex_color):
-                raise ValueError("Неверный формат цвета. Используйте HEX (например: #FF5733)")
-            hex_color = hex_color.lstrip('#')
-            color = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-
-        if width <= 0 or height <= 0:
-            raise ValueError("Размеры должны быть положительными числами")
-        if width > MAX_SIZE or height > MAX_SIZE:
-            raise ValueError(f"Максимальный размер: {MAX_SIZE}px")
-        
-        img = Image.new('RGB', (width, height), color=color)
-        d = ImageDraw.Draw(img)
-        
-        try:
-            font = ImageFont.truetype("arial.ttf", size=min(width, height)//10)
-        except:
-            font = ImageFont.load_default()
-        
-        text = f"{width}x{height}\n.{ext}"
-        text_bbox = d.textbbox((0, 0), text, font=font)
-        x = (width - (text_bbox[2] - text_bbox[0])) / 2
-        y = (height - (text_bbox[3] - text_bbox[1])) / 2
-        d.text((x, y), text, font=font, fill=TEXT_COLOR)
-        
-        img_byte_arr = io.BytesIO()
-        img.save(img_byte_arr, format=ext if ext != 'jpg' else 'JPEG')
+            color = parse_hex_color(hex_color)
+
+        check_size(width, height)
         
-        await message.answer_photo(
-            photo=BufferedInputFile(
-                file=img_byte_arr.getvalue(),
-                filename=f"image_{width}x{height}.{ext}"
-            ),
-            caption=f"✅ Готово! {width}x{height}.{ext}"
-        )
+        if target_size is not None:
+            await send_sized_image(message, width, height, color, ext, target_size)
+        else:
+            await send_image(message, width, height, color, ext)
         
         # Предлагаем создать еще или вернуться в меню
         keyboard = ReplyKeyboardMarkup(
@@ -182,11 +221,259 @@ async def process_image_params(message: Message, state: FSMContext):
         
     except ValueError as e:
         await message.answer(f"❌ Ошибка: {e}\nПопробуйте еще раз")
+    except JobCancelledError:
+        logger.info(f"Image generation cancelled by user {message.from_user.id}")
+    except WorkerTimeoutError as e:
+        logger.warning(f"Image generation timeout: {e}")
+        await message.answer("⏳ Изображение генерировалось слишком долго. Попробуйте размер поменьше")
     except Exception as e:
         logger.error(f"Image generation error: {e}", exc_info=True)
         await message.answer("⚠️ Ошибка при создании изображения")
         await state.clear()
 
+async def get_rendered_image(width: int, height: int, color: tuple, ext: str, owner=None) -> RenderedImage:
+    """Готовое изображение из кэша или после рендеринга в пуле процессов.
+
+    Большие результаты приходят временным файлом (path), который вызывающий
+    код должен удалить через discard() после отправки.
+    """
+    cache_key = (width, height, color, ext)
+    # Популярные изображения отдаем из кэша, не обращаясь к Pillow
+    image_bytes = await asyncio.to_thread(image_cache.get, cache_key)
+    if image_bytes is not None:
+        return RenderedImage(image_bytes, None, len(image_bytes))
+
+    # Рендеринг в отдельном процессе: большие изображения не блокируют остальных пользователей.
+    # Одновременно в работе не больше RENDER_PIXEL_BUDGET пикселей, остальные ждут.
+    # Файл для большого результата назначает бот: воркер, убитый по таймауту
+    # или /cancel, не успеет его удалить
+    spill_path = os.path.join(Config.RENDER_SPILL_DIR or tempfile.gettempdir(), f"render_{uuid.uuid4().hex}.{ext}")
+    try:
+        async with pixel_budget.acquire(width * height):
+            rendered = await render_pool.run(
+                render_spilled, width, height, color, ext, Config.SPOOL_MAX_MEMORY, spill_path,
+                owner=owner
+            )
+    except BaseException:
+        RenderedImage(None, spill_path, 0).discard()
+        raise
+    # В памяти кэшируем только небольшие результаты, большие повторно отправляются по file_id
+    if rendered.data is not None:
+        await asyncio.to_thread(image_cache.put, cache_key, rendered.data)
+    return rendered
+
+def as_input_file(rendered: RenderedImage, filename: str):
+    """Файл для отправки: из памяти или потоком с диска"""
+    if rendered.path:
+        return FSInputFile(rendered.path, filename=filename)
+    return BufferedInputFile(rendered.data, filename=filename)
+
+async def send_image(message: Message, width: int, height: int, color: tuple, ext: str):
+    """Отправка изображения: по file_id, из кэша или после рендеринга"""
+    cache_key = (width, height, color, ext)
+    caption = f"✅ Готово! {width}x{height}.{ext}"
+
+    # Такое изображение уже загружали — отправляем по file_id без повторной загрузки
+    file_id = file_ids.get(cache_key)
+    if file_id:
+        try:
+            await message.answer_photo(photo=file_id, caption=caption)
+            return
+        except TelegramBadRequest as e:
+            logger.info(f"Stale file_id for {cache_key}: {e}")
+            file_ids.discard(cache_key)
+
+    rendered = await get_rendered_image(width, height, color, ext, owner=message.from_user.id)
+    try:
+        sent = await message.answer_photo(
+            photo=as_input_file(rendered, f"image_{width}x{height}.{ext}"),
+            caption=caption
+        )
+    finally:
+        rendered.discard()
+    file_ids.put(cache_key, sent.photo[-1].file_id)
+
+async def send_sized_image(message: Message, width: int, height: int, color: tuple, ext: str, target_size: int):
+    """Отправка документом изображения, дополненного ровно до target_size байт"""
+    rendered = await get_rendered_image(width, height, color, ext, owner=message.from_user.id)
+    try:
+        if rendered.size > target_size:
+            raise ValueError(
+                f"Изображение {width}x{height}.{ext} занимает {rendered.size} байт, "
+                f"это больше {target_size} байт. Уменьшите размеры"
+            )
+
+        # Большие файлы уходят из памяти на диск и отправляются потоком
+        with tempfile.SpooledTemporaryFile(max_size=Config.SPOOL_MAX_MEMORY) as spool:
+            await asyncio.to_thread(_write_padded_rendered, rendered, ext, target_size, spool)
+            await message.answer_document(
+                SpooledInputFile(spool, filename=f"image_{width}x{height}_{target_size}b.{ext}"),
+                caption=f"✅ Готово! {width}x{height}.{ext}, ровно {target_size} байт"
+            )
+    finally:
+        rendered.discard()
+
+def _write_padded_rendered(rendered: RenderedImage, ext: str, target_size: int, out):
+    if rendered.data is not None:
+        write_padded(rendered.data, ext, target_size, out)
+        return
+    # Большой файл не читаем в память целиком, а отображаем через mmap
+    with open(rendered.path, 'rb') as source, mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with memoryview(mapped) as view:
+            write_padded(view, ext, target_size, out)
+
+async def send_batch_prompt(message: Message, state: FSMContext):
+    await message.answer(
+        "🗂 <b>Пакетная генерация</b>\n\n"
+        "Введите через пробел или запятую:\n"
+        "• размеры: <code>500</code> или <code>800x600</code>\n"
+        "• форматы (необязательно, по умолчанию все): <code>jpg png gif bmp</code>\n"
+        "• цвет (необязательно): <code>#RRGGBB</code>\n\n"
+        "📋 Примеры:\n"
+        "<code>100, 1000, 5000</code> - все форматы, 12 изображений\n"
+        "<code>800x600 1024x768 png jpg #00FF00</code> - 4 зеленых изображения\n\n"
+        f"До {MEDIA_GROUP_LIMIT} небольших файлов придут альбомом, остальное - ZIP-архивом "
+        f"(не более {Config.BATCH_MAX_IMAGES} изображений за раз)",
+        parse_mode="HTML",
+        reply_markup=ReplyKeyboardMarkup(
+            keyboard=[
+                [KeyboardButton(text="Назад")],
+                [KeyboardButton(text="Назад в меню")]
+            ],
+            resize_keyboard=True
+        )
+    )
+    await state.set_state(ImageGeneratorStates.waiting_for_batch)
+
+def parse_batch_params(text: str) -> list:
+    """Разбор пакетного запроса в список (ширина, высота, цвет, формат)"""
+    sizes, formats, color = [], [], DEFAULT_COLOR
+    for token in re.split(r'[\s,;]+', text.strip().lower()):
+        if not token:
+            continue
+        size_match = re.fullmatch(r'(\d+)(?:[xх×*](\d+))?', token)
+        if token.startswith('#'):
+            color = parse_hex_color(token)
+        elif token.lstrip('.') in SUPPORTED_FORMATS:
+            ext = token.lstrip('.')
+            formats.append('jpg' if ext == 'jpeg' else ext)
+        elif size_match:
+            width = int(size_match.group(1))
+            height = int(size_match.group(2) or width)
+            check_size(width, height)
+            sizes.append((width, height))
+        else:
+            raise ValueError(f"Непонятный параметр: {token}")
+
+    if not sizes:
+        raise ValueError("Укажите хотя бы один размер")
+    specs = list(dict.fromkeys(
+        (width, height, color, ext)
+        for ext in (dict.fromkeys(formats) or BATCH_FORMATS)
+        for width, height in sizes
+    ))
+    if len(specs) > Config.BATCH_MAX_IMAGES:
+        raise ValueError(f"Слишком много изображений: {len(specs)}, максимум {Config.BATCH_MAX_IMAGES}")
+    return specs
+
+def _write_zip_entry(archive: zipfile.ZipFile, name: str, rendered: RenderedImage):
+    # Заливка одним цветом сжимается очень хорошо, особенно BMP
+    if rendered.path:
+        archive.write(rendered.path, arcname=name, compress_type=zipfile.ZIP_DEFLATED)
+    else:
+        archive.writestr(name, rendered.data, compress_type=zipfile.ZIP_DEFLATED)
+
+async def process_batch_params(message: Message, state: FSMContext):
+    if message.text == "Назад":
+        await generate_image_command(message, state)
+        return
+    elif message.text == "Назад в меню":
+        await state.clear()
+        await message.answer(MENU_MSG, reply_markup=get_main_menu())
+        return
+
+    try:
+        specs = parse_batch_params(message.text)
+    except ValueError as e:
+        await message.answer(f"❌ Ошибка: {e}\nПопробуйте еще раз")
+        return
+
+    owner = message.from_user.id
+    progress = await message.answer(f"⏳ Генерирую изображения: 0/{len(specs)}")
+    archive_path = None
+    tasks = []
+    try:
+        async def render(spec):
+            return spec, await get_rendered_image(*spec, owner=owner)
+
+        # Все изображения рендерятся параллельно в пуле процессов и по мере
+        # готовности дописываются в архив во временном файле
+        with tempfile.NamedTemporaryFile(suffix='.zip', delete=False) as archive_file:
+            archive_path = archive_file.name
+        media = []
+        media_bytes = 0
+        with zipfile.ZipFile(archive_path, 'w') as archive:
+            tasks = [asyncio.ensure_future(render(spec)) for spec in specs]
+            for done, task in enumerate(asyncio.as_completed(tasks), 1):
+                (width, height, color, ext), rendered = await task
+                filename = f"image_{width}x{height}.{ext}"
+                try:
+                    await asyncio.to_thread(_write_zip_entry, archive, filename, rendered)
+                finally:
+                    rendered.discard()
+                if len(specs) <= MEDIA_GROUP_LIMIT and rendered.data is not None:
+                    media.append((filename, rendered.data))
+                    media_bytes += rendered.size
+                if done % 5 == 0 and done < len(specs):
+                    await progress.edit_text(f"⏳ Генерирую изображения: {done}/{len(specs)}")
+
+        caption = f"✅ Готово! Изображений: {len(specs)}"
+        if len(media) == len(specs) >= 2 and media_bytes <= MEDIA_GROUP_MAX_BYTES:
+            media.sort()
+            await message.answer_media_group([
+                InputMediaDocument(
+                    media=BufferedInputFile(image_bytes, filename=filename),
+                    caption=caption if i == len(media) - 1 else None
+                )
+                for i, (filename, image_bytes) in enumerate(media)
+            ])
+        else:
+            await message.answer_document(
+                FSInputFile(archive_path, filename=f"images_{len(specs)}.zip"),
+                caption=caption
+            )
+        await progress.delete()
+
+        keyboard = ReplyKeyboardMarkup(
+            keyboard=[
+                [KeyboardButton(text="Создать ещё")],
+                [KeyboardButton(text="Назад в меню")]
+            ],
+            resize_keyboard=True
+        )
+        await message.answer("Хотите создать ещё изображения?", reply_markup=keyboard)
+        await state.set_state(ImageGeneratorStates.waiting_for_choice)
+
+    except JobCancelledError:
+        logger.info(f"Batch image generation cancelled by user {owner}")
+    except WorkerTimeoutError as e:
+        logger.warning(f"Batch image generation timeout: {e}")
+        await message.answer("⏳ Изображения генерировались слишком долго. Уменьшите размеры или количество")
+    except Exception as e:
+        logger.error(f"Batch image generation error: {e}", exc_info=True)
+        await message.answer("⚠️ Ошибка при создании изображений")
+        await state.clear()
+    finally:
+        # При ошибке или отмене не оставляем висящих задач рендеринга и их
+        # временных файлов, в том числе у уже готовых, но не записанных в архив
+        for task in tasks:
+            task.cancel()
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, tuple):
+                result[1].discard()
+        if archive_path:
+            os.remove(archive_path)
+
 async def handle_choice(message: Message, state: FSMContext):
     if message.text == "Создать ещё":
         await generate_image_command(message, state)
@@ -0,0 +1,102 @@
+import struct
+import zlib
+
+# Дополнение уже закодированного изображения до точного размера файла.
+# Данные добавляются туда, где формат это допускает (служебные блоки),
+# поэтому изображение остается корректным и кодируется только один раз.
+
+PNG_PAD_CHUNK = b'qaPd'  # Вспомогательный приватный chunk, декодеры его пропускают
+JPEG_SEGMENT_MAX = 65537  # Маркер COM (2) + длина (2) + до 65533 байт данных
+GIF_BLOCK_MAX = 256  # Длина подблока (1) + до 255 байт данных
+WRITE_CHUNK = 1024 * 1024
+
+
+def _write_zeros(out, count: int):
+    zeros = bytes(min(count, WRITE_CHUNK))
+    while count > 0:
+        out.write(zeros[:count])
+        count -= len(zeros)
+
+
+def _pad_png(data: bytes, gap: int, out):
+    # Перед IEND (последние 12 байт) вставляем chunk нужной длины
+    out.write(data[:-12])
+    length = gap - 12
+    out.write(struct.pack('>I', length) + PNG_PAD_CHUNK)
+    crc = zlib.crc32(PNG_PAD_CHUNK)
+    zeros = bytes(min(length, WRITE_CHUNK))
+    remaining = length
+    while remaining > 0:
+        block = zeros[:remaining]
+        crc = zlib.crc32(block, crc)
+        out.write(block)
+        remaining -= len(block)
+    out.write(struct.pack('>I', crc & 0xFFFFFFFF))
+    out.write(data[-12:])
+
+
+def _pad_jpeg(data: bytes, gap: int, out):
+    # Сразу после SOI — сегменты комментариев COM
+    out.write(data[:2])
+    remaining = gap
+    full_segment = b'\xff\xfe' + struct.pack('>H', JPEG_SEGMENT_MAX - 2) + bytes(JPEG_SEGMENT_MAX - 4)
+    while remaining:
+        size = min(remaining, JPEG_SEGMENT_MAX)
+        if 0 < remaining - size < 4:
+            size -= 4
+        if size == JPEG_SEGMENT_MAX:
+            out.write(full_segment)
+        else:
+            out.write(b'\xff\xfe' + struct.pack('>H', size - 2) + bytes(size - 4))
+        remaining -= size
+    out.write(data[2:])
+
+
+def _pad_gif(data: bytes, gap: int, out):
+    # Перед завершающим байтом ';' — расширение комментария из подблоков
+    out.write(data[:-1])
+    out.write(b'\x21\xfe')
+    remaining = gap - 3
+    full_block = b'\xff' + bytes(GIF_BLOCK_MAX - 1)
+    while remaining:
+        size = min(remaining, GIF_BLOCK_MAX)
+        if remaining - size == 1:
+            size -= 1
+        out.write(full_block if size == GIF_BLOCK_MAX else bytes([size - 1]) + bytes(size - 1))
+        remaining -= size
+    out.write(b'\x00')
+    out.write(data[-1:])
+
+
+def _pad_bmp(data: bytes, gap: int, out):
+    # Данные после растра, размер файла в заголовке обновляется
+    out.write(data[:2])
+    out.write(struct.pack('<I', len(data) + gap))
+    out.write(data[6:])
+    _write_zeros(out, gap)
+
+
+def write_padded(data, ext: str, target_size: int, out):
+    """Запись изображения в out, дополненного ровно до target_size байт.
+
+    data — bytes или memoryview (например, поверх mmap большого файла).
+    """
+    gap = target_size - len(data)
+    if gap < 0:
+        raise ValueError(f"Изображение уже занимает {len(data)} байт, это больше заданного размера")
+
+    if gap == 0:
+        out.write(data)
+    elif ext == 'png' and gap >= 12:
+        _pad_png(data, gap, out)
+    elif ext in ('jpg', 'jpeg') and gap >= 4:
+        _pad_jpeg(data, gap, out)
+    elif ext == 'gif' and (gap == 3 or gap >= 5):
+        # При зазоре 4 на подблок остался бы 1 байт — он читается как терминатор
+        _pad_gif(data, gap, out)
+    elif ext == 'bmp':
+        _pad_bmp(data, gap, out)
+    else:
+        # Слишком маленький зазор для служебного блока — данные после конца файла
+        out.write(data)
+        _write_zeros(out, gap)
@@ -0,0 +1,184 @@
+from PIL import Image, ImageDraw
+from typing import NamedTuple, Optional
+import io
+import math
+import os
+import struct
+from plugins.image_fonts import font_size_bucket, get_font, label_bbox, label_text
+
+# Рендеринг выполняется в процессах WorkerPool, поэтому здесь нет ничего,
+# что зависит от aiogram или event loop
+
+TEXT_COLOR = (0, 0, 0)  # Черный
+PALETTE_FORMATS = ['png', 'gif']
+LABEL_MARGIN = 2  # Запас вокруг подписи при сборке BMP, px
+
+class RenderedImage(NamedTuple):
+    """Результат рендеринга: байты небольшого файла или путь к временному файлу"""
+    data: Optional[bytes]
+    path: Optional[str]
+    size: int
+
+    def discard(self):
+        if self.path:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+class _SpillBuffer:
+    """Запись в память, а после превышения порога — в файл spill_path.
+
+    Файл, в отличие от SpooledTemporaryFile, можно передать из процесса-воркера
+    в бот по имени и отправить потоком. Путь выбирает бот: если воркер убит
+    по таймауту или /cancel, бот сам удаляет файл.
+    """
+
+    def __init__(self, max_size: int, spill_path: str):
+        self.max_size = max_size
+        self.spill_path = spill_path
+        self._buffer = io.BytesIO()
+        self._file = None
+
+    def _rollover(self):
+        position = self._buffer.tell()
+        self._file = open(self.spill_path, 'w+b')
+        self._file.write(self._buffer.getbuffer())
+        self._file.seek(position)
+        self._buffer = None
+
+    def write(self, data) -> int:
+        if self._file is None and self._buffer.getbuffer().nbytes + len(data) > self.max_size:
+            self._rollover()
+        return (self._file or self._buffer).write(data)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return (self._file or self._buffer).seek(offset, whence)
+
+    def tell(self) -> int:
+        return (self._file or self._buffer).tell()
+
+    def flush(self):
+        (self._file or self._buffer).flush()
+
+    def result(self) -> RenderedImage:
+        if self._file is None:
+            data = self._buffer.getvalue()
+            return RenderedImage(data, None, len(data))
+        self._file.close()
+        return RenderedImage(None, self._file.name, os.path.getsize(self._file.name))
+
+    def discard(self):
+        if self._file is not None:
+            self._file.close()
+            os.remove(self._file.name)
+
+def render_image(width: int, height: int, color: tuple, ext: str, fast: bool = True) -> bytes:
+    """Отрисовка изображения с подписью размеров и кодирование в нужный формат"""
+    out = io.BytesIO()
+    render_to(out, width, height, color, ext, fast)
+    return out.getvalue()
+
+def render_spilled(width: int, height: int, color: tuple, ext: str,
+                   max_memory: int, spill_path: str) -> RenderedImage:
+    """Рендеринг для пула: до max_memory байт результат возвращается в памяти,
+    больший — пишется сразу в файл spill_path, и бот отправляет его потоком"""
+    out = _SpillBuffer(max_memory, spill_path)
+    try:
+        render_to(out, width, height, color, ext)
+    except BaseException:
+        out.discard()
+        raise
+    return out.result()
+
+def render_to(out, width: int, height: int, color: tuple, ext: str, fast: bool = True):
+    """Кодирование изображения в файловый объект out.
+
+    Изображение — это заливка одним цветом и подпись, поэтому для PNG/GIF и BMP
+    есть быстрый путь (fast=True) без полноценного 24-битного холста.
+    """
+    if fast and ext in PALETTE_FORMATS:
+        _render_palette(out, width, height, color, ext)
+    elif fast and ext == 'bmp':
+        _render_bmp(out, width, height, color, ext)
+    else:
+        _render_rgb(out, width, height, color, ext)
+
+def _label_layout(width: int, height: int, ext: str):
+    """Шрифт, текст подписи, координаты и bbox для центрирования"""
+    # Шрифт и размеры подписи берутся из кэша, без обращения к файловой системе
+    font_size = font_size_bucket(width, height)
+    text = label_text(width, height, ext)
+    text_bbox = label_bbox(text, font_size)
+    x = (width - (text_bbox[2] - text_bbox[0])) / 2
+    y = (height - (text_bbox[3] - text_bbox[1])) / 2
+    return get_font(font_size), text, x, y, text_bbox
+
+def _render_rgb(out, width: int, height: int, color: tuple, ext: str):
+    """Универсальный путь: RGB-холст и стандартный кодировщик Pillow"""
+    img = Image.new('RGB', (width, height), color=color)
+    d = ImageDraw.Draw(img)
+    font, text, x, y, _ = _label_layout(width, height, ext)
+    d.text((x, y), text, font=font, fill=TEXT_COLOR)
+    img.save(out, format=ext if ext != 'jpg' else 'JPEG')
+
+def _blend_palette(color: tuple) -> list:
+    """Палитра из 256 оттенков от фона до цвета текста.
+
+    Индекс — степень покрытия пикселя текстом; смешивание по той же формуле
+    с округлением, что и при выводе текста на RGB-холст в Pillow
+    """
+    palette = []
+    for alpha in range(256):
+        for background, ink in zip(color, TEXT_COLOR):
+            mixed = background * (255 - alpha) + ink * alpha + 128
+            palette.append((mixed + (mixed >> 8)) >> 8)
+    return palette
+
+def _render_palette(out, width: int, height: int, color: tuple, ext: str):
+    """PNG/GIF в палитровом режиме: 1 байт на пиксель.
+
+    Текст со сглаживанием рисуется маской в режиме L, а маска становится
+    индексами палитры оттенков между фоном и цветом текста
+    """
+    img = Image.new('L', (width, height), 0)
+    d = ImageDraw.Draw(img)
+    font, text, x, y, _ = _label_layout(width, height, ext)
+    d.text((x, y), text, font=font, fill=255)
+    img.putpalette(_blend_palette(color))
+    img.save(out, format=ext)
+
+def _render_bmp(out, width: int, height: int, color: tuple, ext: str):
+    """24-битный BMP, собранный из заранее подготовленной строки заливки.
+
+    Отрисовывается только небольшой фрагмент с подписью, остальные строки
+    пишутся из одного и того же буфера без промежуточного холста.
+    """
+    row_size = (width * 3 + 3) & ~3
+    solid_row = bytes(color[::-1]) * width + b'\0' * (row_size - width * 3)
+
+    # Фрагмент с запасом: при дробных координатах сглаживание выходит за bbox.
+    # Начало фрагмента не правее точки вывода текста, иначе меняется субпиксельный сдвиг
+    font, text, x, y, text_bbox = _label_layout(width, height, ext)
+    left = max(0, math.floor(x) - LABEL_MARGIN)
+    top = max(0, math.floor(y) - LABEL_MARGIN)
+    right = min(width, math.ceil(x + text_bbox[2]) + LABEL_MARGIN)
+    bottom = min(height, math.ceil(y + text_bbox[3]) + LABEL_MARGIN)
+
+    label_rows = {}
+    if right > left and bottom > top:
+        patch = Image.new('RGB', (right - left, bottom - top), color=color)
+        ImageDraw.Draw(patch).text((x - left, y - top), text, font=font, fill=TEXT_COLOR)
+        patch_bytes = patch.tobytes('raw', 'BGR')
+        patch_row_size = (right - left) * 3
+        for i in range(bottom - top):
+            row = bytearray(solid_row)
+            row[left * 3:right * 3] = patch_bytes[i * patch_row_size:(i + 1) * patch_row_size]
+            label_rows[top + i] = bytes(row)
+
+    image_size = row_size * height
+    out.write(struct.pack('<2sIHHI', b'BM', 54 + image_size, 0, 0, 54))
+    out.write(struct.pack('<IiiHHIIiiII', 40, width, height, 1, 24, 0, image_size, 0, 0, 0, 0))
+    # В BMP строки хранятся снизу вверх
+    for row_y in range(height - 1, -1, -1):
+        out.write(label_rows.get(row_y, solid_row))
@@ -0,0 +1,211 @@
+from bisect import bisect_left
+from typing import NamedTuple, Optional
+import json
+from plugins.json_schema import format_path
+from plugins.json_tools import JsonResult, parse_json
+
+# Структурное сравнение двух JSON-документов для пула процессов. Объекты
+# сравниваются по ключам, массивы — patience-сопоставлением: элементы
+# приводятся к хэшируемым ключам, общие начало и конец отбрасываются, а
+# элементы, уникальные в обоих массивах, становятся опорными точками
+# (наибольшая возрастающая подпоследовательность). Это почти линейно по
+# размеру массива, в отличие от классического LCS за O(n·m). Несопоставленные
+# элементы между опорами сравниваются попарно по позиции, поэтому изменение
+# одного поля в элементе массива видно как изменение этого поля.
+# Результат — список изменений с путями и JSON Patch (RFC 6902)
+
+PREVIEW_CHARS = 60
+
+
+class DiffResult(NamedTuple):
+    syntax: Optional[JsonResult] = None  # Ошибка разбора одного из документов
+    side: str = ''  # Какой документ не разобрался: expected или actual
+    changes: int = 0
+    preview: tuple = ()  # Первые изменения в читаемом виде
+
+
+def _key(value):
+    """Хэшируемый ключ значения по правилам JSON: 1 == 1.0, но true != 1"""
+    if isinstance(value, bool):
+        return ('bool', value)
+    if isinstance(value, (int, float)):
+        return ('number', value)
+    if isinstance(value, list):
+        return ('array', tuple(_key(item) for item in value))
+    if isinstance(value, dict):
+        return ('object', frozenset((name, _key(item)) for name, item in value.items()))
+    return (type(value).__name__, value)
+
+
+def _element_key(value):
+    """Ключ элемента массива для сопоставления. Вложенные структуры сериализуются
+    C-реализацией json: это в разы быстрее рекурсивного _key. Расхождение с
+    _key только в 1 и 1.0 — такие элементы сравнятся попарно и окажутся равны"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return _key(value)
+
+
+def _preview(value) -> str:
+    text = json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= PREVIEW_CHARS else text[:PREVIEW_CHARS - 3] + '...'
+
+
+def _pointer(path) -> str:
+    """JSON Pointer для JSON Patch: /items/0/name"""
+    tokens = []
+    while path is not None:
+        path, key = path
+        tokens.append(str(key).replace('~', '~0').replace('/', '~1'))
+    return ''.join('/' + token for token in reversed(tokens))
+
+
+def _longest_increasing(pairs: list) -> list:
+    """Наибольшая возрастающая по второму индексу подпоследовательность пар"""
+    tails = []  # Второй индекс последнего элемента цепочки длины k + 1
+    tail_pairs = []
+    previous = []
+    for number, (_, j) in enumerate(pairs):
+        k = bisect_left(tails, j)
+        if k == len(tails):
+            tails.append(j)
+            tail_pairs.append(number)
+        else:
+            tails[k] = j
+            tail_pairs[k] = number
+        previous.append(tail_pairs[k - 1] if k else -1)
+    chain = []
+    number = tail_pairs[-1] if tail_pairs else -1
+    while number >= 0:
+        chain.append(pairs[number])
+        number = previous[number]
+    chain.reverse()
+    return chain
+
+
+def match_sequences(keys_a: list, keys_b: list) -> list:
+    """Пары индексов (i, j) совпавших элементов, по возрастанию (patience diff)"""
+    matched = []
+    ranges = [(0, len(keys_a), 0, len(keys_b))]
+    while ranges:
+        a_lo, a_hi, b_lo, b_hi = ranges.pop()
+        while a_lo < a_hi and b_lo < b_hi and keys_a[a_lo] == keys_b[b_lo]:
+            matched.append((a_lo, b_lo))
+            a_lo += 1
+            b_lo += 1
+        while a_lo < a_hi and b_lo < b_hi and keys_a[a_hi - 1] == keys_b[b_hi - 1]:
+            a_hi -= 1
+            b_hi -= 1
+            matched.append((a_hi, b_hi))
+        if a_lo == a_hi or b_lo == b_hi:
+            continue
+
+        # Ключ -> индекс, если он встречается в диапазоне ровно один раз
+        unique_a = {}
+        for i in range(a_lo, a_hi):
+            unique_a[keys_a[i]] = i if keys_a[i] not in unique_a else -1
+        unique_b = {}
+        for j in range(b_lo, b_hi):
+            key = keys_b[j]
+            if unique_a.get(key, -1) >= 0:
+                unique_b[key] = j if key not in unique_b else -1
+        anchors = _longest_increasing(sorted(
+            (unique_a[key], j) for key, j in unique_b.items() if j >= 0
+        ))
+        # Между опорами — новые диапазоны со своими уникальными элементами
+        for i, j in anchors:
+            matched.append((i, j))
+            ranges.append((a_lo, i, b_lo, j))
+            a_lo, b_lo = i + 1, j + 1
+        if anchors:
+            ranges.append((a_lo, a_hi, b_lo, b_hi))
+    matched.sort()
+    return matched
+
+
+class _Differ:
+    def __init__(self, preview_limit: int):
+        self.preview_limit = preview_limit
+        self.preview = []
+        self.count = 0
+
+    def note(self, line_factory):
+        self.count += 1
+        if len(self.preview) < self.preview_limit:
+            self.preview.append(line_factory())
+
+    def diff(self, a, b, path, patch_path, patch: list):
+        if isinstance(a, dict) and isinstance(b, dict):
+            self.diff_objects(a, b, path, patch_path, patch)
+        elif isinstance(a, list) and isinstance(b, list):
+            self.diff_arrays(a, b, path, patch_path, patch)
+        elif _key(a) != _key(b):
+            patch.append({'op': 'replace', 'path': _pointer(patch_path), 'value': b})
+            self.note(lambda: f"~ {format_path(path)}: {_preview(a)} → {_preview(b)}")
+
+    def diff_objects(self, a: dict, b: dict, path, patch_path, patch: list):
+        for name, value in a.items():
+            if name not in b:
+                patch.append({'op': 'remove', 'path': _pointer((patch_path, name))})
+                self.note(lambda: f"- {format_path((path, name))}: {_preview(value)}")
+            else:
+                self.diff(value, b[name], (path, name), (patch_path, name), patch)
+        for name, value in b.items():
+            if name not in a:
+                patch.append({'op': 'add', 'path': _pointer((patch_path, name)), 'value': value})
+                self.note(lambda: f"+ {format_path((path, name))}: {_preview(value)}")
+
+    def diff_arrays(self, a: list, b: list, path, patch_path, patch: list):
+        keys_a = [_element_key(item) for item in a]
+        keys_b = [_element_key(item) for item in b]
+        matched = match_sequences(keys_a, keys_b) + [(len(a), len(b))]
+
+        # Промежутки между совпадениями. Операции патча для них идут с конца
+        # массива, чтобы индексы в еще не обработанной части не сдвигались
+        gaps = []
+        i = j = 0
+        for next_i, next_j in matched:
+            if next_i > i or next_j > j:
+                gaps.append((i, next_i, j, next_j))
+            i, j = next_i + 1, next_j + 1
+
+        gap_patches = []
+        for a_lo, a_hi, b_lo, b_hi in gaps:
+            gap_patch = []
+            paired = min(a_hi - a_lo, b_hi - b_lo)
+            for k in range(paired):
+                self.diff(a[a_lo + k], b[b_lo + k], (path, b_lo + k), (patch_path, a_lo + k), gap_patch)
+            for i in range(a_hi - 1, a_lo + paired - 1, -1):
+                gap_patch.append({'op': 'remove', 'path': _pointer((patch_path, i))})
+            for i in range(a_lo + paired, a_hi):
+                self.note(lambda: f"- {format_path((path, i))}: {_preview(a[i])}")
+            for k in range(paired, b_hi - b_lo):
+                gap_patch.append({'op': 'add', 'path': _pointer((patch_path, a_lo + k)), 'value': b[b_lo + k]})
+                self.note(lambda: f"+ {format_path((path, b_lo + k))}: {_preview(b[b_lo + k])}")
+            gap_patches.append(gap_patch)
+        for gap_patch in reversed(gap_patches):
+            patch.extend(gap_patch)
+
+
+def diff_values(a, b, preview_limit: int = 30):
+    """Сравнение разобранных значений: (JSON Patch, число изменений, первые изменения)"""
+    differ = _Differ(preview_limit)
+    patch = []
+    differ.diff(a, b, None, None, patch)
+    return patch, differ.count, differ.preview
+
+
+def diff_documents(expected_text: str, actual_text: str, patch_path: str, preview_limit: int = 30) -> DiffResult:
+    """Сравнение двух JSON-текстов; JSON Patch записывается в patch_path"""
+    values = []
+    for side, text in (('expected', expected_text), ('actual', actual_text)):
+        value, syntax = parse_json(text)
+        if syntax is not None:
+            snippet = text[max(0, syntax.pos - 20):syntax.pos + 20]
+            return DiffResult(syntax=syntax._replace(snippet=snippet), side=side)
+        values.append(value)
+
+    patch, count, preview = diff_values(*values, preview_limit)
+    with open(patch_path, 'w', encoding='utf-8') as out:
+        json.dump(patch, out, ensure_ascii=False, indent=2)
+    return DiffResult(changes=count, preview=tuple(preview))
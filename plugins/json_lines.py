@@ -0,0 +1,86 @@
+from typing import NamedTuple
+import csv
+import io
+from plugins.json_schema import ValidationAborted, compiled_schema
+from plugins.json_tools import parse_json
+
+# Проверка JSONL/NDJSON: одна JSON-запись на строку. Файл читается генератором
+# и делится на части, части проверяются в пуле процессов независимо друг от
+# друга, а отчет об ошибках пишется по мере готовности частей
+
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson')
+REPORT_HEADER = ('line', 'column', 'error')
+CHUNK_BYTES = 1024 * 1024  # Часть заканчивается по числу строк или по размеру, что раньше
+
+
+class ChunkResult(NamedTuple):
+    lines: int
+    blank: int
+    invalid: int
+    errors: list  # Строки отчета (номер строки, колонка, сообщение)
+
+
+def is_jsonl(filename: str) -> bool:
+    return (filename or '').lower().endswith(JSONL_EXTENSIONS)
+
+
+def read_chunks(file, max_lines: int, max_bytes: int = CHUNK_BYTES):
+    """Генератор частей (номер первой строки, [байтовые строки]) из бинарного файла"""
+    chunk = []
+    size = 0
+    first = 1
+    for lineno, line in enumerate(file, 1):
+        chunk.append(line)
+        size += len(line)
+        if len(chunk) >= max_lines or size >= max_bytes:
+            yield first, chunk
+            chunk = []
+            size = 0
+            first = lineno + 1
+    if chunk:
+        yield first, chunk
+
+
+def check_chunk(first: int, lines: list, schema_text: str = None) -> ChunkResult:
+    """Проверка части JSONL для пула процессов; схема берется из кэша воркера"""
+    validate = compiled_schema(schema_text) if schema_text else None
+    blank = invalid = 0
+    errors = []
+    for lineno, raw in enumerate(lines, first):
+        try:
+            text = raw.decode('utf-8-sig' if lineno == 1 else 'utf-8').rstrip('\r\n')
+        except UnicodeDecodeError as e:
+            invalid += 1
+            errors.append((lineno, e.start + 1, "Invalid UTF-8"))
+            continue
+        if not text.strip():
+            blank += 1
+            continue
+        value, syntax = parse_json(text)
+        if syntax is not None:
+            invalid += 1
+            errors.append((lineno, syntax.colno, syntax.error))
+            continue
+        if validate is not None:
+            try:
+                violations = validate(value)
+            except ValidationAborted as e:
+                invalid += 1
+                errors.append((lineno, '', str(e)))
+                continue
+            if violations:
+                invalid += 1
+                errors.extend((lineno, '', f"{path}: {message}") for path, message in violations)
+    return ChunkResult(len(lines), blank, invalid, errors)
+
+
+def report_rows(errors: list) -> bytes:
+    """Строки CSV-отчета для части"""
+    out = io.StringIO()
+    csv.writer(out).writerows(errors)
+    return out.getvalue().encode('utf-8')
+
+
+def report_header() -> bytes:
+    # BOM — чтобы Excel открыл отчет в UTF-8
+    return ('\ufeff' + ','.join(REPORT_HEADER) + '\r\n').encode('utf-8')
@@ -0,0 +1,666 @@
+from collections import OrderedDict
+from fractions import Fraction
+from typing import NamedTuple, Optional
+from urllib.parse import unquote
+import hashlib
+import json
+import re
+from config import Config
+from plugins.json_tools import JsonResult, parse_json
+
+# Проверка документов по JSON Schema (основные ключевые слова draft-07 и
+# 2020-12). Схема один раз компилируется в дерево замыканий: регулярные
+# выражения, множества enum и ссылки $ref готовятся заранее, и проверка
+# документа — только вызовы функций. Скомпилированные схемы хранятся в
+# LRU-кэше процесса по хэшу текста схемы, поэтому повторная проверка по тому
+# же контракту не разбирает и не компилирует схему заново. Модуль выполняется
+# в пуле процессов и не зависит от aiogram
+
+# Ключевые слова, без которых результат был бы неверным, а не просто менее строгим
+UNSUPPORTED = ('unevaluatedProperties', 'unevaluatedItems', '$dynamicRef', '$recursiveRef')
+
+_IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_]*\Z')
+
+_compiled = OrderedDict()  # sha256 текста схемы -> функция проверки
+
+
+class SchemaError(ValueError):
+    """Схема некорректна или использует неподдерживаемые возможности"""
+
+
+class ValidationAborted(ValueError):
+    """Документ не удалось проверить: слишком глубокая вложенность или слишком большое число"""
+
+
+class SchemaReport(NamedTuple):
+    schema_error: Optional[str] = None  # Схема не компилируется
+    syntax: Optional[JsonResult] = None  # Документ — не JSON
+    errors: tuple = ()  # Пары (путь, сообщение) для каждого нарушения схемы
+    aborted: Optional[str] = None  # Проверка не выполнена (ValidationAborted)
+
+
+def format_path(path) -> str:
+    """Путь до значения в виде $.items[0].name"""
+    keys = []
+    while path is not None:
+        path, key = path
+        keys.append(key)
+    parts = ['$']
+    for key in reversed(keys):
+        if isinstance(key, int):
+            parts.append(f"[{key}]")
+        elif _IDENTIFIER.match(key):
+            parts.append(f".{key}")
+        else:
+            parts.append(f"[{json.dumps(key, ensure_ascii=False)}]")
+    return ''.join(parts)
+
+
+def _freeze(value):
+    """Ключ для сравнения значений по правилам JSON: 1 == 1.0, но true != 1"""
+    if isinstance(value, bool):
+        return ('bool', value)
+    if isinstance(value, (int, float)):
+        return ('number', value)
+    if isinstance(value, list):
+        return ('array', tuple(_freeze(item) for item in value))
+    if isinstance(value, dict):
+        return ('object', frozenset((key, _freeze(item)) for key, item in value.items()))
+    return (type(value).__name__, value)
+
+
+def _is_integer(value) -> bool:
+    return (isinstance(value, int) and not isinstance(value, bool)) or (
+        isinstance(value, float) and value.is_integer())
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+_TYPES = {
+    'null': lambda value: value is None,
+    'boolean': lambda value: isinstance(value, bool),
+    'integer': _is_integer,
+    'number': _is_number,
+    'string': lambda value: isinstance(value, str),
+    'array': lambda value: isinstance(value, list),
+    'object': lambda value: isinstance(value, dict),
+}
+
+
+def _type_name(value) -> str:
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'boolean'
+    if _is_integer(value):
+        return 'integer'
+    return {float: 'number', str: 'string', list: 'array', dict: 'object'}[type(value)]
+
+
+def _short(value) -> str:
+    text = json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= 40 else text[:37] + '...'
+
+
+class _Compiler:
+    def __init__(self, root):
+        self.root = root
+        self.refs = {}  # JSON Pointer -> скомпилированная схема, заполняется лениво
+
+    def resolve(self, ref: str):
+        if not ref.startswith('#'):
+            raise SchemaError(f"Поддерживаются только локальные ссылки $ref, получено {ref}")
+        pointer = unquote(ref[1:])
+        if pointer and not pointer.startswith('/'):
+            # Именованные якоря ($anchor) не поддерживаются: без ошибки ссылка вела бы на корень схемы
+            raise SchemaError(f"Поддерживаются только ссылки вида #/путь, получено {ref}")
+        node = self.root
+        for token in pointer.split('/')[1:]:
+            token = token.replace('~1', '/').replace('~0', '~')
+            try:
+                node = node[int(token)] if isinstance(node, list) else node[token]
+            except (KeyError, IndexError, ValueError, TypeError):
+                raise SchemaError(f"Ссылка $ref не найдена: {ref}") from None
+        return node
+
+    def ref(self, ref: str):
+        if ref not in self.refs:
+            self.check_ref_chain(ref)
+            self.refs[ref] = None  # Защита от бесконечной рекурсии при компиляции
+            self.refs[ref] = self.compile(self.resolve(ref))
+        refs = self.refs
+
+        def check(value, path, errors):
+            refs[ref](value, path, errors)
+        return check
+
+    def check_ref_chain(self, ref: str):
+        """Цепочка $ref, которая возвращается к себе, не доходя до вложенного
+        значения, проверяла бы одно и то же значение бесконечно"""
+        chain = [ref]
+        target = self.resolve(ref)
+        while isinstance(target, dict) and isinstance(target.get('$ref'), str):
+            next_ref = target['$ref']
+            if next_ref in chain:
+                raise SchemaError(f"Циклическая ссылка $ref: {' → '.join(chain + [next_ref])}")
+            chain.append(next_ref)
+            target = self.resolve(next_ref)
+
+    def compile(self, schema):
+        """Функция check(value, path, errors), дописывающая нарушения в errors"""
+        if schema is True or schema == {}:
+            return lambda value, path, errors: None
+        if schema is False:
+            return lambda value, path, errors: errors.append((path, "значение запрещено схемой"))
+        if not isinstance(schema, dict):
+            raise SchemaError(f"Схема должна быть объектом или true/false, получено {_short(schema)}")
+        for keyword in UNSUPPORTED:
+            if keyword in schema:
+                raise SchemaError(f"Ключевое слово {keyword} не поддерживается")
+
+        checks = []
+        for keyword, build in _KEYWORDS.items():
+            if keyword in schema:
+                check = build(self, schema[keyword], schema)
+                if check is not None:
+                    checks.append(check)
+
+        if len(checks) == 1:
+            return checks[0]
+
+        def check_all(value, path, errors):
+            for check in checks:
+                check(value, path, errors)
+        return check_all
+
+    def compile_list(self, schemas, keyword: str) -> list:
+        if not isinstance(schemas, list) or not schemas:
+            raise SchemaError(f"{keyword} должен быть непустым массивом схем")
+        return [self.compile(schema) for schema in schemas]
+
+
+def _matches(check, value, path) -> bool:
+    errors = []
+    check(value, path, errors)
+    return not errors
+
+
+def _number(keyword, value):
+    if not _is_number(value):
+        raise SchemaError(f"{keyword} должен быть числом")
+    return value
+
+
+def _count(keyword, value):
+    if not _is_integer(value) or value < 0:
+        raise SchemaError(f"{keyword} должен быть неотрицательным целым")
+    return int(value)
+
+
+def _regex(pattern):
+    try:
+        return re.compile(pattern)
+    except (re.error, TypeError) as e:
+        raise SchemaError(f"Некорректное регулярное выражение {_short(pattern)}: {e}") from None
+
+
+def _ref(compiler, ref, schema):
+    if not isinstance(ref, str):
+        raise SchemaError("$ref должен быть строкой")
+    return compiler.ref(ref)
+
+
+def _type(compiler, types, schema):
+    names = [types] if isinstance(types, str) else types
+    if not isinstance(names, list) or any(name not in _TYPES for name in names):
+        raise SchemaError(f"Неизвестный тип: {_short(types)}")
+    tests = [_TYPES[name] for name in names]
+    expected = ' или '.join(names)
+
+    def check(value, path, errors):
+        for test in tests:
+            if test(value):
+                return
+        errors.append((path, f"ожидается {expected}, получено {_type_name(value)}"))
+    return check
+
+
+def _enum(compiler, values, schema):
+    if not isinstance(values, list):
+        raise SchemaError("enum должен быть массивом")
+    allowed = {_freeze(value) for value in values}
+    shown = ', '.join(_short(value) for value in values[:10]) + (', ...' if len(values) > 10 else '')
+
+    def check(value, path, errors):
+        if _freeze(value) not in allowed:
+            errors.append((path, f"значение {_short(value)} не из списка: {shown}"))
+    return check
+
+
+def _const(compiler, expected, schema):
+    frozen = _freeze(expected)
+
+    def check(value, path, errors):
+        if _freeze(value) != frozen:
+            errors.append((path, f"ожидается {_short(expected)}, получено {_short(value)}"))
+    return check
+
+
+def _min_length(compiler, limit, schema):
+    limit = _count('minLength', limit)
+
+    def check(value, path, errors):
+        if isinstance(value, str) and len(value) < limit:
+            errors.append((path, f"строка короче {limit} символов"))
+    return check
+
+
+def _max_length(compiler, limit, schema):
+    limit = _count('maxLength', limit)
+
+    def check(value, path, errors):
+        if isinstance(value, str) and len(value) > limit:
+            errors.append((path, f"строка длиннее {limit} символов"))
+    return check
+
+
+def _pattern(compiler, pattern, schema):
+    regex = _regex(pattern)
+
+    def check(value, path, errors):
+        if isinstance(value, str) and not regex.search(value):
+            errors.append((path, f"строка не соответствует шаблону {pattern}"))
+    return check
+
+
+def _bound(keyword, message, fails):
+    def build(compiler, limit, schema):
+        if isinstance(limit, bool):
+            return None  # Булевы exclusiveMinimum/exclusiveMaximum из draft-04 учтены в minimum/maximum
+        limit = _number(keyword, limit)
+        text = message.format(limit)
+
+        def check(value, path, errors):
+            if _is_number(value) and fails(value, limit):
+                errors.append((path, text))
+        return check
+    return build
+
+
+def _minimum(compiler, limit, schema):
+    if schema.get('exclusiveMinimum') is True:
+        return _bound('minimum', "значение должно быть больше {}", lambda v, l: v <= l)(compiler, limit, schema)
+    return _bound('minimum', "значение меньше {}", lambda v, l: v < l)(compiler, limit, schema)
+
+
+def _maximum(compiler, limit, schema):
+    if schema.get('exclusiveMaximum') is True:
+        return _bound('maximum', "значение должно быть меньше {}", lambda v, l: v >= l)(compiler, limit, schema)
+    return _bound('maximum', "значение больше {}", lambda v, l: v > l)(compiler, limit, schema)
+
+
+def _multiple_of(compiler, divisor, schema):
+    divisor = _number('multipleOf', divisor)
+    if divisor <= 0:
+        raise SchemaError("multipleOf должен быть больше нуля")
+
+    def check(value, path, errors):
+        if not _is_number(value):
+            return
+        if isinstance(value, int) and isinstance(divisor, int):
+            ok = value % divisor == 0
+        else:
+            try:
+                quotient = value / divisor
+                ok = abs(quotient - round(quotient)) <= 1e-9 * max(1.0, abs(quotient))
+            except OverflowError:
+                # Частное не помещается во float — считаем точно
+                ok = Fraction(value) % Fraction(divisor) == 0
+        if not ok:
+            errors.append((path, f"значение не кратно {divisor}"))
+    return check
+
+
+def _items(compiler, items, schema):
+    if isinstance(items, list):
+        # Кортежная форма draft-07: то же, что prefixItems + additionalItems
+        return _prefix(compiler, items, schema.get('additionalItems', True))
+    if 'prefixItems' in schema:
+        return None  # Проверяется вместе с prefixItems
+    item_check = compiler.compile(items)
+
+    def check(value, path, errors):
+        if isinstance(value, list):
+            for index, item in enumerate(value):
+                item_check(item, (path, index), errors)
+    return check
+
+
+def _prefix_items(compiler, items, schema):
+    if not isinstance(items, list):
+        raise SchemaError("prefixItems должен быть массивом схем")
+    return _prefix(compiler, items, schema.get('items', True))
+
+
+def _prefix(compiler, items, rest):
+    checks = [compiler.compile(item) for item in items]
+    rest_check = compiler.compile(rest)
+
+    def check(value, path, errors):
+        if isinstance(value, list):
+            for index, item in enumerate(value):
+                (checks[index] if index < len(checks) else rest_check)(item, (path, index), errors)
+    return check
+
+
+def _min_items(compiler, limit, schema):
+    limit = _count('minItems', limit)
+
+    def check(value, path, errors):
+        if isinstance(value, list) and len(value) < limit:
+            errors.append((path, f"элементов меньше {limit}"))
+    return check
+
+
+def _max_items(compiler, limit, schema):
+    limit = _count('maxItems', limit)
+
+    def check(value, path, errors):
+        if isinstance(value, list) and len(value) > limit:
+            errors.append((path, f"элементов больше {limit}"))
+    return check
+
+
+def _unique_items(compiler, unique, schema):
+    if not unique:
+        return None
+
+    def check(value, path, errors):
+        if isinstance(value, list):
+            seen = {}
+            for index, item in enumerate(value):
+                first = seen.setdefault(_freeze(item), index)
+                if first != index:
+                    errors.append(((path, index), f"повторяет элемент [{first}]"))
+    return check
+
+
+def _contains(compiler, contains, schema):
+    item_check = compiler.compile(contains)
+    least = _count('minContains', schema.get('minContains', 1))
+    most = _count('maxContains', schema['maxContains']) if 'maxContains' in schema else None
+
+    def check(value, path, errors):
+        if not isinstance(value, list):
+            return
+        found = sum(1 for index, item in enumerate(value) if _matches(item_check, item, (path, index)))
+        if found < least:
+            errors.append((path, f"подходящих под contains элементов меньше {least}"))
+        elif most is not None and found > most:
+            errors.append((path, f"подходящих под contains элементов больше {most}"))
+    return check
+
+
+def _required(compiler, names, schema):
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        raise SchemaError("required должен быть массивом строк")
+
+    def check(value, path, errors):
+        if isinstance(value, dict):
+            for name in names:
+                if name not in value:
+                    errors.append(((path, name), "обязательное поле отсутствует"))
+    return check
+
+
+def _properties(compiler, properties, schema):
+    if not isinstance(properties, dict):
+        raise SchemaError("properties должен быть объектом")
+    checks = {name: compiler.compile(subschema) for name, subschema in properties.items()}
+
+    def check(value, path, errors):
+        if isinstance(value, dict):
+            for name, property_check in checks.items():
+                if name in value:
+                    property_check(value[name], (path, name), errors)
+    return check
+
+
+def _pattern_properties(compiler, patterns, schema):
+    if not isinstance(patterns, dict):
+        raise SchemaError("patternProperties должен быть объектом")
+    checks = [(_regex(pattern), compiler.compile(subschema)) for pattern, subschema in patterns.items()]
+
+    def check(value, path, errors):
+        if isinstance(value, dict):
+            for name, item in value.items():
+                for regex, property_check in checks:
+                    if regex.search(name):
+                        property_check(item, (path, name), errors)
+    return check
+
+
+def _additional_properties(compiler, additional, schema):
+    known = set(schema.get('properties', {}))
+    patterns = [_regex(pattern) for pattern in schema.get('patternProperties', {})]
+    if additional is False:
+        def check(value, path, errors):
+            if isinstance(value, dict):
+                for name in value:
+                    if name not in known and not any(regex.search(name) for regex in patterns):
+                        errors.append(((path, name), "лишнее поле не разрешено схемой"))
+        return check
+
+    extra_check = compiler.compile(additional)
+
+    def check(value, path, errors):
+        if isinstance(value, dict):
+            for name, item in value.items():
+                if name not in known and not any(regex.search(name) for regex in patterns):
+                    extra_check(item, (path, name), errors)
+    return check
+
+
+def _min_properties(compiler, limit, schema):
+    limit = _count('minProperties', limit)
+
+    def check(value, path, errors):
+        if isinstance(value, dict) and len(value) < limit:
+            errors.append((path, f"полей меньше {limit}"))
+    return check
+
+
+def _max_properties(compiler, limit, schema):
+    limit = _count('maxProperties', limit)
+
+    def check(value, path, errors):
+        if isinstance(value, dict) and len(value) > limit:
+            errors.append((path, f"полей больше {limit}"))
+    return check
+
+
+def _property_names(compiler, names_schema, schema):
+    name_check = compiler.compile(names_schema)
+
+    def check(value, path, errors):
+        if isinstance(value, dict):
+            for name in value:
+                if not _matches(name_check, name, (path, name)):
+                    errors.append(((path, name), "имя поля не соответствует propertyNames"))
+    return check
+
+
+def _dependencies(compiler, dependencies, schema):
+    """dependentRequired, dependentSchemas и dependencies из draft-07"""
+    if not isinstance(dependencies, dict):
+        raise SchemaError("Зависимости полей должны быть объектом")
+    required = {}
+    schemas = {}
+    for name, dependency in dependencies.items():
+        if isinstance(dependency, list):
+            required[name] = dependency
+        else:
+            schemas[name] = compiler.compile(dependency)
+
+    def check(value, path, errors):
+        if not isinstance(value, dict):
+            return
+        for name, names in required.items():
+            if name in value:
+                for missing in names:
+                    if missing not in value:
+                        errors.append(((path, missing), f"поле обязательно, если есть {name}"))
+        for name, dependent_check in schemas.items():
+            if name in value:
+                dependent_check(value, path, errors)
+    return check
+
+
+def _all_of(compiler, schemas, schema):
+    checks = compiler.compile_list(schemas, 'allOf')
+
+    def check(value, path, errors):
+        for subcheck in checks:
+            subcheck(value, path, errors)
+    return check
+
+
+def _any_of(compiler, schemas, schema):
+    checks = compiler.compile_list(schemas, 'anyOf')
+
+    def check(value, path, errors):
+        if not any(_matches(subcheck, value, path) for subcheck in checks):
+            errors.append((path, "значение не подходит ни под одну из схем anyOf"))
+    return check
+
+
+def _one_of(compiler, schemas, schema):
+    checks = compiler.compile_list(schemas, 'oneOf')
+
+    def check(value, path, errors):
+        matched = sum(1 for subcheck in checks if _matches(subcheck, value, path))
+        if matched != 1:
+            errors.append((path, f"значение подходит под {matched} схем oneOf вместо одной"))
+    return check
+
+
+def _not(compiler, negated, schema):
+    negated_check = compiler.compile(negated)
+
+    def check(value, path, errors):
+        if _matches(negated_check, value, path):
+            errors.append((path, "значение подходит под схему not"))
+    return check
+
+
+def _if(compiler, condition, schema):
+    condition_check = compiler.compile(condition)
+    then_check = compiler.compile(schema.get('then', True))
+    else_check = compiler.compile(schema.get('else', True))
+
+    def check(value, path, errors):
+        if _matches(condition_check, value, path):
+            then_check(value, path, errors)
+        else:
+            else_check(value, path, errors)
+    return check
+
+
+_KEYWORDS = {
+    '$ref': _ref,
+    'type': _type,
+    'enum': _enum,
+    'const': _const,
+    'minLength': _min_length,
+    'maxLength': _max_length,
+    'pattern': _pattern,
+    'minimum': _minimum,
+    'maximum': _maximum,
+    'exclusiveMinimum': _bound('exclusiveMinimum', "значение должно быть больше {}", lambda v, l: v <= l),
+    'exclusiveMaximum': _bound('exclusiveMaximum', "значение должно быть меньше {}", lambda v, l: v >= l),
+    'multipleOf': _multiple_of,
+    'items': _items,
+    'prefixItems': _prefix_items,
+    'minItems': _min_items,
+    'maxItems': _max_items,
+    'uniqueItems': _unique_items,
+    'contains': _contains,
+    'required': _required,
+    'properties': _properties,
+    'patternProperties': _pattern_properties,
+    'additionalProperties': _additional_properties,
+    'minProperties': _min_properties,
+    'maxProperties': _max_properties,
+    'propertyNames': _property_names,
+    'dependentRequired': _dependencies,
+    'dependentSchemas': _dependencies,
+    'dependencies': _dependencies,
+    'allOf': _all_of,
+    'anyOf': _any_of,
+    'oneOf': _one_of,
+    'not': _not,
+    'if': _if,
+}
+
+
+def compile_schema(schema):
+    """Компиляция разобранной схемы в функцию validate(value) -> [(путь, сообщение)]"""
+    check = _Compiler(schema).compile(schema)
+
+    def validate(value) -> list:
+        errors = []
+        try:
+            check(value, None, errors)
+        except RecursionError:
+            raise ValidationAborted("документ слишком глубоко вложен для проверки по этой схеме") from None
+        except OverflowError:
+            raise ValidationAborted("число в документе слишком большое для проверки по этой схеме") from None
+        return [(format_path(path), message) for path, message in errors]
+    return validate
+
+
+def compiled_schema(schema_text: str):
+    """Скомпилированная схема из LRU-кэша процесса; ключ — sha256 текста схемы"""
+    key = hashlib.sha256(schema_text.encode('utf-8')).digest()
+    validate = _compiled.get(key)
+    if validate is not None:
+        _compiled.move_to_end(key)
+        return validate
+
+    schema, syntax = parse_json(schema_text)
+    if syntax is not None:
+        raise SchemaError(f"Схема — не JSON: {syntax.error} (строка {syntax.lineno}, колонка {syntax.colno})")
+    try:
+        validate = compile_schema(schema)
+    except RecursionError:
+        raise SchemaError("Схема слишком глубоко вложена") from None
+    _compiled[key] = validate
+    while len(_compiled) > Config.JSON_SCHEMA_CACHE_SIZE:
+        _compiled.popitem(last=False)
+    return validate
+
+
+def check_schema(schema_text: str) -> Optional[str]:
+    """Компиляция схемы заранее: текст ошибки или None"""
+    try:
+        compiled_schema(schema_text)
+    except SchemaError as e:
+        return str(e)
+    return None
+
+
+def validate_document(schema_text: str, text: str) -> SchemaReport:
+    """Проверка документа по схеме для пула процессов"""
+    try:
+        validate = compiled_schema(schema_text)
+    except SchemaError as e:
+        return SchemaReport(schema_error=str(e))
+    value, syntax = parse_json(text)
+    if syntax is not None:
+        return SchemaReport(syntax=syntax)
+    try:
+        return SchemaReport(errors=tuple(validate(value)))
+    except ValidationAborted as e:
+        return SchemaReport(aborted=str(e))
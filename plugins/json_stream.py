@@ -0,0 +1,188 @@
+import codecs
+import re
+
+from plugins.json_tools import JsonResult
+
+# Потоковая проверка и форматирование JSON-файлов. Документ читается частями,
+# дерево не строится: лексемы проверяются конечным автоматом со стеком скобок
+# и сразу пишутся в выходной файл с отступами. Память ограничена размером
+# части, самой длинной лексемой и глубиной вложенности
+
+READ_CHUNK = 256 * 1024  # Байт за одно чтение
+WRITE_PARTS = 16 * 1024  # Сколько фрагментов вывода копить перед записью
+INDENT = '  '
+SNIPPET_CHARS = 20
+
+_TOKEN = re.compile(r'''
+    [ \t\n\r]*
+    (?:
+        (?P<string>"(?:[^"\\\x00-\x1f]|\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4}))*")
+      | (?P<number>-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?)
+      | (?P<literal>true|false|null)
+      | (?P<punct>[{}\[\]:,])
+    )
+''', re.VERBOSE)
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_STRING_CHAR = re.compile(r'[^"\\\x00-\x1f]*')
+_HEX4 = re.compile(r'[0-9a-fA-F]{4}')
+_NUMBER_TAIL = re.compile(r'[0-9.eE+-]*\Z')  # Число могло оборваться на границе части: "1." или "2e"
+
+# Что автомат ожидает следующим
+VALUE, VALUE_OR_END, KEY, KEY_OR_END, COLON, COMMA_OR_END, END = range(7)
+_EXPECTING = {
+    VALUE: "Expecting value",
+    VALUE_OR_END: "Expecting value",
+    KEY: "Expecting property name enclosed in double quotes",
+    KEY_OR_END: "Expecting property name enclosed in double quotes",
+    COLON: "Expecting ':' delimiter",
+    COMMA_OR_END: "Expecting ',' delimiter",
+    END: "Extra data",
+}
+_CLOSING = {'{': '}', '[': ']'}
+
+
+class _Error(Exception):
+    def __init__(self, message: str, index: int):
+        super().__init__(message)
+        self.message = message
+        self.index = index
+
+
+def _string_error(text: str, start: int):
+    """Причина, по которой не разобралась строка с кавычкой в позиции start"""
+    index = start + 1
+    while True:
+        index = _STRING_CHAR.match(text, index).end()
+        if index >= len(text):
+            return _Error("Unterminated string starting at", start)
+        char = text[index]
+        if char == '"':
+            return None
+        if char != '\\':
+            return _Error("Invalid control character at", index)
+        escape = text[index + 1:index + 2]
+        if escape == 'u':
+            if not _HEX4.fullmatch(text, index + 2, index + 6):
+                return _Error("Invalid \\uXXXX escape", index + 1)
+            index += 6
+        elif escape and escape in '"\\/bfnrt':
+            index += 2
+        else:
+            return _Error("Invalid \\escape", index)
+
+
+def stream_format(src_path: str, dst_path: str) -> JsonResult:
+    """Проверка JSON-файла src_path и запись форматированного документа в dst_path.
+
+    Строки и числа переносятся без изменений, как в исходнике. При ошибке
+    возвращаются строка, колонка и фрагмент текста вокруг нее, как у json.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    text = ''
+    pos = 0
+    final = False
+    line, column_carry = 1, 0  # Номер строки и длина текущей строки до начала буфера
+
+    stack = []
+    indent = '\n'
+    expect = VALUE
+    pending_open = False  # Скобка открыта, но перевод строки еще не записан: вдруг она пустая
+    out = []
+
+    with open(src_path, 'rb') as src, open(dst_path, 'w', encoding='utf-8') as dst:
+        try:
+            while True:
+                for match in _TOKEN.finditer(text, pos):
+                    # Лексема, которая упирается в конец буфера, может продолжиться в следующей части
+                    if match.start() != pos or not final and (
+                            match.end() == len(text) or
+                            match.lastgroup == 'number' and _NUMBER_TAIL.match(text, match.end())):
+                        break
+                    kind = match.lastgroup
+                    token = match[kind]
+
+                    if kind == 'punct':
+                        if token == ',' and expect == COMMA_OR_END:
+                            out.append(',' + indent)
+                            expect = KEY if stack[-1] == '{' else VALUE
+                        elif token == ':' and expect == COLON:
+                            out.append(': ')
+                            expect = VALUE
+                        elif token in '{[' and (expect == VALUE or expect == VALUE_OR_END):
+                            if pending_open:
+                                out.append(indent)
+                            out.append(token)
+                            stack.append(token)
+                            indent += INDENT
+                            pending_open = True
+                            expect = KEY_OR_END if token == '{' else VALUE_OR_END
+                        elif token in '}]' and stack and _CLOSING[stack[-1]] == token and (
+                                expect == COMMA_OR_END or
+                                expect == (KEY_OR_END if token == '}' else VALUE_OR_END)):
+                            stack.pop()
+                            indent = indent[:-len(INDENT)]
+                            if pending_open:
+                                pending_open = False
+                                out.append(token)
+                            else:
+                                out.append(indent + token)
+                            expect = COMMA_OR_END if stack else END
+                        else:
+                            raise _Error(_EXPECTING[expect], match.start(kind))
+                    elif expect == VALUE or expect == VALUE_OR_END or (
+                            kind == 'string' and (expect == KEY or expect == KEY_OR_END)):
+                        if pending_open:
+                            pending_open = False
+                            out.append(indent)
+                        out.append(token)
+                        if expect == KEY or expect == KEY_OR_END:
+                            expect = COLON
+                        else:
+                            expect = COMMA_OR_END if stack else END
+                    else:
+                        raise _Error(_EXPECTING[expect], match.start(kind))
+                    pos = match.end()
+
+                if len(out) >= WRITE_PARTS:
+                    dst.write(''.join(out))
+                    out.clear()
+
+                if not final:
+                    consumed = text[:pos]
+                    newlines = consumed.count('\n')
+                    if newlines:
+                        line += newlines
+                        column_carry = pos - consumed.rfind('\n') - 1
+                    else:
+                        column_carry += pos
+                    data = src.read(READ_CHUNK)
+                    try:
+                        text = text[pos:] + decoder.decode(data, final=not data)
+                    except UnicodeDecodeError as e:
+                        # Ошибка указывается сразу после последнего корректного символа
+                        text = text[pos:] + data[:max(0, e.start)].decode('utf-8', 'ignore')
+                        raise _Error("Invalid UTF-8", len(text)) from None
+                    pos = 0
+                    final = not data
+                    continue
+
+                index = _WHITESPACE.match(text, pos).end()
+                if index == len(text):
+                    if expect == END:
+                        break
+                    raise _Error(_EXPECTING[expect], index)
+                if text[index] == '"' and expect in (VALUE, VALUE_OR_END, KEY, KEY_OR_END):
+                    raise _string_error(text, index) or _Error(_EXPECTING[expect], index)
+                raise _Error(_EXPECTING[expect], index)
+
+            out.append('\n')
+            dst.write(''.join(out))
+        except _Error as e:
+            before = text[:e.index]
+            newlines = before.count('\n')
+            lineno = line + newlines
+            colno = e.index - before.rfind('\n') if newlines else column_carry + e.index + 1
+            snippet = text[max(0, e.index - SNIPPET_CHARS):e.index + SNIPPET_CHARS]
+            return JsonResult('stream', error=e.message, lineno=lineno, colno=colno, snippet=snippet)
+
+    return JsonResult('stream')
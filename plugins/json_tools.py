@@ -0,0 +1,68 @@
+from typing import NamedTuple, Optional
+import json
+
+# Разбор и форматирование JSON для пула процессов. orjson используется, если
+# установлен: он в разы быстрее стандартного json. Модуль не зависит от aiogram
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = 'orjson' if orjson else 'json'
+
+
+class JsonResult(NamedTuple):
+    backend: str  # Чем фактически разобран документ
+    formatted: Optional[str] = None
+    error: Optional[str] = None
+    lineno: int = 0
+    colno: int = 0
+    pos: int = 0
+    snippet: Optional[str] = None  # Фрагмент вокруг ошибки, если исходный текст не в памяти
+
+
+# Стандартный json разбирает рекурсивно: слишком глубокая вложенность дает
+# RecursionError без позиции, поэтому ошибка указывает на начало документа
+TOO_DEEP = JsonResult('json', error="Maximum nesting depth exceeded", lineno=1, colno=1, pos=0)
+
+
+def _stdlib_validate(text: str) -> JsonResult:
+    try:
+        parsed = json.loads(text)
+        return JsonResult('json', json.dumps(parsed, indent=2, ensure_ascii=False))
+    except json.JSONDecodeError as e:
+        return JsonResult('json', error=e.msg, lineno=e.lineno, colno=e.colno, pos=e.pos)
+    except RecursionError:
+        return TOO_DEEP
+
+
+def parse_json(text: str):
+    """Разбор без форматирования: (значение, None) или (None, JsonResult с ошибкой)"""
+    if orjson is not None:
+        try:
+            return orjson.loads(text), None
+        except orjson.JSONDecodeError:
+            pass
+    try:
+        return json.loads(text), None
+    except json.JSONDecodeError as e:
+        return None, JsonResult('json', error=e.msg, lineno=e.lineno, colno=e.colno, pos=e.pos)
+    except RecursionError:
+        return None, TOO_DEEP
+
+
+def validate_json(text: str) -> JsonResult:
+    """Разбор и форматирование с отступом 2.
+
+    При ошибке orjson документ разбирается еще раз стандартным json: он
+    принимает то, что orjson не поддерживает (целые больше 64 бит, NaN),
+    и дает привычные сообщения об ошибках с номером строки и колонки.
+    """
+    if orjson is not None:
+        try:
+            parsed = orjson.loads(text)
+            return JsonResult('orjson', orjson.dumps(parsed, option=orjson.OPT_INDENT_2).decode('utf-8'))
+        except (orjson.JSONDecodeError, orjson.JSONEncodeError):
+            pass
+    return _stdlib_validate(text)
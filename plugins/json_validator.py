@@ -1,27 +1,76 @@
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton
-import json
+from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton, BufferedInputFile, FSInputFile
+from collections import deque
+import asyncio
+import hashlib
+import html
+import io
 import logging
-from messages import get_main_menu, get_back_menu
+import os
+import tempfile
+import time
+from cache import BytesCache
+from config import Config
+from input_files import SpooledInputFile
+from messages import WELCOME_MSG, MENU_MSG, get_main_menu, get_back_menu
+from metrics import histogram
+from plugins.json_diff import diff_documents
+from plugins.json_lines import check_chunk, is_jsonl, read_chunks, report_header, report_rows
+from plugins.json_schema import check_schema, validate_document
+from plugins.json_stream import stream_format
+from plugins.json_tools import validate_json
+from workers import WorkerPool, WorkerTimeoutError, JobCancelledError
 
 logger = logging.getLogger(__name__)
 
+# Длиннее — форматированный JSON отправляется файлом, а не сообщением
+MESSAGE_MAX_CHARS = 3500
+# Сколько нарушений схемы показывать в сообщении, полный список — файлом
+SCHEMA_ERRORS_INLINE = 20
+SCHEMA_BUTTON = "Проверка по JSON Schema"
+CHANGE_SCHEMA_BUTTON = "Сменить схему"
+DIFF_BUTTON = "Сравнить два JSON"
+# Сколько изменений показывать в сообщении (не длиннее MESSAGE_MAX_CHARS),
+# все изменения — в файле JSON Patch
+DIFF_INLINE = 30
+# Как часто обновлять сообщение о ходе проверки JSONL, секунд
+JSONL_PROGRESS_INTERVAL = 3
+
+json_pool = WorkerPool("json", Config.JSON_WORKERS, Config.JSON_TIMEOUT)
+# Тексты схем и ожидаемых документов сравнения вне состояния FSM: оно сериализуется
+# при каждом шаге диалога, а документ может весить мегабайты. В состоянии — только ключ
+document_store = BytesCache("json_documents", Config.JSON_DOCUMENT_STORE_BYTES, Config.JSON_DOCUMENT_STORE_DIR)
+
 class JsonValidatorStates(StatesGroup):
     waiting_for_json = State()
     waiting_for_repeat = State()  # Новое состояние для повторной проверки
+    waiting_for_schema = State()
+    waiting_for_payload = State()  # Документы для проверки по сохраненной схеме
+    waiting_for_diff_expected = State()
+    waiting_for_diff_actual = State()
 
 async def json_validator_command(message: Message, state: FSMContext):
     await state.set_state(JsonValidatorStates.waiting_for_json)
     await message.answer(
-        "📋 Отправьте JSON для валидации. Пример:\n"
+        "📋 Отправьте JSON для валидации текстом или файлом. Пример:\n"
         "<code>{\n  \"name\": \"John\",\n  \"age\": 30,\n  \"city\": \"New York\"\n}</code>\n\n"
         "Я проверю:\n"
         "1. Корректность синтаксиса\n"
         "2. Форматирование (если нужно)\n"
-        "3. Наличие всех закрывающих скобок",
+        "3. Наличие всех закрывающих скобок\n\n"
+        "Файлы .jsonl и .ndjson проверяются построчно, с отчетом по каждой строке\n"
+        f"Для проверки документов по контракту нажмите «{SCHEMA_BUTTON}», "
+        f"для сравнения ожидаемого и фактического ответа — «{DIFF_BUTTON}»",
         parse_mode="HTML",
-        reply_markup=get_back_menu()
+        reply_markup=ReplyKeyboardMarkup(
+            keyboard=[
+                [KeyboardButton(text=SCHEMA_BUTTON), KeyboardButton(text=DIFF_BUTTON)],
+                [KeyboardButton(text="Назад в меню")]
+            ],
+            resize_keyboard=True
+        )
     )
 
 async def process_json_validation(message: Message, state: FSMContext):
@@ -30,47 +79,464 @@ async def process_json_validation(message: Message, state: FSMContext):
         await message.answer(WELCOME_MSG, reply_markup=get_main_menu())
         return
     
+    if message.text == SCHEMA_BUTTON:
+        await schema_mode_command(message, state)
+        return
+    if message.text == DIFF_BUTTON:
+        await json_diff_command(message, state)
+        return
+    if message.document and is_jsonl(message.document.file_name):
+        await process_jsonl_document(message)
+        await ask_for_repeat(message, state)
+        return
+    if message.document:
+        await process_json_document(message, state)
+        return
+
     json_text = message.text
+    if not json_text:
+        await message.answer("⚠ Отправьте JSON текстом или файлом")
+        return
+    if len(json_text.encode('utf-8')) > Config.JSON_MAX_BYTES:
+        await message.answer(f"⚠ JSON слишком большой: максимум {Config.JSON_MAX_BYTES // 1024} КБ")
+        return
+    
     try:
-        # Пытаемся распарсить JSON
-        parsed = json.loads(json_text)
-        
-        # Форматируем для красивого вывода
-        formatted_json = json.dumps(parsed, indent=2, ensure_ascii=False)
-        
-        await message.answer(
-            "✅ <b>JSON валиден!</b>\n\n"
-            "<b>Форматированный JSON:</b>\n"
-            f"<code>{formatted_json}</code>",
-            parse_mode="HTML"
-        )
+        # Разбор и форматирование — в пуле процессов, большой документ не блокирует бота
+        started = time.perf_counter()
+        result = await json_pool.run(validate_json, json_text, owner=message.from_user.id)
+        histogram(f"json.{result.backend}").observe(time.perf_counter() - started)
         
-        # Предлагаем проверить еще один JSON
+        if result.error is None:
+            await answer_formatted(message, result.formatted)
+        else:
+            await answer_error(message, result, json_text[max(0, result.pos - 20):result.pos + 20])
+        # Предлагаем проверить еще один JSON (или исправить и проверить снова)
         await ask_for_repeat(message, state)
         
-    except json.JSONDecodeError as e:
-        error_msg = (
-            f"❌ <b>Ошибка в JSON:</b>\n"
-            f"• Строка: {e.lineno}\n"
-            f"• Колонка: {e.colno}\n"
-            f"• Сообщение: {e.msg}\n\n"
-            f"<b>Проблемный участок:</b>\n"
-            f"<code>{json_text[max(0, e.pos-20):e.pos+20]}</code>"
-        )
+    except JobCancelledError:
+        logger.info(f"JSON validation cancelled by user {message.from_user.id}")
+    except WorkerTimeoutError as e:
+        logger.warning(f"JSON validation timeout: {e}")
+        await message.answer("⏳ JSON обрабатывался слишком долго", reply_markup=get_back_menu())
+    except Exception as e:
+        logger.error(f"JSON validation error: {e}", exc_info=True)
         await message.answer(
-            error_msg,
-            parse_mode="HTML"
+            "❌ Неизвестная ошибка при обработке JSON",
+            reply_markup=get_back_menu()
         )
-        # Предлагаем исправить и проверить снова
+        await state.clear()
+
+async def process_json_document(message: Message, state: FSMContext):
+    """Проверка JSON-файла: документ скачивается на диск, разбирается потоково
+    в пуле процессов, а форматированный результат отправляется файлом с диска"""
+    if (message.document.file_size or 0) > Config.JSON_MAX_BYTES:
+        await message.answer(f"⚠ Файл слишком большой: максимум {Config.JSON_MAX_BYTES // (1024 * 1024)} МБ")
+        return
+
+    # Воркер получает файлы по имени, поэтому это именованные временные файлы
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as src:
+        src_path = src.name
+    dst_path = f"{src_path}.formatted"
+    try:
+        await message.bot.download(message.document, destination=src_path)
+        started = time.perf_counter()
+        result = await json_pool.run(stream_format, src_path, dst_path, owner=message.from_user.id)
+        histogram(f"json.{result.backend}").observe(time.perf_counter() - started)
+
+        if result.error is None:
+            name = os.path.splitext(message.document.file_name or "document")[0]
+            await message.answer_document(
+                FSInputFile(dst_path, filename=f"{name}.formatted.json"),
+                caption="✅ JSON валиден! Форматированный JSON — в файле"
+            )
+        else:
+            await answer_error(message, result, result.snippet)
         await ask_for_repeat(message, state)
-        
+
+    except JobCancelledError:
+        logger.info(f"JSON validation cancelled by user {message.from_user.id}")
+    except WorkerTimeoutError as e:
+        logger.warning(f"JSON validation timeout: {e}")
+        await message.answer("⏳ JSON обрабатывался слишком долго", reply_markup=get_back_menu())
     except Exception as e:
-        logger.error(f"JSON validation error: {e}", exc_info=True)
+        logger.error(f"JSON document validation error: {e}", exc_info=True)
         await message.answer(
             "❌ Неизвестная ошибка при обработке JSON",
             reply_markup=get_back_menu()
         )
         await state.clear()
+    finally:
+        for path in (src_path, dst_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+async def process_jsonl_document(message: Message, schema_text: str = None):
+    """Проверка JSONL/NDJSON построчно, при наличии схемы — еще и по схеме.
+
+    Файл читается генератором частей, одновременно в пуле не больше двух
+    частей на воркер, а результаты пишутся в отчет в порядке частей. Память
+    не зависит от размера файла: отчет копится в SpooledTemporaryFile.
+    """
+    if (message.document.file_size or 0) > Config.JSONL_MAX_BYTES:
+        await message.answer(f"⚠ Файл слишком большой: максимум {Config.JSONL_MAX_BYTES // (1024 * 1024)} МБ")
+        return
+
+    owner = message.from_user.id
+    pending = deque()
+    lines = blank = invalid = 0
+    progress = None
+    started = last_progress = time.perf_counter()
+    source = tempfile.SpooledTemporaryFile(max_size=Config.SPOOL_MAX_MEMORY)
+    report = tempfile.SpooledTemporaryFile(max_size=Config.SPOOL_MAX_MEMORY)
+    try:
+        await message.bot.download(message.document, destination=source)
+        source.seek(0)
+        report.write(report_header())
+
+        chunks = read_chunks(source, Config.JSONL_CHUNK_LINES)
+        while True:
+            # Новые части отправляются в пул, пока очередь не заполнится
+            while len(pending) < Config.JSON_WORKERS * 2:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                first, chunk_lines = chunk
+                pending.append(asyncio.ensure_future(
+                    json_pool.run(check_chunk, first, chunk_lines, schema_text, owner=owner)
+                ))
+            if not pending:
+                break
+
+            result = await pending.popleft()
+            lines += result.lines
+            blank += result.blank
+            invalid += result.invalid
+            if result.errors:
+                report.write(report_rows(result.errors))
+
+            if time.perf_counter() - last_progress >= JSONL_PROGRESS_INTERVAL:
+                last_progress = time.perf_counter()
+                text = f"⏳ Проверено строк: {lines} (/cancel — отменить)"
+                try:
+                    if progress is None:
+                        progress = await message.answer(text)
+                    else:
+                        await progress.edit_text(text)
+                except TelegramBadRequest:
+                    pass
+        histogram("json.jsonl").observe(time.perf_counter() - started)
+
+        summary = (
+            f"Строк: {lines}\n"
+            f"Корректных записей: {lines - blank - invalid}\n"
+            f"С ошибками: {invalid}\n"
+            f"Пустых строк: {blank}"
+        )
+        if invalid:
+            await message.answer_document(
+                SpooledInputFile(report, filename="jsonl_errors.csv"),
+                caption=f"❌ Найдены ошибки{' (с проверкой по схеме)' if schema_text else ''}\n\n{summary}"
+            )
+        else:
+            await message.answer(f"✅ Все записи корректны{' и соответствуют схеме' if schema_text else ''}\n\n{summary}")
+
+    except JobCancelledError:
+        logger.info(f"JSONL validation cancelled by user {owner}")
+    except WorkerTimeoutError as e:
+        logger.warning(f"JSONL validation timeout: {e}")
+        await message.answer("⏳ Часть файла обрабатывалась слишком долго")
+    except Exception as e:
+        logger.error(f"JSONL validation error: {e}", exc_info=True)
+        await message.answer("❌ Неизвестная ошибка при обработке JSONL")
+    finally:
+        for job in pending:
+            job.cancel()
+        # Дожидаемся отмены, чтобы исключения оставшихся частей не потерялись в логе asyncio
+        await asyncio.gather(*pending, return_exceptions=True)
+        if progress is not None:
+            try:
+                await progress.delete()
+            except TelegramBadRequest:
+                pass
+        source.close()
+        report.close()
+
+async def read_json_input(message: Message, max_bytes: int):
+    """Текст JSON из сообщения или из документа; None, если прочитать не удалось"""
+    if message.document:
+        if (message.document.file_size or 0) > max_bytes:
+            await message.answer(f"⚠ Файл слишком большой: максимум {max_bytes // 1024} КБ")
+            return None
+        buffer = io.BytesIO()
+        await message.bot.download(message.document, destination=buffer)
+        try:
+            return buffer.getvalue().decode('utf-8-sig')
+        except UnicodeDecodeError:
+            await message.answer("⚠ Файл должен быть в кодировке UTF-8")
+            return None
+    if not message.text:
+        await message.answer("⚠ Отправьте JSON текстом или файлом")
+        return None
+    if len(message.text.encode('utf-8')) > max_bytes:
+        await message.answer(f"⚠ JSON слишком большой: максимум {max_bytes // 1024} КБ")
+        return None
+    return message.text
+
+async def store_document(text: str, key: str = None) -> str:
+    """Сохранение текста в document_store; возвращает ключ для состояния FSM (по умолчанию sha256 текста)"""
+    if key is None:
+        key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    await asyncio.to_thread(document_store.put, key, text.encode('utf-8'))
+    return key
+
+async def load_document(key):
+    """Текст по ключу из состояния или None, если его нет или он уже вытеснен из хранилища"""
+    if key is None:
+        return None
+    value = await asyncio.to_thread(document_store.get, key)
+    return None if value is None else value.decode('utf-8')
+
+def diff_key(user_id) -> str:
+    """Ключ ожидаемого документа: у пользователя одно сравнение, новый документ заменяет старый"""
+    return f"diff:{user_id}"
+
+async def forget_diff(user_id):
+    """Удаление ожидаемого документа после сравнения или при /cancel"""
+    await asyncio.to_thread(document_store.discard, diff_key(user_id))
+
+async def schema_mode_command(message: Message, state: FSMContext):
+    await state.set_state(JsonValidatorStates.waiting_for_schema)
+    await message.answer(
+        "📐 Отправьте JSON Schema текстом или файлом.\n"
+        "Поддерживаются основные ключевые слова draft-07 и 2020-12 и локальные ссылки $ref. "
+        "Схема сохранится, и по ней можно будет проверить сколько угодно документов",
+        reply_markup=get_back_menu()
+    )
+
+async def process_schema(message: Message, state: FSMContext):
+    """Компиляция схемы в пуле (она попадает в кэш воркера) и переход к проверке документов"""
+    schema_text = await read_json_input(message, Config.JSON_SCHEMA_MAX_BYTES)
+    if schema_text is None:
+        return
+    try:
+        error = await json_pool.run(check_schema, schema_text, owner=message.from_user.id)
+    except JobCancelledError:
+        logger.info(f"JSON schema compilation cancelled by user {message.from_user.id}")
+        return
+    except WorkerTimeoutError as e:
+        logger.warning(f"JSON schema compilation timeout: {e}")
+        await message.answer("⏳ Схема обрабатывалась слишком долго", reply_markup=get_back_menu())
+        return
+    except Exception as e:
+        logger.error(f"JSON schema compilation error: {e}", exc_info=True)
+        await message.answer("❌ Неизвестная ошибка при обработке схемы", reply_markup=get_back_menu())
+        return
+    if error:
+        await message.answer(f"❌ Некорректная схема: {html.escape(error, quote=False)}")
+        return
+
+    await state.update_data(json_schema=await store_document(schema_text))
+    await state.set_state(JsonValidatorStates.waiting_for_payload)
+    await message.answer(
+        "✅ Схема принята. Отправляйте JSON-документы для проверки текстом или файлом",
+        reply_markup=ReplyKeyboardMarkup(
+            keyboard=[
+                [KeyboardButton(text=CHANGE_SCHEMA_BUTTON)],
+                [KeyboardButton(text="Назад в меню")]
+            ],
+            resize_keyboard=True
+        )
+    )
+
+async def process_payload(message: Message, state: FSMContext):
+    """Проверка документа по сохраненной схеме; состояние не меняется, можно слать следующий"""
+    if message.text == CHANGE_SCHEMA_BUTTON:
+        await schema_mode_command(message, state)
+        return
+    schema_key = (await state.get_data()).get('json_schema')
+    schema_text = await load_document(schema_key)
+    if schema_text is None:
+        if schema_key is not None:
+            await message.answer("⚠ Схема больше не хранится, отправьте ее еще раз")
+        await schema_mode_command(message, state)
+        return
+    if message.document and is_jsonl(message.document.file_name):
+        await process_jsonl_document(message, schema_text)
+        return
+    payload = await read_json_input(message, Config.JSON_MAX_BYTES)
+    if payload is None:
+        return
+
+    try:
+        started = time.perf_counter()
+        report = await json_pool.run(validate_document, schema_text, payload, owner=message.from_user.id)
+        histogram("json.schema").observe(time.perf_counter() - started)
+    except JobCancelledError:
+        logger.info(f"JSON schema validation cancelled by user {message.from_user.id}")
+        return
+    except WorkerTimeoutError as e:
+        logger.warning(f"JSON schema validation timeout: {e}")
+        await message.answer("⏳ JSON обрабатывался слишком долго")
+        return
+    except Exception as e:
+        logger.error(f"JSON schema validation error: {e}", exc_info=True)
+        await message.answer("❌ Неизвестная ошибка при проверке JSON")
+        return
+
+    if report.schema_error:
+        await message.answer(f"❌ Некорректная схема: {html.escape(report.schema_error, quote=False)}")
+    elif report.aborted:
+        await message.answer(f"⚠ Документ не проверен: {html.escape(report.aborted, quote=False)}")
+    elif report.syntax:
+        result = report.syntax
+        await answer_error(message, result, payload[max(0, result.pos - 20):result.pos + 20])
+    elif not report.errors:
+        await message.answer("✅ Документ соответствует схеме")
+    else:
+        await answer_schema_errors(message, report.errors)
+
+async def answer_schema_errors(message: Message, errors):
+    """Все нарушения схемы: первые в сообщении, полный список — файлом"""
+    lines = [
+        f"• <code>{html.escape(path, quote=False)}</code>: {html.escape(text, quote=False)}"
+        for path, text in errors[:SCHEMA_ERRORS_INLINE]
+    ]
+    await message.answer(
+        f"❌ <b>Документ не соответствует схеме</b> (нарушений: {len(errors)})\n\n" + "\n".join(lines),
+        parse_mode="HTML"
+    )
+    if len(errors) > SCHEMA_ERRORS_INLINE:
+        report = "".join(f"{path}\t{text}\n" for path, text in errors)
+        await message.answer_document(
+            BufferedInputFile(report.encode('utf-8'), filename="schema_errors.txt"),
+            caption="Полный список нарушений"
+        )
+
+async def json_diff_command(message: Message, state: FSMContext):
+    await state.set_state(JsonValidatorStates.waiting_for_diff_expected)
+    await message.answer(
+        "🔀 Сравнение JSON. Отправьте ожидаемый документ текстом или файлом, "
+        "затем — фактический. Объекты сравниваются по ключам, массивы — по содержимому элементов",
+        reply_markup=get_back_menu()
+    )
+
+async def process_diff_expected(message: Message, state: FSMContext):
+    expected = await read_json_input(message, Config.JSON_DIFF_MAX_BYTES)
+    if expected is None:
+        return
+    await state.update_data(diff_expected=await store_document(expected, diff_key(message.from_user.id)))
+    await state.set_state(JsonValidatorStates.waiting_for_diff_actual)
+    await message.answer("Теперь отправьте фактический документ")
+
+async def process_diff_actual(message: Message, state: FSMContext):
+    """Сравнение в пуле процессов: изменения с путями в сообщении, JSON Patch — файлом"""
+    actual = await read_json_input(message, Config.JSON_DIFF_MAX_BYTES)
+    if actual is None:
+        return
+    expected = await load_document((await state.get_data()).get('diff_expected'))
+    if expected is None:
+        await json_diff_command(message, state)
+        return
+
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as patch_file:
+        patch_path = patch_file.name
+    try:
+        started = time.perf_counter()
+        result = await json_pool.run(
+            diff_documents, expected, actual, patch_path, DIFF_INLINE, owner=message.from_user.id
+        )
+        histogram("json.diff").observe(time.perf_counter() - started)
+
+        if result.syntax is not None:
+            side = "ожидаемом" if result.side == 'expected' else "фактическом"
+            await message.answer(f"Документы не сравнить: ошибка в {side} JSON")
+            await answer_error(message, result.syntax, result.syntax.snippet)
+            if result.side == 'expected':
+                await forget_diff(message.from_user.id)
+                await json_diff_command(message, state)
+            return
+
+        if not result.changes:
+            await message.answer("✅ Документы совпадают")
+        else:
+            # Длинные значения могут не поместиться в сообщение — обрезаем по общей длине
+            lines = []
+            length = 0
+            for line in result.preview:
+                escaped = html.escape(line, quote=False)
+                length += len(escaped) + 1
+                if length > MESSAGE_MAX_CHARS:
+                    break
+                lines.append(escaped)
+            hidden = result.changes - len(lines)
+            text = f"🔀 <b>Различий: {result.changes}</b>"
+            if lines:
+                text += "\n\n<code>" + "\n".join(lines) + "</code>"
+            if lines and hidden:
+                text += f"\n… и еще {hidden}"
+            await message.answer(text, parse_mode="HTML")
+            if hidden:
+                await message.answer_document(
+                    FSInputFile(patch_path, filename="diff.patch.json"),
+                    caption="Все изменения в формате JSON Patch (RFC 6902)"
+                )
+    except JobCancelledError:
+        logger.info(f"JSON diff cancelled by user {message.from_user.id}")
+        return
+    except WorkerTimeoutError as e:
+        logger.warning(f"JSON diff timeout: {e}")
+        await message.answer("⏳ Документы сравнивались слишком долго", reply_markup=get_back_menu())
+        return
+    except Exception as e:
+        logger.error(f"JSON diff error: {e}", exc_info=True)
+        await message.answer("❌ Неизвестная ошибка при сравнении JSON", reply_markup=get_back_menu())
+        await forget_diff(message.from_user.id)
+        await state.clear()
+        return
+    finally:
+        try:
+            os.remove(patch_path)
+        except FileNotFoundError:
+            pass
+
+    await forget_diff(message.from_user.id)
+    await state.update_data(diff_expected=None)
+    await state.set_state(JsonValidatorStates.waiting_for_diff_expected)
+    await message.answer("Отправьте следующий ожидаемый документ или вернитесь в меню")
+
+async def answer_error(message: Message, result, snippet: str):
+    """Сообщение об ошибке разбора: строка, колонка и проблемный участок"""
+    error_msg = (
+        f"❌ <b>Ошибка в JSON:</b>\n"
+        f"• Строка: {result.lineno}\n"
+        f"• Колонка: {result.colno}\n"
+        f"• Сообщение: {html.escape(result.error, quote=False)}\n\n"
+        f"<b>Проблемный участок:</b>\n"
+        f"<code>{html.escape(snippet, quote=False)}</code>"
+    )
+    await message.answer(
+        error_msg,
+        parse_mode="HTML"
+    )
+
+async def answer_formatted(message: Message, formatted: str):
+    """Форматированный JSON сообщением, а если он не помещается — файлом"""
+    escaped = html.escape(formatted, quote=False)
+    if len(escaped) <= MESSAGE_MAX_CHARS:
+        await message.answer(
+            "✅ <b>JSON валиден!</b>\n\n"
+            "<b>Форматированный JSON:</b>\n"
+            f"<code>{escaped}</code>",
+            parse_mode="HTML"
+        )
+    else:
+        await message.answer_document(
+            BufferedInputFile(formatted.encode('utf-8'), filename="formatted.json"),
+            caption="✅ JSON валиден! Форматированный JSON — в файле"
+        )
 
 async def ask_for_repeat(message: Message, state: FSMContext):
     """Спрашиваем, хочет ли пользователь проверить еще один JSON"""
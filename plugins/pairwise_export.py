@@ -0,0 +1,158 @@
+from xml.sax.saxutils import escape
+import csv
+import io
+import json
+import zipfile
+
+# Экспорт набора pairwise-тестов в файл. Каждый формат — генератор частей
+# файла в байтах: документ отправляется потоком и не собирается в памяти целиком
+
+EXPORT_FORMATS = ['csv', 'xlsx', 'json']
+EXPORT_BATCH_ROWS = 500  # Сколько строк набора сериализовать за одну часть
+
+_XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Pairwise" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def export_chunks(fmt: str, parameters: dict, rows):
+    """Части файла экспорта. rows — строки значений в порядке параметров"""
+    if fmt == 'csv':
+        return _csv_chunks(parameters, rows)
+    if fmt == 'xlsx':
+        return _xlsx_chunks(parameters, rows)
+    if fmt == 'json':
+        return _json_chunks(parameters, rows)
+    raise ValueError(f"Неподдерживаемый формат экспорта: {fmt}")
+
+
+def _batches(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == EXPORT_BATCH_ROWS:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _csv_chunks(parameters: dict, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM, чтобы Excel открыл кириллицу в UTF-8 без мастера импорта
+    buffer.write('\ufeff')
+    writer.writerow(['#', *parameters.keys()])
+    number = 0
+    for batch in _batches(rows):
+        for row in batch:
+            number += 1
+            writer.writerow([number, *row])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _json_chunks(parameters: dict, rows):
+    names = list(parameters.keys())
+    separator = '\n'
+    yield b'['
+    for batch in _batches(rows):
+        parts = []
+        for row in batch:
+            parts.append(separator + json.dumps(dict(zip(names, row)), ensure_ascii=False))
+            separator = ',\n'
+        yield ''.join(parts).encode('utf-8')
+    yield b'\n]\n'
+
+
+class _ChunkSink:
+    """Файловый объект без seek: zipfile пишет в него архив, а генератор забирает готовые байты"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _xlsx_row(values) -> str:
+    cells = ''.join(
+        f'<c t="n"><v>{value}</v></c>' if isinstance(value, int)
+        else f'<c t="inlineStr"><is><t xml:space="preserve">{escape(str(value))}</t></is></c>'
+        for value in values
+    )
+    return f'<row>{cells}</row>'
+
+
+def _xlsx_chunks(parameters: dict, rows):
+    """Минимальная книга XLSX (SpreadsheetML) без сторонних библиотек.
+
+    Ячейки записываются inline-строками, поэтому не нужна таблица общих строк
+    и лист пишется в архив одним проходом.
+    """
+    sink = _ChunkSink()
+    # Поток без seek: zipfile сам перейдет на дескрипторы данных после каждого файла
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(['#', *parameters.keys()]).encode('utf-8'))
+            number = 0
+            for batch in _batches(rows):
+                parts = []
+                for row in batch:
+                    number += 1
+                    parts.append(_xlsx_row([number, *row]))
+                sheet.write(''.join(parts).encode('utf-8'))
+                yield sink.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
@@ -1,17 +1,56 @@
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters.callback_data import CallbackData
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton
-from allpairspy import AllPairs
+from aiogram.types import (
+    Message, CallbackQuery, ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
+)
+from array import array
+from itertools import chain
+import asyncio
+import base64
+import html
+import json
 import logging
-from itertools import product
+import math
+import re
+from cache import BytesCache
+from config import Config
+from input_files import GeneratorInputFile
 from messages import MENU_MSG, get_main_menu, get_back_menu
+from plugins.covering_array import (
+    canonical_model, canonical_array, from_canonical, interaction_count, normalize, MIN_STRENGTH, MAX_STRENGTH
+)
+from plugins.pairwise_export import export_chunks, EXPORT_FORMATS
+from workers import WorkerPool, WorkerTimeoutError, JobCancelledError
 
 logger = logging.getLogger(__name__)
 
+# Полный список комбинаций показывается страницами
+PAGE_MAX_LINES = 20
+PAGE_MAX_CHARS = 3500  # С запасом до лимита сообщения Telegram в 4096 символов
+# Отчет с оптимальными тестами сокращается до PAGE_MAX_CHARS, длинные строки — до LINE_MAX_CHARS
+LINE_MAX_CHARS = 300
+EXPORT_HINT = "… Показана только часть. Полный набор — кнопка «Экспорт в файл»"
+STRENGTH_PATTERN = re.compile(r'(?:t|сила)\s*=\s*(\d+)', re.IGNORECASE)
+RULE_PREFIX = '!'  # Блок-ограничение: !параметр=значение & параметр=значение
+# Через сколько секунд показывать сообщение о генерации и как часто его обновлять
+PROGRESS_DELAY = 1
+PROGRESS_INTERVAL = 3
+
+pairwise_cache = BytesCache("pairwise", Config.PAIRWISE_CACHE_BYTES, Config.PAIRWISE_CACHE_DIR)
+pairwise_pool = WorkerPool("pairwise", Config.PAIRWISE_WORKERS, Config.PAIRWISE_TIMEOUT)
+
 class PairwiseStates(StatesGroup):
     waiting_for_parameters = State()
     waiting_for_action = State()
 
+class FullListPage(CallbackData, prefix="pw_full"):
+    page: int
+
+class ExportSuite(CallbackData, prefix="pw_export"):
+    fmt: str
+
 async def pairwise_command(message: Message, state: FSMContext):
     await state.set_state(PairwiseStates.waiting_for_parameters)
     await message.answer(
@@ -19,6 +58,10 @@ async def pairwise_command(message: Message, state: FSMContext):
         "<code>параметр1: значение1, значение2; параметр2: значение1, значение2</code>\n\n"
         "📋 Пример:\n"
         "<code>os: mac, win; size: 1000, 1200; browser: chrome, firefox</code>\n\n"
+        "Сила покрытия (по умолчанию 2 - все пары): добавьте блок <code>t=3</code>, "
+        f"допустимо от {MIN_STRENGTH} до {MAX_STRENGTH}\n\n"
+        "Запрещенные сочетания: блоки вида <code>!os=mac &amp; browser=firefox</code>, "
+        "такие тесты не попадут в набор\n\n"
         "Для возврата в меню нажмите 'Назад в меню'",
         parse_mode="HTML",
         reply_markup=get_back_menu()
@@ -32,10 +75,27 @@ async def process_pairwise_parameters(message: Message, state: FSMContext):
     
     try:
         parameters = {}
+        strength = MIN_STRENGTH
+        rule_blocks = []
         input_text = message.text.strip()
         param_blocks = [block.strip() for block in input_text.split(';') if block.strip()]
         
         for block in param_blocks:
+            strength_match = STRENGTH_PATTERN.fullmatch(block)
+            if strength_match:
+                strength = int(strength_match.group(1))
+                if not MIN_STRENGTH <= strength <= MAX_STRENGTH:
+                    await message.answer(
+                        f"❌ Сила покрытия должна быть от {MIN_STRENGTH} до {MAX_STRENGTH}",
+                        reply_markup=get_back_menu()
+                    )
+                    return
+                continue
+            
+            if block.startswith(RULE_PREFIX):
+                rule_blocks.append(block[len(RULE_PREFIX):])
+                continue
+            
             if ':' not in block:
                 await message.answer(
                     "❌ Ошибка формата. Используйте 'параметр: значение1, значение2'",
@@ -63,32 +123,54 @@ async def process_pairwise_parameters(message: Message, state: FSMContext):
             )
             return
         
-        pairwise_combinations = list(AllPairs(parameters.values()))
-        all_combinations_count = len(list(product(*parameters.values())))
+        try:
+            constraints = [parse_rule(rule, parameters) for rule in rule_blocks]
+        except ValueError as e:
+            await message.answer(f"❌ {e}", reply_markup=get_back_menu())
+            return
+        
+        model_error = check_model_size(parameters, strength, constraints)
+        if model_error:
+            await message.answer(f"❌ {model_error}", reply_markup=get_back_menu())
+            return
         
+        pairwise_rows = await generate_with_progress(message, parameters, strength, constraints)
+        if not pairwise_rows:
+            await message.answer(
+                "❌ Ограничения запрещают все комбинации значений. Проверьте правила",
+                reply_markup=get_back_menu()
+            )
+            return
+        all_combinations_count = math.prod(len(values) for values in parameters.values())
+        
+        # В состоянии храним только индексы значений, сами значения — один раз в parameters
         await state.update_data(
             parameters=parameters,
-            pairwise_combinations=pairwise_combinations,
+            strength=strength,
+            constraints=constraints,
+            pairwise_rows=pack_rows(pairwise_rows, parameters),
             all_combinations_count=all_combinations_count
         )
         
-        report = (
-            f"🔹 <b>Pairwise тестирование</b>\n\n"
-            f"<b>Параметры ({len(parameters)}):</b>\n" +
-            "\n".join(f"• {param}: {', '.join(values)}" for param, values in parameters.items()) +
-            f"\n\n<b>Оптимальное количество тестов:</b> {len(pairwise_combinations)} из {all_combinations_count}\n\n"
-            f"<b>Оптимальные тесты:</b>\n" +
-            "\n".join(
-                f"{i}. " + ", ".join(f"{param}: {value}" for param, value in zip(parameters.keys(), combo))
-                for i, combo in enumerate(pairwise_combinations, 1)
-            )
-        )
+        lines = ["🔹 <b>Pairwise тестирование</b>", "", f"<b>Параметры ({len(parameters)}):</b>"]
+        lines += [clip_line(f"• {param}: {', '.join(values)}") for param, values in parameters.items()]
+        if strength != MIN_STRENGTH:
+            lines += ["", f"<b>Сила покрытия:</b> t={strength}"]
+        if constraints:
+            lines += ["", f"<b>Ограничения ({len(constraints)}):</b>"]
+            lines += [clip_line(f"• {format_rule(rule, parameters)}") for rule in constraints]
+        lines += [
+            "", f"<b>Оптимальное количество тестов:</b> {len(pairwise_rows)} из {all_combinations_count}",
+            "", "<b>Оптимальные тесты:</b>"
+        ]
         
-        await message.answer(report, parse_mode="HTML")
+        # Большие наборы не помещаются в сообщение — показываем начало, остальное доступно экспортом
+        await message.answer(fit_report(chain(lines, suite_lines(pairwise_rows, parameters))), parse_mode="HTML")
         
         action_keyboard = ReplyKeyboardMarkup(
             keyboard=[
                 [KeyboardButton(text="Показать полный список")],
+                [KeyboardButton(text="Экспорт в файл")],
                 [KeyboardButton(text="Проверить другие параметры")],
                 [KeyboardButton(text="Назад в меню")]
             ],
@@ -98,6 +180,14 @@ async def process_pairwise_parameters(message: Message, state: FSMContext):
         await message.answer("Выберите действие:", reply_markup=action_keyboard)
         await state.set_state(PairwiseStates.waiting_for_action)
         
+    except JobCancelledError:
+        logger.info(f"Pairwise generation cancelled by user {message.from_user.id}")
+    except WorkerTimeoutError as e:
+        logger.warning(f"Pairwise generation timeout: {e}")
+        await message.answer(
+            "⏳ Генерация заняла слишком много времени. Уменьшите количество параметров или значений",
+            reply_markup=get_back_menu()
+        )
     except Exception as e:
         logger.error(f"Pairwise error: {e}", exc_info=True)
         await message.answer(
@@ -106,6 +196,147 @@ async def process_pairwise_parameters(message: Message, state: FSMContext):
         )
         await state.clear()
 
+def clip_line(text: str) -> str:
+    """Строка отчета без разметки: экранирована и не длиннее LINE_MAX_CHARS"""
+    if len(text) > LINE_MAX_CHARS:
+        text = text[:LINE_MAX_CHARS - 1] + "…"
+    return html.escape(text)
+
+def suite_lines(rows, parameters: dict):
+    """Пронумерованные строки набора тестов для сообщения"""
+    for i, combo in enumerate(decode_rows(rows, parameters), 1):
+        yield clip_line(f"{i}. " + ", ".join(f"{param}: {value}" for param, value in zip(parameters.keys(), combo)))
+
+def fit_report(lines) -> str:
+    """Строки отчета, которые помещаются в одно сообщение; если не поместились все — с подсказкой про экспорт.
+
+    Разметка есть только внутри отдельных строк, поэтому обрезка по строке не ломает теги.
+    """
+    kept = []
+    length = 0
+    for line in lines:
+        length += len(line) + 1
+        if length > PAGE_MAX_CHARS:
+            kept += ["", EXPORT_HINT]
+            break
+        kept.append(line)
+    return "\n".join(kept)
+
+def parse_rule(text: str, parameters: dict) -> list:
+    """Ограничение "параметр=значение & ..." в виде пар [номер параметра, номер значения].
+
+    Имена и значения сравниваются без учета регистра и лишних пробелов.
+    """
+    names = {normalize(name): p for p, name in enumerate(parameters)}
+    values = list(parameters.values())
+    rule = []
+    for term in text.split('&'):
+        if '=' not in term:
+            raise ValueError(f"Ошибка в ограничении '{text.strip()}': используйте 'параметр=значение & параметр=значение'")
+        name, value = (part.strip() for part in term.split('=', 1))
+        p = names.get(normalize(name))
+        if p is None:
+            raise ValueError(f"Ограничение ссылается на неизвестный параметр '{name}'")
+        matches = [i for i, v in enumerate(values[p]) if normalize(v) == normalize(value)]
+        if not matches:
+            raise ValueError(f"У параметра '{name}' нет значения '{value}'")
+        rule.append([p, matches[0]])
+    return rule
+
+def format_rule(rule: list, parameters: dict) -> str:
+    names = list(parameters.keys())
+    values = list(parameters.values())
+    return " & ".join(f"{names[p]}={values[p][i]}" for p, i in rule)
+
+def is_excluded(combo: list, parameters: dict, constraints: list) -> bool:
+    """Запрещена ли комбинация значений хотя бы одним ограничением"""
+    values = list(parameters.values())
+    return any(all(combo[p] == values[p][i] for p, i in rule) for rule in constraints)
+
+def check_model_size(parameters: dict, strength: int, constraints: list = ()):
+    """Текст ошибки, если модель слишком велика для генерации, иначе None"""
+    if len(constraints) > Config.PAIRWISE_MAX_RULES:
+        return f"Слишком много ограничений: максимум {Config.PAIRWISE_MAX_RULES}"
+    if len(parameters) > Config.PAIRWISE_MAX_PARAMETERS:
+        return f"Слишком много параметров: максимум {Config.PAIRWISE_MAX_PARAMETERS}"
+    for param, values in parameters.items():
+        if len(values) > Config.PAIRWISE_MAX_VALUES:
+            return f"Слишком много значений у параметра {param}: максимум {Config.PAIRWISE_MAX_VALUES}"
+    if interaction_count([len(values) for values in parameters.values()], strength) > Config.PAIRWISE_MAX_INTERACTIONS:
+        return "Модель слишком большая: уменьшите количество параметров, значений или силу покрытия"
+    return None
+
+async def generate_with_progress(message: Message, parameters: dict, strength: int, constraints: list = ()) -> list:
+    """Генерация набора с сообщением о ходе работы, если она заняла заметное время"""
+    task = asyncio.ensure_future(generate_suite(parameters, strength, constraints, owner=message.from_user.id))
+    progress = None
+    elapsed = PROGRESS_DELAY
+    try:
+        done, _ = await asyncio.wait({task}, timeout=PROGRESS_DELAY)
+        while not done:
+            text = f"⏳ Генерирую тесты… {elapsed:.0f} с (лимит {Config.PAIRWISE_TIMEOUT:.0f} с, /cancel — отменить)"
+            try:
+                if progress is None:
+                    progress = await message.answer(text)
+                else:
+                    await progress.edit_text(text)
+            except TelegramBadRequest as e:
+                logger.debug(f"Pairwise progress not updated: {e}")
+            done, _ = await asyncio.wait({task}, timeout=PROGRESS_INTERVAL)
+            elapsed += PROGRESS_INTERVAL
+        return task.result()
+    finally:
+        task.cancel()
+        if progress is not None:
+            try:
+                await progress.delete()
+            except TelegramBadRequest as e:
+                logger.debug(f"Pairwise progress not deleted: {e}")
+
+async def generate_suite(parameters: dict, strength: int, constraints: list = (), owner=None) -> list:
+    """Набор тестов с кэшированием по канонической форме модели.
+
+    Повторные и переставленные модели берутся из кэша и переводятся
+    в порядок параметров пользователя. Новые модели строятся в пуле процессов,
+    задачу можно отменить через /cancel по owner. Ограничения учитываются
+    при построении набора и входят в ключ кэша.
+    """
+    key, param_order, value_orders, rules = canonical_model(parameters, strength, constraints)
+    cached = await asyncio.to_thread(pairwise_cache.get, key)
+    if cached is not None:
+        rows = json.loads(cached)
+    else:
+        rows = await pairwise_pool.run(canonical_array, parameters, strength, param_order, rules, owner=owner)
+        await asyncio.to_thread(pairwise_cache.put, key, json.dumps(rows, separators=(',', ':')).encode())
+    return from_canonical(rows, param_order, value_orders)
+
+def _index_typecode(parameters: dict) -> str:
+    """Самый узкий тип array, в который помещаются индексы значений"""
+    largest = max(len(values) for values in parameters.values())
+    return 'B' if largest <= 0xFF + 1 else 'H' if largest <= 0xFFFF + 1 else 'I'
+
+def pack_rows(rows: list, parameters: dict) -> str:
+    """Упаковка набора тестов для FSM: индексы значений подряд в array, в base64.
+
+    Строка занимает по байту на параметр (для параметров до 256 значений)
+    и сериализуется любым хранилищем состояний, в том числе JSON.
+    """
+    packed = array(_index_typecode(parameters), chain.from_iterable(rows))
+    return base64.b64encode(packed.tobytes()).decode('ascii')
+
+def unpack_rows(packed: str, parameters: dict) -> list:
+    """Строки индексов из упакованного набора (срезы array, без копирования значений)"""
+    indexes = array(_index_typecode(parameters))
+    indexes.frombytes(base64.b64decode(packed))
+    width = len(parameters)
+    return [indexes[start:start + width] for start in range(0, len(indexes), width)]
+
+def decode_rows(rows, parameters: dict):
+    """Значения параметров по строкам индексов — только в момент вывода"""
+    values = list(parameters.values())
+    for row in rows:
+        yield [values[p][index] for p, index in enumerate(row)]
+
 async def process_pairwise_action(message: Message, state: FSMContext):
     if message.text == "Назад в меню":
         await state.clear()
@@ -114,7 +345,7 @@ async def process_pairwise_action(message: Message, state: FSMContext):
     
     data = await state.get_data()
     parameters = data['parameters']
-    pairwise_combinations = data['pairwise_combinations']
+    pairwise_rows = unpack_rows(data['pairwise_rows'], parameters)
     all_combinations_count = data['all_combinations_count']
     
     if message.text == "Проверить другие параметры":
@@ -122,29 +353,19 @@ async def process_pairwise_action(message: Message, state: FSMContext):
         return
     
     elif message.text == "Показать полный список":
-        all_combinations = list(product(*parameters.values()))
-        
-        report = (
-            f"🔹 <b>Полный список комбинаций ({len(all_combinations)}):</b>\n\n" +
-            "\n".join(
-                f"{i}. " + ", ".join(f"{param}: {value}" for param, value in zip(parameters.keys(), combo))
-                for i, combo in enumerate(all_combinations, 1)
-            )
-        )
-        
-        max_length = 4000
-        for i in range(0, len(report), max_length):
-            await message.answer(report[i:i+max_length], parse_mode="HTML")
+        text, keyboard = render_full_list_page(parameters, 0, data.get('constraints', []))
+        await message.answer(text, parse_mode="HTML", reply_markup=keyboard)
         
     elif message.text == "Показать оптимальные тесты":
-        report = (
-            f"🔹 <b>Оптимальные тесты ({len(pairwise_combinations)} из {all_combinations_count}):</b>\n\n" +
-            "\n".join(
-                f"{i}. " + ", ".join(f"{param}: {value}" for param, value in zip(parameters.keys(), combo))
-                for i, combo in enumerate(pairwise_combinations, 1)
-            )
-        )
-        await message.answer(report, parse_mode="HTML")
+        header = [f"🔹 <b>Оптимальные тесты ({len(pairwise_rows)} из {all_combinations_count}):</b>", ""]
+        await message.answer(fit_report(chain(header, suite_lines(pairwise_rows, parameters))), parse_mode="HTML")
+    
+    elif message.text == "Экспорт в файл":
+        keyboard = InlineKeyboardMarkup(inline_keyboard=[[
+            InlineKeyboardButton(text=fmt.upper(), callback_data=ExportSuite(fmt=fmt).pack())
+            for fmt in EXPORT_FORMATS
+        ]])
+        await message.answer("Выберите формат файла:", reply_markup=keyboard)
     
     else:
         await message.answer("Пожалуйста, используйте предложенные кнопки")
@@ -154,9 +375,103 @@ async def process_pairwise_action(message: Message, state: FSMContext):
     action_keyboard = ReplyKeyboardMarkup(
         keyboard=[
             [KeyboardButton(text="Показать полный список"), KeyboardButton(text="Показать оптимальные тесты")],
+            [KeyboardButton(text="Экспорт в файл")],
             [KeyboardButton(text="Проверить другие параметры")],
             [KeyboardButton(text="Назад в меню")]
         ],
         resize_keyboard=True
     )
-    await message.answer("Выберите действие:", reply_markup=action_keyboard)
\ No newline at end of file
+    await message.answer("Выберите действие:", reply_markup=action_keyboard)
+
+def combination_at(parameters: dict, index: int) -> list:
+    """Комбинация с номером index в полном переборе (порядок как у itertools.product).
+
+    Номер раскладывается в смешанной системе счисления, где основание каждого
+    разряда — количество значений параметра, поэтому перебор не материализуется.
+    """
+    combo = []
+    for values in reversed(list(parameters.values())):
+        index, digit = divmod(index, len(values))
+        combo.append(values[digit])
+    combo.reverse()
+    return combo
+
+def full_list_page_size(parameters: dict) -> int:
+    """Количество комбинаций на странице, чтобы страница гарантированно влезла в сообщение"""
+    longest_line = 10 + sum(
+        len(html.escape(param)) + 4 + max(len(html.escape(value)) for value in values)
+        for param, values in parameters.items()
+    )
+    return max(1, min(PAGE_MAX_LINES, PAGE_MAX_CHARS // longest_line))
+
+def render_full_list_page(parameters: dict, page: int, constraints: list = ()):
+    """Текст и клавиатура страницы полного списка комбинаций (запрещенные отмечены ⛔)"""
+    total = math.prod(len(values) for values in parameters.values())
+    page_size = full_list_page_size(parameters)
+    pages = math.ceil(total / page_size)
+    page = max(0, min(page, pages - 1))
+    start = page * page_size
+
+    lines = []
+    for index in range(start, min(start + page_size, total)):
+        combo = combination_at(parameters, index)
+        lines.append(
+            f"{index + 1}. " + ", ".join(
+                f"{html.escape(param)}: {html.escape(value)}" for param, value in zip(parameters.keys(), combo)
+            ) + (" ⛔" if is_excluded(combo, parameters, constraints) else "")
+        )
+    text = (
+        f"🔹 <b>Полный список комбинаций ({total}):</b>\n"
+        f"Страница {page + 1} из {pages}\n\n" +
+        "\n".join(lines)
+    )
+    # Текст длинной подписи все равно может не влезть — обрезаем по строке, а не посреди тега
+    if len(text) > 4096:
+        text = text[:text.rfind("\n", 0, 4090)] + "\n…"
+
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton(text="⏮", callback_data=FullListPage(page=0).pack()))
+        navigation.append(InlineKeyboardButton(text="◀️", callback_data=FullListPage(page=page - 1).pack()))
+    if page < pages - 1:
+        navigation.append(InlineKeyboardButton(text="▶️", callback_data=FullListPage(page=page + 1).pack()))
+        navigation.append(InlineKeyboardButton(text="⏭", callback_data=FullListPage(page=pages - 1).pack()))
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[navigation]) if navigation else None
+    return text, keyboard
+
+async def process_full_list_page(callback: CallbackQuery, callback_data: FullListPage, state: FSMContext):
+    """Переключение страниц полного списка комбинаций"""
+    data = await state.get_data()
+    parameters = data.get('parameters')
+    if not parameters:
+        await callback.answer("Параметры устарели, введите их заново", show_alert=True)
+        return
+
+    text, keyboard = render_full_list_page(parameters, callback_data.page, data.get('constraints', []))
+    try:
+        await callback.message.edit_text(text, parse_mode="HTML", reply_markup=keyboard)
+    except TelegramBadRequest as e:
+        # Повторное нажатие на ту же страницу: "message is not modified"
+        logger.debug(f"Pairwise page not updated: {e}")
+    await callback.answer()
+
+async def process_export(callback: CallbackQuery, callback_data: ExportSuite, state: FSMContext):
+    """Отправка набора тестов одним документом в выбранном формате"""
+    data = await state.get_data()
+    parameters = data.get('parameters')
+    if not parameters or 'pairwise_rows' not in data or callback_data.fmt not in EXPORT_FORMATS:
+        await callback.answer("Параметры устарели, введите их заново", show_alert=True)
+        return
+
+    await callback.answer()
+    rows = unpack_rows(data['pairwise_rows'], parameters)
+    # Файл формируется по частям прямо во время загрузки в Telegram
+    document = GeneratorInputFile(
+        lambda: export_chunks(callback_data.fmt, parameters, decode_rows(rows, parameters)),
+        filename=f"pairwise_{len(parameters)}x{len(rows)}.{callback_data.fmt}"
+    )
+    try:
+        await callback.message.answer_document(document, caption=f"✅ Тестов: {len(rows)}")
+    except Exception as e:
+        logger.error(f"Pairwise export error: {e}", exc_info=True)
+        await callback.message.answer("⚠️ Ошибка при экспорте тестов")
@@ -1,17 +1,41 @@
 from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-import random
+import asyncio
+import html
+import io
+import re
 import logging
+import tempfile
+from config import Config
+from input_files import GeneratorInputFile, SpooledInputFile
 from messages import MENU_MSG, get_main_menu, get_back_menu
+from plugins.card_batch import card_at, csv_chunks, new_seed
+from plugins.card_validator import check_lines, status, write_report
 
 logger = logging.getLogger(__name__)
 
 class PaymentGeneratorStates(StatesGroup):
     waiting_for_payment_system = State()
     waiting_for_regenerate_choice = State()
+    waiting_for_cards = State()
 
 PAYMENT_SYSTEMS = ['Visa', 'Mastercard', 'UnionPay', 'JCB', 'Mir']
+# Пакетный режим: "Mastercard × 10000" (вместо × подойдут x, х или *), одна запись: "Mastercard #5000".
+# Дальше — необязательные seed=... и from=... (номер первой записи пакета)
+BULK_PATTERN = re.compile(r'^\s*(\w+)\s*[×xх*]\s*(\d+)(.*)$', re.IGNORECASE)
+RECORD_PATTERN = re.compile(r'^\s*(\w+)\s*#\s*(\d+)(.*)$')
+OPTION_PATTERN = re.compile(r'(\w+)\s*=\s*(\S+)')
+MAX_RECORD_INDEX = 2 ** 63
+FILENAME_UNSAFE = re.compile(r'[^\w.-]')
+CHECK_BUTTON = "Проверить карты"
+CHECK_INLINE_LIMIT = 10  # До скольких номеров из сообщения отвечать текстом, а не файлом
+STATUS_TITLES = {
+    'valid': "✅ валидных",
+    'bad_luhn': "❌ ошибка контрольной цифры",
+    'bad_length': "❌ неверная длина для системы",
+    'unknown_scheme': "❓ неизвестная система",
+}
 
 async def generate_payment_command(message: Message, state: FSMContext):
     await show_payment_systems_menu(message, state)
@@ -21,12 +45,21 @@ async def show_payment_systems_menu(message: Message, state: FSMContext):
         keyboard=[
             [KeyboardButton(text=system)] for system in PAYMENT_SYSTEMS
         ] + [
+            [KeyboardButton(text=CHECK_BUTTON)],
             [KeyboardButton(text="Назад в меню")]
         ],
         resize_keyboard=True,
         one_time_keyboard=True
     )
-    await message.answer("💳 Выберите платежную систему:", reply_markup=builder)
+    await message.answer(
+        "💳 Выберите платежную систему\n\n"
+        f"Для пакета карт в CSV отправьте систему и количество, например <code>Mastercard × 10000</code> "
+        f"(до {Config.CARD_BULK_MAX}).\n"
+        "Наборы воспроизводятся по seed: <code>Mastercard × 100 seed=qa42 from=5000</code> — записи "
+        "с 5000 по 5099, <code>Mastercard #5000 seed=qa42</code> — одна запись",
+        parse_mode="HTML",
+        reply_markup=builder
+    )
     await state.set_state(PaymentGeneratorStates.waiting_for_payment_system)
 
 async def process_payment_system(message: Message, state: FSMContext):
@@ -35,6 +68,26 @@ async def process_payment_system(message: Message, state: FSMContext):
         await message.answer(MENU_MSG, reply_markup=get_main_menu())
         return
     
+    if message.text == CHECK_BUTTON:
+        await card_check_command(message, state)
+        return
+    
+    bulk_match = BULK_PATTERN.match(message.text or "")
+    record_match = RECORD_PATTERN.match(message.text or "")
+    if bulk_match or record_match:
+        match = bulk_match or record_match
+        try:
+            system = resolve_system(match.group(1))
+            seed, start = parse_stream_options(match.group(3))
+        except ValueError as e:
+            await message.answer(f"⚠ {e}")
+            return
+        if bulk_match:
+            await generate_bulk_cards(message, state, system, int(match.group(2)), seed, start)
+        else:
+            await generate_and_show_card(message, state, system, seed, int(match.group(2)))
+        return
+    
     if message.text not in PAYMENT_SYSTEMS:
         await message.answer("⚠ Пожалуйста, выберите систему из списка")
         return
@@ -46,23 +99,151 @@ async def process_payment_system(message: Message, state: FSMContext):
         await message.answer("❌ Ошибка при генерации данных", reply_markup=get_main_menu())
         await state.clear()
 
-async def generate_and_show_card(message: Message, state: FSMContext, system: str):
-    card_number = generate_card_number(system)
-    expiry_date = f"{random.randint(1, 12):02d}/{random.randint(23, 30)}"
-    cvv = f"{random.randint(0, 999):03d}"
+def resolve_system(name: str) -> str:
+    system = next((s for s in PAYMENT_SYSTEMS if s.lower() == name.lower()), None)
+    if system is None:
+        raise ValueError(f"Неизвестная платежная система. Доступны: {', '.join(PAYMENT_SYSTEMS)}")
+    return system
+
+def parse_stream_options(text: str):
+    """seed и номер первой записи из "seed=... from=..."; без seed выбирается новый"""
+    seed, start = None, 0
+    for key, value in OPTION_PATTERN.findall(text):
+        if key.lower() in ('seed', 'сид'):
+            seed = value
+        elif key.lower() in ('from', 'с'):
+            if not value.isdigit():
+                raise ValueError("Номер первой записи (from) должен быть числом")
+            start = int(value)
+        else:
+            raise ValueError(f"Неизвестный параметр '{key}': используйте seed=... и from=...")
+    if OPTION_PATTERN.sub('', text).strip():
+        raise ValueError("Неверный формат. Пример: Mastercard × 100 seed=qa42 from=5000")
+    return seed or new_seed(), start
+
+async def generate_and_show_card(message: Message, state: FSMContext, system: str, seed: str = None, index: int = 0):
+    """Одна запись потока (seed, system) — по seed и номеру ее можно получить снова"""
+    seed = seed or new_seed()
+    if index >= MAX_RECORD_INDEX:
+        await message.answer(f"⚠ Номер записи должен быть меньше {MAX_RECORD_INDEX}")
+        return
+    card = card_at(seed, system, index)
     
     await message.answer(
         "🔹 <b>Тестовые платежные данные</b>\n\n"
         f"▪ <b>Система:</b> {system}\n"
-        f"▪ <b>Номер карты:</b> <code>{card_number}</code>\n"
-        f"▪ <b>Срок действия:</b> {expiry_date}\n"
-        f"▪ <b>CVV/CVC:</b> <code>{cvv}</code>\n\n"
+        f"▪ <b>Номер карты:</b> <code>{card.number}</code>\n"
+        f"▪ <b>Срок действия:</b> {card.expiry}\n"
+        f"▪ <b>CVV/CVC:</b> <code>{card.cvv}</code>\n\n"
+        f"▪ <b>Повторить:</b> <code>{system} #{index} seed={html.escape(seed)}</code>\n\n"
         "<i>Это тестовые данные для QA-тестирования</i>",
         parse_mode="HTML"
     )
     
     await ask_for_regenerate(message, state)
 
+async def generate_bulk_cards(message: Message, state: FSMContext, system: str, count: int, seed: str, start: int = 0):
+    """Пакет тестовых карт одним CSV-файлом, который формируется во время отправки"""
+    if not 1 <= count <= Config.CARD_BULK_MAX:
+        await message.answer(f"⚠ Количество карт должно быть от 1 до {Config.CARD_BULK_MAX}")
+        return
+    if start + count > MAX_RECORD_INDEX:
+        await message.answer(f"⚠ Номер записи должен быть меньше {MAX_RECORD_INDEX}")
+        return
+    
+    try:
+        await message.answer_document(
+            GeneratorInputFile(
+                lambda: csv_chunks(seed, system, count, start),
+                filename=f"cards_{system.lower()}_{FILENAME_UNSAFE.sub('_', seed)}_{start}-{start + count - 1}.csv"
+            ),
+            caption=(
+                f"✅ {system}: {count} тестовых карт\n"
+                f"Повторить: <code>{system} × {count} seed={html.escape(seed)} from={start}</code>\n"
+                "<i>Это тестовые данные для QA-тестирования</i>"
+            ),
+            parse_mode="HTML"
+        )
+    except Exception as e:
+        logger.error(f"Bulk payment data error: {e}", exc_info=True)
+        await message.answer("❌ Ошибка при генерации данных", reply_markup=get_main_menu())
+        await state.clear()
+        return
+    
+    await ask_for_regenerate(message, state)
+
+async def card_check_command(message: Message, state: FSMContext):
+    await state.set_state(PaymentGeneratorStates.waiting_for_cards)
+    await message.answer(
+        "🔎 Отправьте номера карт сообщением или файлом (.txt, .csv, до "
+        f"{Config.CARD_CHECK_MAX_BYTES // (1024 * 1024)} МБ).\n"
+        "Проверю контрольную цифру (алгоритм Луна), платежную систему по BIN и длину номера",
+        reply_markup=get_back_menu()
+    )
+
+async def process_card_check(message: Message, state: FSMContext):
+    """Проверка номеров карт из сообщения или загруженного файла за один проход"""
+    if message.document:
+        if (message.document.file_size or 0) > Config.CARD_CHECK_MAX_BYTES:
+            await message.answer(
+                f"⚠ Файл слишком большой: максимум {Config.CARD_CHECK_MAX_BYTES // (1024 * 1024)} МБ"
+            )
+            return
+    elif not message.text:
+        await message.answer("⚠ Отправьте номера карт текстом или файлом")
+        return
+    
+    source = None
+    try:
+        if message.document:
+            source = tempfile.SpooledTemporaryFile(max_size=Config.SPOOL_MAX_MEMORY)
+            await message.bot.download(message.document, destination=source)
+            source.seek(0)
+            lines = io.TextIOWrapper(source, encoding='utf-8', errors='replace')
+        else:
+            checks = list(check_lines(message.text.splitlines()))
+            if len(checks) <= CHECK_INLINE_LIMIT:
+                await answer_card_checks(message, checks)
+                return
+            lines = io.StringIO(message.text)
+        
+        with tempfile.SpooledTemporaryFile(max_size=Config.SPOOL_MAX_MEMORY) as report:
+            # Разбор и проверка — в отдельном потоке, чтобы большой файл не блокировал бота
+            summary = await asyncio.to_thread(write_report, lines, report)
+            if not summary:
+                await message.answer("⚠ Номера карт не найдены")
+                return
+            await message.answer_document(
+                SpooledInputFile(report, filename="cards_check.csv"),
+                caption=f"Проверено номеров: {sum(summary.values())}\n" + "\n".join(
+                    f"{title}: {summary[key]}" for key, title in STATUS_TITLES.items() if summary[key]
+                )
+            )
+    except Exception as e:
+        logger.error(f"Card check error: {e}", exc_info=True)
+        await message.answer("❌ Ошибка при проверке номеров", reply_markup=get_main_menu())
+        await state.clear()
+        return
+    finally:
+        if source is not None:
+            source.close()
+    
+    await message.answer("Отправьте еще номера или вернитесь в меню", reply_markup=get_back_menu())
+
+async def answer_card_checks(message: Message, checks: list):
+    if not checks:
+        await message.answer("⚠ Номера карт не найдены")
+        return
+    lines = []
+    for check in checks:
+        result = status(check)
+        lines.append(
+            f"<code>{check.number}</code> — {html.escape(check.scheme or 'неизвестная система')}: "
+            f"{'✅ валиден' if result == 'valid' else STATUS_TITLES[result]}"
+        )
+    await message.answer("\n".join(lines), parse_mode="HTML")
+    await message.answer("Отправьте еще номера или вернитесь в меню", reply_markup=get_back_menu())
+
 async def ask_for_regenerate(message: Message, state: FSMContext):
     builder = ReplyKeyboardMarkup(
         keyboard=[
@@ -83,26 +264,3 @@ async def process_regenerate_choice(message: Message, state: FSMContext):
         await message.answer(MENU_MSG, reply_markup=get_main_menu())
     else:
         await message.answer("Пожалуйста, используйте кнопки")
-
-def generate_card_number(system: str) -> str:
-    prefixes = {
-        'Visa': ['4'],
-        'Mastercard': ['51', '52', '53', '54', '55'],
-        'UnionPay': ['62'],
-        'JCB': ['35'],
-        'Mir': ['2']
-    }
-    prefix = random.choice(prefixes.get(system, ['4']))
-    number = prefix
-    while len(number) < 15:
-        number += str(random.randint(0, 9))
-    total = 0
-    for i, digit in enumerate(number):
-        digit = int(digit)
-        if i % 2 == 0:
-            digit *= 2
-            if digit > 9:
-                digit -= 9
-        total += digit
-    check_digit = (10 - (total % 10)) % 10
-    return number + str(check_digit)
\ No newline at end of file
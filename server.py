@@ -0,0 +1,53 @@
+import logging
+from aiogram import Bot, Dispatcher
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+from config import Config
+from handlers import CommandRouter
+from storage import create_storage
+
+logger = logging.getLogger(__name__)
+
+# HTTP-сервер бота: проверка работоспособности и прием обновлений в режиме webhook
+
+async def health_check(request: web.Request):
+    """Эндпоинт для проверки работоспособности (UptimeRobot)"""
+    return web.Response(text="OK")
+
+def create_dispatcher(storage: BaseStorage = None) -> Dispatcher:
+    """Диспетчер со всеми обработчиками; хранилище FSM по умолчанию — из настроек"""
+    dp = Dispatcher(storage=storage or create_storage())
+    router = CommandRouter(dp)
+    router.register_handlers()
+    return dp
+
+def create_app(dp: Dispatcher, bot: Bot, webhook_secret: str = None) -> web.Application:
+    """HTTP-приложение: /health и, в режиме webhook, прием обновлений от Telegram.
+
+    Обновления обрабатываются в фоне (handle_in_background): Telegram сразу
+    получает ответ, а обновления разных пользователей обрабатываются параллельно.
+    Запросы без правильного X-Telegram-Bot-Api-Secret-Token отклоняются с 401.
+    """
+    app = web.Application()
+    app.router.add_get('/health', health_check)
+    if webhook_secret:
+        SimpleRequestHandler(
+            dispatcher=dp,
+            bot=bot,
+            secret_token=webhook_secret,
+            handle_in_background=True
+        ).register(app, path=Config.WEBHOOK_PATH)
+        # Сигналы startup/shutdown диспетчера при запуске и остановке приложения
+        setup_application(app, dp, bot=bot)
+    return app
+
+async def start_http_server(app: web.Application, port: int = None) -> web.AppRunner:
+    """Запуск HTTP-сервера"""
+    port = port or Config.HTTP_PORT
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '0.0.0.0', port)
+    await site.start()
+    logger.info(f"HTTP-сервер запущен на порту {port}")
+    return runner
@@ -0,0 +1,408 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Mapping, Optional
+from urllib.parse import unquote, urlparse
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Хранилища состояний FSM, которые переживают перезапуск бота. Данные
+# состояния сериализуются в JSON, поэтому в update_data кладутся только
+# JSON-совместимые значения (строки, числа, списки, словари)
+
+PURGE_INTERVAL = 60  # Как часто удалять просроченные сессии из SQLite, секунд
+
+
+def _state_name(state) -> Optional[str]:
+    return state.state if isinstance(state, State) else state
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM в SQLite с отложенной записью (write-behind).
+
+    Чтение и запись идут в словарь в памяти, а измененные записи пачкой
+    сохраняются в базу раз в flush_interval секунд (или сразу, когда их
+    набирается flush_batch) одной транзакцией в отдельном потоке. После
+    перезапуска записи подгружаются из базы по мере обращения. Сессии без
+    активности дольше ttl секунд считаются брошенными и удаляются.
+
+    Кэш в памяти — свой у каждого процесса, поэтому для нескольких процессов
+    бота нужен RedisStorage.
+    """
+
+    def __init__(self, path: str, ttl: float = 0, flush_interval: float = 1.0, flush_batch: int = 500):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._records = {}  # Ключ -> [состояние, данные, JSON данных, время последней активности]
+        self._dirty = set()
+        self._wakeup = None  # asyncio.Event и задача записи создаются лениво, внутри работающего loop
+        self._flusher = None
+        self._closing = False
+        self._last_purge = 0.0
+        self._lock = threading.Lock()  # Соединение используется из потоков asyncio.to_thread по очереди
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS fsm ("
+                "key TEXT PRIMARY KEY, state TEXT, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS fsm_updated_at ON fsm(updated_at)")
+            self._conn.commit()
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:{key.destiny}"
+
+    def _expired(self, updated_at: float, now: float) -> bool:
+        return bool(self.ttl) and now - updated_at > self.ttl
+
+    def _load(self, db_key: str):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT state, data, updated_at FROM fsm WHERE key = ?", (db_key,)
+            ).fetchone()
+
+    async def _record(self, key: StorageKey) -> Optional[list]:
+        db_key = self._key(key)
+        record = self._records.get(db_key)
+        if record is None:
+            row = await asyncio.to_thread(self._load, db_key)
+            # Пока шло чтение, запись могла появиться в памяти
+            record = self._records.get(db_key)
+            if record is None:
+                if row is None:
+                    return None
+                state, data_json, updated_at = row
+                record = self._records[db_key] = [state, json.loads(data_json), data_json, updated_at]
+
+        if record[0] is None and not record[1]:
+            return None
+        now = time.time()
+        if self._expired(record[3], now):
+            self._records[db_key] = [None, {}, '{}', now]
+            self._mark_dirty(db_key)
+            return None
+        if self.ttl and now - record[3] > self.ttl / 2:
+            # Продлеваем активную сессию, но не переписываем запись на каждое чтение
+            record[3] = now
+            self._mark_dirty(db_key)
+        return record
+
+    def _mark_dirty(self, db_key: str):
+        self._dirty.add(db_key)
+        if self._flusher is None:
+            self._wakeup = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush_loop())
+        if len(self._dirty) >= self.flush_batch:
+            self._wakeup.set()
+
+    async def _update(self, key: StorageKey, state=..., data=...):
+        record = await self._record(key) or [None, {}, '{}', 0.0]
+        if state is not ...:
+            record[0] = _state_name(state)
+        if data is not ...:
+            record[1] = dict(data)
+            # JSON готовится сразу: к моменту записи обработчик может изменить вложенные объекты
+            record[2] = json.dumps(record[1], ensure_ascii=False)
+        record[3] = time.time()
+        # Пустая запись остается в памяти до записи в базу, чтобы до удаления
+        # строки из базы не подгрузить оттуда старое значение
+        db_key = self._key(key)
+        self._records[db_key] = record
+        self._mark_dirty(db_key)
+
+    async def set_state(self, key: StorageKey, state=None) -> None:
+        await self._update(key, state=state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = await self._record(key)
+        return record[0] if record else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._update(key, data=data)
+
+    async def get_data(self, key: StorageKey) -> dict:
+        record = await self._record(key)
+        return record[1].copy() if record else {}
+
+    def _write(self, rows: list, deleted: list, purge_before: Optional[float]):
+        with self._lock:
+            with self._conn:
+                if rows:
+                    self._conn.executemany(
+                        "INSERT INTO fsm (key, state, data, updated_at) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET "
+                        "state = excluded.state, data = excluded.data, updated_at = excluded.updated_at",
+                        rows
+                    )
+                if deleted:
+                    self._conn.executemany("DELETE FROM fsm WHERE key = ?", deleted)
+                if purge_before is not None:
+                    self._conn.execute("DELETE FROM fsm WHERE updated_at < ?", (purge_before,))
+
+    def _take_batch(self):
+        """Снимок измененных записей для записи в базу"""
+        rows = []
+        deleted = []
+        for db_key in self._dirty:
+            record = self._records[db_key]
+            if record[0] is None and not record[1]:
+                deleted.append((db_key,))
+            else:
+                rows.append((db_key, record[0], record[2], record[3]))
+        self._dirty.clear()
+
+        purge_before = None
+        now = time.time()
+        if self.ttl and now - self._last_purge >= PURGE_INTERVAL:
+            self._last_purge = now
+            purge_before = now - self.ttl
+            expired = [k for k, record in self._records.items() if record[3] < purge_before]
+            for db_key in expired:
+                del self._records[db_key]
+        return rows, deleted, purge_before
+
+    async def flush(self):
+        """Запись накопленных изменений в базу"""
+        rows, deleted, purge_before = self._take_batch()
+        if rows or deleted or purge_before is not None:
+            await asyncio.to_thread(self._write, rows, deleted, purge_before)
+        for (db_key,) in deleted:
+            record = self._records.get(db_key)
+            if record is not None and db_key not in self._dirty and record[0] is None and not record[1]:
+                del self._records[db_key]
+
+    async def _flush_loop(self):
+        # Остановка — через флаг, а не cancel: отмена посреди записи потеряла бы пачку
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Не удалось сохранить состояния FSM: {e}", exc_info=True)
+
+    async def close(self) -> None:
+        self._closing = True
+        if self._flusher is not None:
+            self._wakeup.set()
+            await self._flusher
+            self._flusher = None
+        await self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+class RedisError(Exception):
+    """Ошибка, которую вернул сервер Redis"""
+
+
+class _RedisConnection:
+    """Минимальный клиент протокола Redis (RESP) на asyncio-потоках.
+
+    Команды отправляются без ожидания ответов на предыдущие (pipelining):
+    сервер отвечает строго по порядку, и ответы раздаются ожидающим future
+    в том же порядке. Достаточно GET/GETEX/SET/DEL, поэтому пакет redis не нужен.
+    """
+
+    def __init__(self, url: str):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self._reader = None
+        self._writer = None
+        self._pending = deque()
+        self._read_task = None
+        self._connect_lock = None
+        self._ready = False  # Соединение открыто, AUTH и SELECT выполнены
+
+    async def _connect(self):
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._ready:
+                return
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+            self._read_task = asyncio.create_task(self._read_replies())
+            try:
+                if self.password:
+                    await self._send(b'AUTH', self.password)
+                if self.db:
+                    await self._send(b'SELECT', self.db)
+            except BaseException:
+                # Без AUTH и SELECT соединение не используется: команды ушли бы не в ту базу
+                await self._disconnect()
+                raise
+            self._ready = True
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    async def _send(self, *args):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(future)
+        self._writer.write(self._encode(args))
+        await self._writer.drain()
+        return await future
+
+    async def execute(self, *args):
+        # До окончания AUTH/SELECT команды ждут на блокировке в _connect, а не
+        # отправляются в соединение раньше SELECT
+        if not self._ready:
+            await self._connect()
+        return await self._send(*args)
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis закрыл соединение")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload
+        if kind == b'-':
+            return RedisError(payload.decode('utf-8', 'replace'))
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            size = int(payload)
+            if size < 0:
+                return None
+            return (await self._reader.readexactly(size + 2))[:-2]
+        if kind == b'*':
+            count = int(payload)
+            return None if count < 0 else [await self._read_reply() for _ in range(count)]
+        raise ConnectionError(f"Некорректный ответ Redis: {line[:50]!r}")
+
+    async def _read_replies(self):
+        try:
+            while True:
+                reply = await self._read_reply()
+                future = self._pending.popleft()
+                if future.done():
+                    continue
+                if isinstance(reply, RedisError):
+                    future.set_exception(reply)
+                else:
+                    future.set_result(reply)
+        except (ConnectionError, asyncio.IncompleteReadError, OSError) as e:
+            self._fail(ConnectionError(f"Соединение с Redis потеряно: {e}"))
+        except asyncio.CancelledError:
+            self._fail(ConnectionError("Соединение с Redis закрыто"))
+            raise
+
+    def _fail(self, error: Exception):
+        # Следующая команда откроет новое соединение
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+        self._ready = False
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+    async def _disconnect(self):
+        """Остановка чтения ответов; _fail закрывает соединение и ожидающие команды"""
+        if self._read_task is not None:
+            self._read_task.cancel()
+            try:
+                await self._read_task
+            except asyncio.CancelledError:
+                pass
+            self._read_task = None
+
+    async def close(self):
+        writer = self._writer
+        await self._disconnect()
+        if writer is not None:
+            await writer.wait_closed()
+
+
+class RedisStorage(BaseStorage):
+    """FSM в Redis (или любом сервере с протоколом Redis): одно хранилище
+    для нескольких процессов бота. Записи живут ttl секунд с последнего
+    обращения — GETEX продлевает срок при чтении."""
+
+    def __init__(self, url: str, ttl: float = 0):
+        self.ttl = int(ttl)
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True)
+        self._redis = _RedisConnection(url)
+
+    async def _get(self, redis_key: str):
+        if self.ttl:
+            return await self._redis.execute(b'GETEX', redis_key, b'EX', self.ttl)
+        return await self._redis.execute(b'GET', redis_key)
+
+    async def _set(self, redis_key: str, value: str):
+        if self.ttl:
+            await self._redis.execute(b'SET', redis_key, value, b'EX', self.ttl)
+        else:
+            await self._redis.execute(b'SET', redis_key, value)
+
+    async def set_state(self, key: StorageKey, state=None) -> None:
+        redis_key = self.key_builder.build(key, 'state')
+        state = _state_name(state)
+        if state is None:
+            await self._redis.execute(b'DEL', redis_key)
+        else:
+            await self._set(redis_key, state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        value = await self._get(self.key_builder.build(key, 'state'))
+        return value.decode('utf-8') if value is not None else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        redis_key = self.key_builder.build(key, 'data')
+        if not data:
+            await self._redis.execute(b'DEL', redis_key)
+        else:
+            await self._set(redis_key, json.dumps(dict(data), ensure_ascii=False))
+
+    async def get_data(self, key: StorageKey) -> dict:
+        value = await self._get(self.key_builder.build(key, 'data'))
+        return json.loads(value) if value is not None else {}
+
+    async def close(self) -> None:
+        await self._redis.close()
+
+
+def create_storage() -> BaseStorage:
+    """Хранилище FSM по настройке FSM_STORAGE: sqlite, redis или memory"""
+    backend = Config.FSM_STORAGE.lower()
+    if backend == 'sqlite':
+        return SQLiteStorage(
+            Config.FSM_SQLITE_PATH,
+            ttl=Config.FSM_TTL,
+            flush_interval=Config.FSM_FLUSH_INTERVAL,
+            flush_batch=Config.FSM_FLUSH_BATCH
+        )
+    if backend == 'redis':
+        return RedisStorage(Config.FSM_REDIS_URL, ttl=Config.FSM_TTL)
+    if backend == 'memory':
+        return MemoryStorage()
+    raise ValueError(f"Неизвестное хранилище FSM: {Config.FSM_STORAGE}")
@@ -0,0 +1,159 @@
+import asyncio
+import contextlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# Все созданные пулы, чтобы их можно было отменять и останавливать из main/handlers
+_pools = []
+
+
+class WorkerTimeoutError(Exception):
+    """Задача не уложилась в отведенное время"""
+
+
+class JobCancelledError(Exception):
+    """Задача отменена пользователем (/cancel)"""
+
+
+class WorkerPool:
+    """Пул процессов для тяжелых задач, чтобы не блокировать event loop.
+
+    Каждый воркер — отдельный executor с одним процессом: зависшую или
+    отмененную задачу можно убить вместе с ее процессом, не трогая остальные.
+    """
+
+    def __init__(self, name: str, max_workers: int, timeout: float, initializer=None):
+        self.name = name
+        self.initializer = initializer
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self._idle = None  # asyncio.Queue создается лениво, внутри работающего loop
+        self._executors = set()
+        self._jobs = {}
+        _pools.append(self)
+
+    def _start(self):
+        self._idle = asyncio.Queue()
+        for _ in range(self.max_workers):
+            self._idle.put_nowait(self._new_executor())
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        executor = ProcessPoolExecutor(max_workers=1, initializer=self.initializer)
+        self._executors.add(executor)
+        return executor
+
+    def _kill(self, executor: ProcessPoolExecutor):
+        # У ProcessPoolExecutor нет публичного способа прервать уже выполняющуюся задачу
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+        self._executors.discard(executor)
+
+    async def _execute(self, func, args, timeout):
+        if self._idle is None:
+            self._start()
+        executor = await self._idle.get()
+        healthy = False
+        try:
+            future = asyncio.wrap_future(executor.submit(func, *args))
+            try:
+                result = await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                raise WorkerTimeoutError(f"{self.name}: превышено время ожидания {timeout} с") from None
+            healthy = True
+            return result
+        except Exception as e:
+            # Исключение из самой задачи не портит процесс воркера
+            healthy = not isinstance(e, (WorkerTimeoutError, BrokenProcessPool))
+            raise
+        finally:
+            if self._idle is None:
+                # Пул уже остановлен — воркер больше не нужен
+                self._kill(executor)
+            else:
+                if not healthy:
+                    self._kill(executor)
+                    executor = self._new_executor()
+                self._idle.put_nowait(executor)
+
+    async def run(self, func, *args, owner=None, timeout: float = None):
+        """Выполнение func(*args) в отдельном процессе.
+
+        owner — идентификатор владельца (обычно id пользователя), по которому
+        задачу можно отменить через cancel_jobs.
+        """
+        job = asyncio.ensure_future(self._execute(func, args, timeout or self.timeout))
+        if owner is not None:
+            self._jobs.setdefault(owner, set()).add(job)
+        try:
+            return await job
+        except asyncio.CancelledError:
+            # Отменили только задачу (а не сам обработчик) — сообщаем об этом явно
+            if job.cancelled() and not asyncio.current_task().cancelling():
+                raise JobCancelledError() from None
+            raise
+        finally:
+            if owner is not None:
+                jobs = self._jobs.get(owner, set())
+                jobs.discard(job)
+                if not jobs:
+                    self._jobs.pop(owner, None)
+
+    def cancel(self, owner) -> int:
+        jobs = self._jobs.pop(owner, set())
+        for job in jobs:
+            job.cancel()
+        return len(jobs)
+
+    def shutdown(self):
+        for executor in list(self._executors):
+            self._kill(executor)
+        self._idle = None
+
+
+class AdmissionController:
+    """Ограничение суммарного веса одновременно выполняющихся задач.
+
+    Например, для рендеринга вес — количество пикселей: несколько больших
+    холстов ждут своей очереди, а не выделяются одновременно. Задача тяжелее
+    всего бюджета допускается, когда других задач нет.
+    """
+
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.capacity = capacity
+        self.in_use = 0
+        self._condition = None  # asyncio.Condition создается лениво, внутри работающего loop
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, weight: int):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            await self._condition.wait_for(
+                lambda: self.in_use == 0 or self.in_use + weight <= self.capacity
+            )
+            self.in_use += weight
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.in_use -= weight
+                self._condition.notify_all()
+
+
+def cancel_jobs(owner) -> int:
+    """Отмена всех задач пользователя во всех пулах"""
+    cancelled = sum(pool.cancel(owner) for pool in _pools)
+    if cancelled:
+        logger.info(f"Отменено задач пользователя {owner}: {cancelled}")
+    return cancelled
+
+
+def shutdown_pools():
+    """Остановка всех пулов при завершении работы бота"""
+    for pool in _pools:
+        pool.shutdown()